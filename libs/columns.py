@@ -0,0 +1,206 @@
+#!/usr/bin/python3
+
+import os, sys, json
+from array import array
+from lxml import etree
+if __package__:
+    from . import files, sta
+else:
+    import files, sta
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+## Exports a parallel treebank (two TIGER-XML files and a STA-XML file) to columnar tables, so that statistics and aligner features can be computed without parsing XML.
+## There are three tables:
+## - source, target: one row per <t> or <nt> node, in document order
+## - alignments: one row per <align>
+## String columns are dictionary-encoded: an integer code per row plus the list of distinct values.
+## By default, every column is stored as a separate .npy file in the output directory, so that the loader can memory-map them. With format "parquet", each table is stored as a Parquet file instead (requires pyarrow).
+## Example:
+## columns.ColumnExporter().export("ALM-308.xml","ALM-308.columns")
+## tables = columns.load("ALM-308.columns")
+## tables['source']['cat'].code("NP") ==> e.g. 3
+## (tables['source']['cat'].codes == 3).sum() ==> number of NP nodes
+
+NODE_STRINGS = ["node_id","sent_id","word","lemma","pos","cat","label"]
+NODE_INTS = ["kind","parent"] ## kind: 0 for <t>, 1 for <nt>; parent: row of the parent node, or -1 for root nodes
+ALIGN_STRINGS = ["type","author","last_change"]
+ALIGN_INTS = ["source","target"] ## rows of the aligned nodes in the source and target tables, or -1 if the node does not exist
+
+class Dictionary:
+## Dictionary encoder: assigns an integer code to each distinct string in the order in which they are seen.
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+        self.encode("") ## code 0 is always the empty string (i.e. a missing attribute)
+
+    def encode(self,value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+class DictColumn:
+## A dictionary-encoded column as returned by the loader.
+    def __init__(self,codes,values):
+        self.codes = codes
+        self.values = values
+        self.lookup = None
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self,i):
+        return str(self.values[self.codes[i]])
+
+    def code(self,value):
+## Returns the code of a value, or -1 if the value does not occur in the column.
+        if self.lookup is None:
+            self.lookup = {str(v): i for i,v in enumerate(self.values)}
+        return self.lookup.get(value,-1)
+
+    def decode(self):
+        return [str(self.values[c]) for c in self.codes]
+
+class Table:
+## Columns under construction: integer codes are kept in compact arrays until they are saved.
+    def __init__(self,strings,ints):
+        self.dicts = {c: Dictionary() for c in strings}
+        self.columns = {c: array('i') for c in strings+ints}
+
+    def __len__(self):
+        return len(next(iter(self.columns.values())))
+
+    def append(self,row):
+        for c in self.dicts:
+            self.columns[c].append(self.dicts[c].encode(row.get(c,"")))
+        for c in self.columns:
+            if c not in self.dicts:
+                self.columns[c].append(row.get(c,-1))
+
+class ColumnExporter:
+    def __init__(self):
+        self.compressed_file = files.CompressedFile()
+
+    def export_treebank(self,filename):
+## Reads a TIGER-XML file one sentence at a time and returns its node table and a node ID -> row dictionary.
+        table = Table(NODE_STRINGS,NODE_INTS)
+        rows = {}
+        label = table.dicts['label']
+        with self.compressed_file.open_read(filename) as f:
+            for event,s in etree.iterparse(f,tag="s"):
+                sentid = s.get('id')
+                local = {}
+                for el in s.iter("t","nt"):
+                    id = el.get('id')
+                    local[id] = len(table)
+                    row = {'node_id': id, 'sent_id': sentid, 'kind': 0 if el.tag == "t" else 1}
+                    for a in ("word","lemma","pos","cat"):
+                        row[a] = el.get(a,"")
+                    table.append(row)
+                for nt in s.iter("nt"):
+                    parent = local[nt.get('id')]
+                    for edge in nt.iterchildren("edge"):
+                        child = local.get(edge.get('idref'))
+                        if child is not None:
+                            table.columns['parent'][child] = parent
+                            table.columns['label'][child] = label.encode(edge.get('label',""))
+                rows.update(local)
+                s.clear()
+                while s.getprevious() is not None:
+                    del s.getparent()[0]
+        return (table,rows)
+
+    def export_alignments(self,align_tree,srows,trows):
+        table = Table(ALIGN_STRINGS,ALIGN_INTS)
+        for align in align_tree.getroot().iter("align"):
+            row = {a: align.get(a,"") for a in ALIGN_STRINGS}
+            row['source'] = srows.get(align[0].get('node_id'),-1)
+            row['target'] = trows.get(align[1].get('node_id'),-1)
+            table.append(row)
+        return table
+
+    def export(self,alignment_file,outdir,format="npy"):
+## Exports the treebanks referred to by the alignment file (see sta.Files.get_treebank_files) and the alignments to outdir.
+        with self.compressed_file.open_read(alignment_file) as f:
+            align_tree = etree.parse(f)
+        tree_files = sta.Files().get_treebank_files(align_tree,os.path.abspath(alignment_file))
+        (source,srows) = self.export_treebank(tree_files[0])
+        (target,trows) = self.export_treebank(tree_files[1])
+        alignments = self.export_alignments(align_tree,srows,trows)
+        tables = {'source': source, 'target': target, 'alignments': alignments}
+        os.makedirs(outdir,exist_ok=True)
+        if format == "parquet":
+            self.save_parquet(tables,outdir)
+        else:
+            self.save_npy(tables,outdir)
+        manifest = {
+            'format': format,
+            'alignment_file': os.path.abspath(alignment_file),
+            'treebank_files': tree_files,
+            'tables': {name: {'rows': len(t), 'strings': list(t.dicts), 'ints': [c for c in t.columns if c not in t.dicts]} for name,t in tables.items()},
+        }
+        with open(os.path.join(outdir,"manifest.json"),"w") as f:
+            json.dump(manifest,f,indent=1)
+        return manifest
+
+    def save_npy(self,tables,outdir):
+        if numpy is None:
+            print("columns.py: Error: Saving columns requires numpy!",file=sys.stderr)
+            exit(1)
+        for name,table in tables.items():
+            for c,codes in table.columns.items():
+                numpy.save(os.path.join(outdir,name+"."+c+".npy"),numpy.frombuffer(codes,dtype=numpy.int32))
+            for c,d in table.dicts.items():
+                numpy.save(os.path.join(outdir,name+"."+c+".values.npy"),numpy.array(d.values,dtype=str))
+
+    def save_parquet(self,tables,outdir):
+        try:
+            import pyarrow, pyarrow.parquet
+        except ImportError:
+            print("columns.py: Error: Saving columns in Parquet format requires pyarrow!",file=sys.stderr)
+            exit(1)
+        for name,table in tables.items():
+            arrays = {}
+            for c,codes in table.columns.items():
+                indices = pyarrow.array(codes,type=pyarrow.int32())
+                if c in table.dicts:
+                    arrays[c] = pyarrow.DictionaryArray.from_arrays(indices,pyarrow.array(table.dicts[c].values,type=pyarrow.string()))
+                else:
+                    arrays[c] = indices
+            pyarrow.parquet.write_table(pyarrow.table(arrays),os.path.join(outdir,name+".parquet"))
+
+def load(directory,mmap=True):
+## Loads the tables written by ColumnExporter.export. Returns a dictionary of tables, each a dictionary of columns: numpy arrays for integer columns and DictColumn objects for string columns.
+## .npy columns are memory-mapped unless mmap is False.
+    with open(os.path.join(directory,"manifest.json")) as f:
+        manifest = json.load(f)
+    if numpy is None:
+        print("columns.py: Error: Loading columns requires numpy!",file=sys.stderr)
+        exit(1)
+    tables = {}
+    for name,info in manifest['tables'].items():
+        columns = {}
+        if manifest['format'] == "parquet":
+            import pyarrow.parquet
+            table = pyarrow.parquet.read_table(os.path.join(directory,name+".parquet"),memory_map=mmap)
+            for c in info['ints']:
+                columns[c] = table.column(c).to_numpy()
+            for c in info['strings']:
+                col = table.column(c).combine_chunks()
+                columns[c] = DictColumn(col.indices.to_numpy(),col.dictionary.to_pylist())
+        else:
+            mode = "r" if mmap else None
+            for c in info['ints']:
+                columns[c] = numpy.load(os.path.join(directory,name+"."+c+".npy"),mmap_mode=mode)
+            for c in info['strings']:
+                codes = numpy.load(os.path.join(directory,name+"."+c+".npy"),mmap_mode=mode)
+                values = numpy.load(os.path.join(directory,name+"."+c+".values.npy"),mmap_mode=mode)
+                columns[c] = DictColumn(codes,values)
+        tables[name] = columns
+    return tables
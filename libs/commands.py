@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+
+import os, sys, importlib, importlib.util
+
+## Console entry points for the scripts in scripts/treealign (see [project.scripts] in pyproject.toml), e.g. treealign-ten-fold for ten-fold.py.
+## Each script has a main(argv=None) function that returns its exit status, so the commands can also be run in-process, e.g. over a batch of files without starting a new interpreter for each:
+## from treealignery import commands
+## for name in alignment_files:
+##     status = commands.check_sta_align(["-a",name,"--deep"])
+##     if status != 0: ## 1: missing nodes or treebanks, or invalid alignments
+##         print(name)
+## Like the scripts, the commands raise SystemExit for invalid arguments.
+## When the package is installed, the scripts are its submodule treealignery.scripts; in a checkout, they are loaded from ../scripts/treealign.
+
+SCRIPTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__),'..','scripts','treealign'))
+
+_loaded = {} ## script name => module
+
+def load(script):
+## Returns the module of a script, e.g. load("ten-fold"). It is only imported once, and does nothing but define its argument parser and main().
+    module = _loaded.get(script)
+    if module is None:
+        if __package__:
+            module = importlib.import_module(".scripts."+script,__package__)
+        else:
+            spec = importlib.util.spec_from_file_location(script.replace("-","_"),os.path.join(SCRIPTS_DIR,script+".py"))
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        _loaded[script] = module
+    return module
+
+def run(script,argv=None):
+## Runs a script with the given arguments (default: sys.argv[1:]) and returns its exit status.
+    return load(script).main(argv)
+
+def ten_fold(argv=None):
+    return run("ten-fold",argv)
+
+def check_sta_align(argv=None):
+    return run("check-STA-align",argv)
+
+def cross_validate(argv=None):
+    return run("cross-validate",argv)
+
+def evaluate(argv=None):
+    return run("evaluate",argv)
+
+def export_columns(argv=None):
+    return run("export-columns",argv)
+
+def export_parallel_text(argv=None):
+    return run("export-parallel-text",argv)
+
+def filter_alignments(argv=None):
+    return run("filter-alignments",argv)
+
+def import_word_alignments(argv=None):
+    return run("import-word-alignments",argv)
+
+def merge_sta(argv=None):
+    return run("merge-STA",argv)
+
+def split_shards(argv=None):
+    return run("split-shards",argv)
+
+def merge_shards(argv=None):
+    return run("merge-shards",argv)
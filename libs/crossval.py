@@ -0,0 +1,203 @@
+#!/usr/bin/python3
+
+import os, re, sys, json, time, shlex, signal, subprocess
+from concurrent.futures import ThreadPoolExecutor
+from lxml import etree
+if __package__:
+    from . import files
+else:
+    import files
+
+## Runs k-fold cross validation with an external tree aligner over the folds written by ten-fold.py.
+## For each fold, a training command and an alignment command are run, filled in from templates with the files of the fold (see FIELDS), e.g.
+## --train "train-aligner {train_align} {model}" --align "run-aligner {model} {test_source} {test_target} > {predicted}"
+## Folds run in parallel (at most jobs at a time), each command optionally with limits on memory, CPU time and wall-clock time.
+## The start, duration, exit status and log files of each command are recorded in <rundir>/fold<N>/status.json. When the run is started again, folds whose commands all succeeded are skipped, and folds whose training succeeded only run the alignment.
+## The predicted STA-XML files end up in the run directory next to the gold test files they belong to, so that they can be scored with evaluation.py (or evaluate.py).
+## Example:
+## cv = crossval.CrossValidation("folds","runs","train.sh {train_align} {model}","align.sh {model} {test_align} {predicted}",jobs=4)
+## cv.run()
+## cv.predictions() ==> [("folds/ALM-308.rand1.test.xml","runs/ALM-308.rand1.predicted.xml"), ...]
+
+FOLD_FILE = re.compile(r'^(.*)\.rand([0-9]+)\.(train|test)(\.xml(?:\.(?:gz|xz|zst))?)$')
+FIELDS = ("fold","train_align","train_source","train_target","test_align","test_source","test_target","model","predicted","workdir")
+PHASES = ("train","align")
+
+def is_alignment_file(filename):
+## True if the root element of the file is <treealign> (STA-XML), as opposed to <corpus> (TIGER-XML).
+    with files.CompressedFile().open_read(filename) as f:
+        for event,el in etree.iterparse(f,events=("start",),huge_tree=True):
+            return el.tag == "treealign"
+    return False
+
+def treebank_files(alignment_file):
+## Returns the treebank filenames in the header of an alignment file, resolved relative to its directory.
+    files_info = files.FileName()
+    dirpath = os.path.dirname(os.path.realpath(alignment_file))
+    treebanks = []
+    with files.CompressedFile().open_read(alignment_file) as f:
+        for event,el in etree.iterparse(f,events=("start",),huge_tree=True):
+            if el.tag == "treebank":
+                treebanks.append(files_info.check_absolute_path(el.get('filename',""),dirpath))
+            elif el.tag == "alignments":
+                break
+    return treebanks
+
+def limit_resources(command,memory,cpu_time):
+## Prefixes the command with the ulimit calls of the shell that runs it, so that the limits apply to the command and all its children.
+## (This avoids preexec_fn, which is not safe when several folds are started from different threads.)
+    limits = []
+    if memory:
+        limits.append("ulimit -v %s" % (memory//1024)) ## in KiB
+    if cpu_time:
+        limits.append("ulimit -t %s" % (cpu_time))
+    if not limits:
+        return command
+    return " && ".join(limits)+" && "+command
+
+class CrossValidation:
+    def __init__(self,fold_dir,run_dir,train_command,align_command,jobs=1,memory=None,cpu_time=None,timeout=None):
+## memory: maximum address space of each command in bytes; cpu_time: in seconds; timeout: maximum wall-clock time of each command in seconds
+        self.fold_dir = fold_dir
+        self.run_dir = run_dir
+        self.train_command = train_command
+        self.align_command = align_command
+        self.jobs = jobs
+        self.memory = memory
+        self.cpu_time = cpu_time
+        self.timeout = timeout
+        self.folds = self.find_folds()
+
+    def find_folds(self):
+## Returns fold number => {'train_align', 'train_source', 'train_target', 'test_align', 'test_source', 'test_target'} for all complete folds in the fold directory.
+        folds = {}
+        for name in sorted(os.listdir(self.fold_dir)):
+            match = FOLD_FILE.match(name)
+            if not match:
+                continue
+            filename = os.path.join(self.fold_dir,name)
+            if not is_alignment_file(filename):
+                continue
+            (stem,fold,part,ext) = match.groups()
+            treebanks = treebank_files(filename)
+            if len(treebanks) < 2 or not treebanks[0] or not treebanks[1]:
+                print("crossval.py: Warning: The treebanks of %s were not found, skipping it." % (filename),file=sys.stderr)
+                continue
+            fold_files = folds.setdefault(int(fold),{'stem': stem, 'ext': ext})
+            fold_files[part+"_align"] = filename
+            fold_files[part+"_source"] = treebanks[0]
+            fold_files[part+"_target"] = treebanks[1]
+        complete = {}
+        for fold,fold_files in sorted(folds.items()):
+            if 'train_align' in fold_files and 'test_align' in fold_files:
+                complete[fold] = fold_files
+            else:
+                print("crossval.py: Warning: Fold %s does not have both a training and a test set, skipping it." % (fold),file=sys.stderr)
+        return complete
+
+    def workdir(self,fold):
+        return os.path.join(self.run_dir,"fold%s" % (fold))
+
+    def predicted_file(self,fold):
+        fold_files = self.folds[fold]
+        return os.path.join(self.run_dir,"%s.rand%s.predicted%s" % (fold_files['stem'],fold,fold_files['ext']))
+
+    def fields(self,fold):
+## Returns the values of the template fields for a fold, quoted for the shell.
+        values = {name: self.folds[fold][name] for name in FIELDS if name in self.folds[fold]}
+        values['fold'] = str(fold)
+        values['workdir'] = self.workdir(fold)
+        values['model'] = os.path.join(self.workdir(fold),"model")
+        values['predicted'] = self.predicted_file(fold)
+        return {name: shlex.quote(value) for name,value in values.items()}
+
+    def command(self,phase,fold):
+        template = self.train_command if phase == "train" else self.align_command
+        return template.format(**self.fields(fold))
+
+    def status_file(self,fold):
+        return os.path.join(self.workdir(fold),"status.json")
+
+    def load_status(self,fold):
+        try:
+            with open(self.status_file(fold)) as f:
+                return json.load(f)
+        except (OSError,ValueError):
+            return {}
+
+    def save_status(self,fold,status):
+## Writes the status to a temporary file first, so that an interruption never leaves a broken status file.
+        temp = self.status_file(fold)+".tmp"
+        with open(temp,"w") as f:
+            json.dump(status,f,indent=1)
+        os.replace(temp,self.status_file(fold))
+
+    def succeeded(self,status,phase):
+        return status.get(phase,{}).get('returncode') == 0
+
+    def completed(self,fold):
+## A fold is complete if both commands succeeded and the predicted file exists.
+        status = self.load_status(fold)
+        return all(self.succeeded(status,phase) for phase in PHASES) and os.path.isfile(self.predicted_file(fold))
+
+    def run_command(self,fold,phase):
+## Runs one command of a fold in its own process group, with its output in <workdir>/<phase>.log. Returns its status.
+        command = self.command(phase,fold)
+        log_file = os.path.join(self.workdir(fold),phase+".log")
+        status = {'command': command, 'log': log_file, 'start': time.strftime("%Y-%m-%d %H:%M:%S"), 'timed_out': False}
+        start = time.monotonic()
+        with open(log_file,"wb") as log:
+            process = subprocess.Popen(limit_resources(command,self.memory,self.cpu_time),shell=True,stdout=log,stderr=subprocess.STDOUT,start_new_session=True)
+            try:
+                returncode = process.wait(timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid,signal.SIGKILL) ## also the children of the shell
+                returncode = process.wait()
+                status['timed_out'] = True
+        status['seconds'] = round(time.monotonic()-start,3)
+        status['returncode'] = returncode
+        return status
+
+    def run_fold(self,fold):
+## Runs the commands of a fold that have not succeeded yet. Returns the status of the fold.
+        os.makedirs(self.workdir(fold),exist_ok=True)
+        status = self.load_status(fold)
+        rerun = False ## once a command runs again, the following ones have to as well (e.g. a new model)
+        for phase in PHASES:
+            if not rerun and self.succeeded(status,phase) and (phase != "align" or os.path.isfile(self.predicted_file(fold))):
+                continue
+            rerun = True
+            if phase == "align" and os.path.isfile(self.predicted_file(fold)):
+                os.remove(self.predicted_file(fold)) ## left over from an interrupted or failed run
+            print("Fold %s: %s" % (fold,phase),file=sys.stderr)
+            status[phase] = self.run_command(fold,phase)
+            if phase == "align" and status[phase]['returncode'] == 0 and not os.path.isfile(self.predicted_file(fold)):
+                status[phase]['returncode'] = None
+                status[phase]['error'] = "The alignment command did not write %s" % (self.predicted_file(fold))
+            self.save_status(fold,status)
+            if not self.succeeded(status,phase):
+                print("Fold %s: %s failed (exit status %s), see %s" % (fold,phase,status[phase]['returncode'],status[phase]['log']),file=sys.stderr)
+                break
+        return status
+
+    def run(self,folds=None):
+## Runs all folds (or the given fold numbers) that are not complete yet, at most self.jobs at a time. Returns fold number => status for all of them.
+        if folds is None:
+            folds = sorted(self.folds)
+        unknown = [fold for fold in folds if fold not in self.folds]
+        if unknown:
+            raise ValueError("Unknown fold numbers: %s" % (" ".join(map(str,unknown))))
+        os.makedirs(self.run_dir,exist_ok=True)
+        todo = [fold for fold in folds if not self.completed(fold)]
+        for fold in folds:
+            if fold not in todo:
+                print("Fold %s: already complete, skipping it." % (fold),file=sys.stderr)
+        if todo:
+            ## The folds run as external processes, so threads are enough to wait for them.
+            with ThreadPoolExecutor(max_workers=max(1,self.jobs)) as executor:
+                list(executor.map(self.run_fold,todo))
+        return {fold: self.load_status(fold) for fold in folds}
+
+    def predictions(self):
+## Returns the (gold test file, predicted file) pairs of all complete folds, e.g. for evaluation.Evaluator.evaluate_folds.
+        return [(self.folds[fold]['test_align'],self.predicted_file(fold)) for fold in sorted(self.folds) if self.completed(fold)]
@@ -0,0 +1,240 @@
+#!/usr/bin/python3
+
+import re
+if __package__:
+    from . import loader
+else:
+    import loader
+
+## Computes in one traversal what the following methods in tiger.py compute separately:
+## - GetInfo.get_nr_sents: number of sentences, number of unique sentence IDs, duplicate sentence IDs and sentences with more than one sentence ID
+## - GetInfo.any_sentids_have_leading_zeros: sentence IDs with leading zeros
+## - GetInfo.nodesarevalid: idref values that do not refer to a node in the same sentence
+## as well as the number of terminals, nonterminals and edges.
+## Sentences can be split into chunks that are checked by worker processes. The results are merged into a single report, e.g.
+## report = diagnostics.Diagnostics().check_file("de.xml",processes=4)
+## report['non_uniq'] ==> ['s12', ...]
+## In deep mode, the structure of each sentence graph is also checked, and every problem is reported with its line and sentence instead of as a list of IDs:
+## - edge or secedge idrefs that do not refer to a node in the same sentence
+## - a missing <graph>, root attribute or root node, and root nodes with a parent
+## - nodes with more than one parent (<edge>), and cycles
+## - node IDs whose prefix does not match the ID of their <s>
+## - sentences without ID, and duplicate sentence and node IDs
+## report = diagnostics.Diagnostics().check_file("de.xml",deep=True)
+## report['errors'] ==> [(line, sentence ID, message), ...]
+
+SENTID = re.compile('(.*?[0-9]+)_?') ## same as GetInfo.get_sentid in tiger.py
+LEADING_ZERO = re.compile('^s?0+[0-9]+') ## same as GetInfo.any_sentids_have_leading_zeros in tiger.py
+
+def sentid_prefix(id):
+    match = SENTID.match(id)
+    return match.group(1) if match else id
+
+def check_chunk(root):
+## Worker function: returns the partial report for the sentences of a parsed chunk (see loader.py).
+    return Diagnostics().check_sents(root.iter("s"))
+
+def check_chunk_deep(root,line_offset):
+## Worker function: returns the partial deep report for the sentences of a parsed chunk.
+    return Diagnostics().check_structures(root.iter("s"),line_offset)
+
+class Diagnostics:
+    def new_report(self):
+        return {
+            'ids': [], ## sentence IDs in document order; needed to find duplicates across chunks
+            'sents_with_two_or_more': [],
+            'leading_zeros': [],
+            'invalid_nodes': [],
+            'nr_terminals': 0,
+            'nr_nonterminals': 0,
+            'nr_edges': 0,
+        }
+
+    def check_sent(self,s,report):
+## Adds the information of a single <s> element to a (partial) report, visiting each node only once.
+        sentid = s.get('id')
+        report['ids'].append(sentid)
+        if LEADING_ZERO.match(sentid):
+            report['leading_zeros'].append(sentid)
+        sentids = {sentid}
+        node_exists = set()
+        idrefs = []
+        for el in s.iter("t","nt","edge"):
+            tag = el.tag
+            if tag == "edge":
+                id = el.get('idref')
+                idrefs.append(id)
+                report['nr_edges'] += 1
+            else:
+                id = el.get('id')
+                node_exists.add(id)
+                if tag == "t":
+                    report['nr_terminals'] += 1
+                else:
+                    report['nr_nonterminals'] += 1
+            sentids.add(SENTID.match(id).group(1))
+        if len(sentids) > 1:
+            report['sents_with_two_or_more'].append(sentid)
+        for id in idrefs:
+            if id not in node_exists:
+                report['invalid_nodes'].append(id)
+        return report
+
+    def check_sents(self,sents):
+        report = self.new_report()
+        for s in sents:
+            self.check_sent(s,report)
+        return report
+
+    def merge(self,reports):
+## Merges partial reports (in document order) into a single report.
+## nr_sents, nr_uniq and non_uniq correspond to the values returned by GetInfo.get_nr_sents in tiger.py.
+        merged = self.new_report()
+        del merged['ids']
+        seen = set()
+        non_uniq = []
+        nr_sents = 0
+        for report in reports:
+            for id in report['ids']:
+                nr_sents += 1
+                if id in seen:
+                    non_uniq.append(id)
+                else:
+                    seen.add(id)
+            for key in ('sents_with_two_or_more','leading_zeros','invalid_nodes'):
+                merged[key].extend(report[key])
+            for key in ('nr_terminals','nr_nonterminals','nr_edges'):
+                merged[key] += report[key]
+        merged['nr_sents'] = nr_sents
+        merged['nr_uniq'] = nr_sents-len(non_uniq)
+        merged['non_uniq'] = non_uniq
+        return merged
+
+    def check_structure(self,s,report,line_offset=0):
+## Adds the sentence ID, the node IDs and the structural errors of a single <s> element to a (partial) deep report.
+## Duplicate node IDs within the sentence are reported here; merge_deep reports those of different sentences.
+        line = s.sourceline+line_offset
+        sentid = s.get('id')
+        report['ids'].append((sentid,line))
+        errors = report['errors']
+        if sentid is None:
+            errors.append((line,None,"<s> without id attribute"))
+            prefix = None
+        else:
+            prefix = sentid_prefix(sentid)
+        nodes = {} ## node ID => line
+        edges = [] ## (parent ID, idref, line, tag)
+        graph = None
+        for el in s.iter("graph","t","nt","edge","secedge"):
+            tag = el.tag
+            if tag == "graph":
+                if graph is None:
+                    graph = el
+                continue
+            el_line = el.sourceline+line_offset
+            if tag == "edge" or tag == "secedge":
+                parent = el.getparent().get('id')
+                edges.append((parent,el.get('idref'),el_line,tag))
+                continue
+            id = el.get('id')
+            if id is None:
+                errors.append((el_line,sentid,"<%s> without id attribute" % (tag)))
+                continue
+            if id in nodes:
+                errors.append((el_line,sentid,"duplicate node ID %s (first at line %s)" % (id,nodes[id])))
+                continue
+            nodes[id] = el_line
+            report['nodes'].append((id,el_line,sentid))
+            if prefix is not None and sentid_prefix(id) != prefix:
+                errors.append((el_line,sentid,"node ID %s does not match sentence ID %s" % (id,sentid)))
+
+        root = None
+        if graph is None:
+            errors.append((line,sentid,"no <graph>"))
+        else:
+            root = graph.get('root')
+            if root is None:
+                errors.append((graph.sourceline+line_offset,sentid,"<graph> without root attribute"))
+            elif root not in nodes:
+                errors.append((graph.sourceline+line_offset,sentid,"graph root %s does not exist" % (root)))
+                root = None
+
+        children = {}
+        parents = {}
+        for (parent,idref,el_line,tag) in edges:
+            if idref not in nodes:
+                errors.append((el_line,sentid,"%s idref %s of node %s does not exist" % (tag,idref,parent)))
+                continue
+            if tag == "secedge":
+                continue
+            if idref in parents:
+                errors.append((el_line,sentid,"node %s has more than one parent (%s and %s)" % (idref,parents[idref],parent)))
+            else:
+                parents[idref] = parent
+            children.setdefault(parent,[]).append(idref)
+        if root is not None and root in parents:
+            errors.append((nodes[root],sentid,"graph root %s has parent %s" % (root,parents[root])))
+
+        ## Cycles: iterative depth-first search over the primary edges. Each cycle is reported once, at its first node.
+        state = {} ## node ID => 1 (on the current path) or 2 (done)
+        for start in children:
+            if start in state:
+                continue
+            path = [start]
+            stack = [iter(children[start])]
+            state[start] = 1
+            while stack:
+                child = next(stack[-1],None)
+                if child is None:
+                    state[path.pop()] = 2
+                    stack.pop()
+                elif child not in state:
+                    state[child] = 1
+                    path.append(child)
+                    stack.append(iter(children.get(child,())))
+                elif state[child] == 1:
+                    cycle = path[path.index(child):]+[child]
+                    errors.append((nodes[child],sentid,"cycle: %s" % (" -> ".join(cycle))))
+        return report
+
+    def check_structures(self,sents,line_offset=0):
+        report = {'ids': [], 'nodes': [], 'errors': []}
+        for s in sents:
+            self.check_structure(s,report,line_offset)
+        return report
+
+    def merge_deep(self,reports):
+## Merges partial deep reports (in document order) into a single report, adding duplicate sentence IDs and node IDs that occur in more than one sentence to the errors. The errors are sorted by line.
+        merged = {'nr_sents': 0, 'errors': []}
+        first_line = {}
+        first_node_line = {}
+        for report in reports:
+            for (id,line) in report['ids']:
+                merged['nr_sents'] += 1
+                if id is None:
+                    continue
+                if id in first_line:
+                    merged['errors'].append((line,id,"duplicate sentence ID %s (first at line %s)" % (id,first_line[id])))
+                else:
+                    first_line[id] = line
+            for (id,line,sentid) in report['nodes']:
+                if id in first_node_line:
+                    merged['errors'].append((line,sentid,"duplicate node ID %s (first at line %s)" % (id,first_node_line[id])))
+                else:
+                    first_node_line[id] = line
+            merged['errors'].extend(report['errors'])
+        merged['errors'].sort(key=lambda error: error[0])
+        return merged
+
+    def check_tree(self,tree):
+## Single-process check of an already parsed treebank.
+        return self.merge([self.check_sents(tree.getroot().iter("s"))])
+
+    def check_file(self,filename,processes=None,nr_chunks=None,deep=False):
+## Checks a TIGER-XML file (optionally compressed) using a pool of worker processes (by default, one per core).
+## The file is split into chunks of sentences with a byte scan, so that the workers also share the parsing.
+## deep: return the deep report (see above) instead.
+        chunked_loader = loader.ChunkedLoader(processes)
+        if deep:
+            return self.merge_deep(chunked_loader.map_chunks(check_chunk_deep,filename,nr_chunks,line_numbers=True))
+        return self.merge(chunked_loader.map_chunks(check_chunk,filename,nr_chunks))
@@ -0,0 +1,159 @@
+#!/usr/bin/python3
+
+import os, statistics
+from multiprocessing import Pool
+from lxml import etree
+if __package__:
+    from . import files, tiger, extract, shared
+else:
+    import files, tiger, extract, shared
+
+## Evaluation of predicted tree alignments against gold standard alignments, e.g. for the test folds written by ten-fold.py.
+## Each alignment is keyed by its (source ID, target ID) node pair, so comparing a gold and a predicted file is a set intersection.
+## Precision, recall and F1 are computed overall, per alignment type (e.g. good, fuzzy), per node class (t: terminal to terminal, nt: nonterminal to nonterminal, mixed) and per sentence pair.
+## Fold pairs are evaluated in parallel, and the scores are aggregated over folds with mean and standard deviation.
+## When fold pairs are evaluated in parallel, the treebanks are indexed once in the main process and shared with the worker processes through shared memory (see shared.py), instead of every worker building its own node dictionaries.
+## The folds written by ten-fold.py each have their own treebanks, which are all cut from the same source and target treebank. If those are given, only their two indexes are published, and they are used for the nodes of every fold.
+## Example:
+## evaluator = evaluation.Evaluator()
+## results = evaluator.evaluate_folds([("align.rand1.test.xml","pred1.xml"),("align.rand2.test.xml","pred2.xml")])
+## results = evaluator.evaluate_folds(fold_pairs,treebanks=("de.xml","en.xml")) ## the treebanks the folds were cut from
+## evaluation.Evaluator().aggregate(results)['overall'] ==> {'precision': (mean, std), 'recall': ..., 'f1': ...}
+
+def scores(correct,predicted,gold):
+## Returns (precision, recall, F1). Empty sets count as a score of 0.
+    precision = correct/predicted if predicted else 0.0
+    recall = correct/gold if gold else 0.0
+    f1 = 2*precision*recall/(precision+recall) if precision+recall else 0.0
+    return (precision,recall,f1)
+
+def evaluate_fold(task):
+## Worker function: evaluates one (gold file, predicted file) pair. The task may also contain a dictionary of treebank filename => name of its shared index.
+    (gold_file,predicted_file) = task[:2]
+    shared_indexes = task[2] if len(task) > 2 else None
+    return Evaluator(shared_indexes).evaluate(gold_file,predicted_file)
+
+class Evaluator:
+    def __init__(self,shared_indexes=None):
+        self.tiger_getinfo = tiger.GetInfo()
+        self.files_info = files.FileName()
+        self.shared_indexes = shared_indexes or {}
+
+    def read(self,filename):
+## Returns the treebank filenames (resolved relative to the alignment file) and a dictionary of (source ID, target ID) => (source ID, target ID, type).
+        data = extract.extract(filename,extract.Alignments())
+        dirpath = os.path.dirname(os.path.realpath(filename))
+        treebanks = [self.files_info.check_absolute_path(t,dirpath) if t else "" for t in data['treebanks']]
+        pairs = {}
+        for (s_id,t_id,type) in data['alignments']:
+            pairs[(s_id,t_id)] = (s_id,t_id,type) ## the pair itself rather than its hash, which could collide with another pair
+        return (treebanks,pairs)
+
+    def node_classes(self,treebanks):
+## Returns a node ID => "t"/"nt" dictionary for each of the treebanks, or None if a treebank cannot be found.
+## A shared index is used instead of the dictionary if one was published for the treebank; it supports the same lookups.
+        if len(treebanks) < 2 or not treebanks[0] or not treebanks[1]:
+            return None
+        classes = []
+        for treebank in treebanks[:2]:
+            if treebank in self.shared_indexes:
+                classes.append(shared.attach(self.shared_indexes[treebank]))
+            else:
+                classes.append(self.tiger_getinfo.get_nodes(treebank,"dict"))
+        return tuple(classes)
+
+    def treebank_files(self,filename):
+## Returns the treebank filenames of an alignment file (resolved like in read), reading only its header.
+        dirpath = os.path.dirname(os.path.realpath(filename))
+        treebanks = []
+        with files.CompressedFile().open_read(filename) as f:
+            for event,el in etree.iterparse(f,events=("start",),huge_tree=True):
+                if el.tag == "treebank":
+                    t = el.get('filename')
+                    treebanks.append(self.files_info.check_absolute_path(t,dirpath) if t else "")
+                elif el.tag == "alignments":
+                    break
+        return treebanks
+
+    def node_class(self,node_id,nodes):
+        if nodes is not None and node_id in nodes:
+            return nodes[node_id]
+        ## Treebank not available: by convention, nonterminal IDs are numbered from 500 (e.g. s3_500).
+        number = node_id.rsplit("_",1)[-1]
+        return "nt" if number.isdigit() and int(number) >= 500 else "t"
+
+    def pair_class(self,s_id,t_id,classes):
+        sclass = self.node_class(s_id,classes[0] if classes else None)
+        tclass = self.node_class(t_id,classes[1] if classes else None)
+        return sclass if sclass == tclass else "mixed"
+
+    def evaluate(self,gold_file,predicted_file):
+## Returns the counts (correct, predicted, gold) overall, per type, per class and per sentence pair (source sentence ID;target sentence ID).
+        (treebanks,gold) = self.read(gold_file)
+        (_,predicted) = self.read(predicted_file)
+        classes = self.node_classes(treebanks)
+        result = {'gold_file': gold_file, 'predicted_file': predicted_file, 'overall': [0,0,0], 'type': {}, 'class': {}, 'sentence': {}}
+        correct = gold.keys() & predicted.keys()
+        result['overall'] = [len(correct),len(predicted),len(gold)]
+        for (pairs,column) in ((predicted,1),(gold,2)):
+            for key,(s_id,t_id,type) in pairs.items():
+                groups = (
+                    ('type',type),
+                    ('class',self.pair_class(s_id,t_id,classes)),
+                    ('sentence',self.tiger_getinfo.get_sentid(s_id)+";"+self.tiger_getinfo.get_sentid(t_id)),
+                )
+                for (name,value) in groups:
+                    counts = result[name].setdefault(value,[0,0,0])
+                    counts[column] += 1
+                    if column == 2 and key in correct:
+                        ## type counts only as correct if the predicted type is the same
+                        if name != 'type' or predicted[key][2] == type:
+                            counts[0] += 1
+        return result
+
+    def evaluate_folds(self,fold_pairs,processes=None,treebanks=None):
+## Evaluates a list of (gold file, predicted file) pairs in a process pool. Returns the results in the same order.
+## treebanks: optional (source, target) treebanks that the folds were cut from, whose shared indexes are used for the treebanks of all folds.
+        if processes is None:
+            processes = os.cpu_count() or 1
+        if processes == 1 or len(fold_pairs) < 2:
+            return [evaluate_fold(p) for p in fold_pairs]
+        indexes = {} ## treebank => SharedTreebankIndex
+        names = {} ## treebank of a fold => name of the index used for it
+        try:
+            if treebanks:
+                for treebank in treebanks[:2]:
+                    indexes[treebank] = shared.SharedTreebankIndex(filename=treebank)
+            for (gold_file,predicted_file) in fold_pairs:
+                for side,treebank in enumerate(self.treebank_files(gold_file)[:2]):
+                    if not treebank or treebank in names:
+                        continue
+                    if treebanks:
+                        names[treebank] = indexes[treebanks[side]].name
+                    else:
+                        if treebank not in indexes:
+                            indexes[treebank] = shared.SharedTreebankIndex(filename=treebank)
+                        names[treebank] = indexes[treebank].name
+            with Pool(min(processes,len(fold_pairs))) as pool:
+                return pool.map(evaluate_fold,[(gold_file,predicted_file,names) for (gold_file,predicted_file) in fold_pairs])
+        finally:
+            for index in indexes.values():
+                index.close()
+
+    def aggregate(self,results):
+## Returns the mean and standard deviation over folds of precision, recall and F1, overall and per type and class:
+## {'overall': {'precision': (mean,std), ...}, 'type': {'good': {...}, ...}, 'class': {...}}
+        def summarise(counts_list):
+            per_fold = [scores(*counts) for counts in counts_list]
+            summary = {}
+            for i,name in enumerate(('precision','recall','f1')):
+                values = [s[i] for s in per_fold]
+                std = statistics.stdev(values) if len(values) > 1 else 0.0
+                summary[name] = (statistics.mean(values),std)
+            return summary
+        aggregated = {'overall': summarise([r['overall'] for r in results]), 'type': {}, 'class': {}}
+        for name in ('type','class'):
+            values = sorted({v for r in results for v in r[name]})
+            for v in values:
+                aggregated[name][v] = summarise([r[name].get(v,[0,0,0]) for r in results if v in r[name]])
+        return aggregated
@@ -0,0 +1,172 @@
+#!/usr/bin/python3
+
+import os
+from lxml import etree
+if __package__:
+    from . import files
+else:
+    import files
+
+## Fast extraction of a few attributes from TIGER-XML and STA-XML files using lxml's parser target interface.
+## The parser calls start() for each start tag with the tag name and its attributes; no Element objects are created at all, so memory use only depends on what is collected.
+## The GetInfo methods in tiger.py and sta.py use these automatically when they are given a filename instead of a tree, e.g.
+## tiger.GetInfo().get_nodes("de.xml","dict")
+
+def is_filename(tree):
+## True if a GetInfo method was given a filename instead of a tree object.
+    return isinstance(tree,(str,os.PathLike))
+
+def extract(filename,target):
+## Parses the file (optionally compressed) with the given target and returns the value of target.close().
+    parser = etree.XMLParser(target=target,huge_tree=True)
+    with files.CompressedFile().open_read(filename) as f:
+        return etree.parse(f,parser)
+
+class SentIds:
+## Same as tiger.GetInfo.get_sent_ids
+    def __init__(self):
+        self.ids = []
+
+    def start(self,tag,attrib):
+        if tag == "s":
+            self.ids.append(attrib['id'])
+
+    def close(self):
+        return self.ids
+
+class NodesToSentIds:
+## Same as tiger.GetInfo.link_nodes_to_sentids
+    def __init__(self):
+        self.linked_nodes = {}
+        self.sentid = None
+
+    def start(self,tag,attrib):
+        if tag == "t" or tag == "nt":
+            if self.sentid is not None:
+                self.linked_nodes[attrib['id']] = self.sentid
+        elif tag == "s":
+            self.sentid = attrib['id']
+
+    def end(self,tag):
+        if tag == "s":
+            self.sentid = None
+
+    def close(self):
+        return self.linked_nodes
+
+class Nodes:
+## Same as tiger.GetInfo.get_nodes: all <t> IDs followed by all <nt> IDs, as a list, or as a dictionary of ID => "t" or "nt".
+    def __init__(self,data_type):
+        self.data_type = data_type
+        self.terminals = []
+        self.nonterminals = []
+
+    def start(self,tag,attrib):
+        if tag == "t":
+            self.terminals.append(attrib['id'])
+        elif tag == "nt":
+            self.nonterminals.append(attrib['id'])
+
+    def close(self):
+        if self.data_type == "list":
+            return self.terminals+self.nonterminals
+        nodes = {}
+        if self.data_type == "dict":
+            nodes = dict.fromkeys(self.terminals,"t")
+            nodes.update(dict.fromkeys(self.nonterminals,"nt"))
+        return nodes
+
+class Words:
+## Same as tiger.GetInfo.get_words
+    def __init__(self):
+        self.words = {}
+
+    def start(self,tag,attrib):
+        if tag == "t":
+            self.words[attrib['id']] = attrib['word']
+
+    def close(self):
+        return self.words
+
+class NodePairs:
+## Same as sta.GetInfo.get_node_pairs: "source_id;target_id" for each <align>, using its first two <node> children.
+    def __init__(self):
+        self.pairs = []
+        self.nodes = None
+
+    def start(self,tag,attrib):
+        if tag == "node":
+            if self.nodes is not None:
+                self.nodes.append(attrib['node_id'])
+        elif tag == "align":
+            self.nodes = []
+
+    def end(self,tag):
+        if tag == "align":
+            self.pairs.append("{};{}".format(self.nodes[0],self.nodes[1]))
+            self.nodes = None
+
+    def close(self):
+        return self.pairs
+
+class Alignments:
+## Collects the treebank filenames and IDs from the header and (source ID, target ID, type) for each <align> of a STA-XML file.
+    def __init__(self):
+        self.treebanks = []
+        self.treebank_ids = []
+        self.alignments = []
+        self.type = None
+        self.nodes = None
+
+    def start(self,tag,attrib):
+        if tag == "node":
+            if self.nodes is not None:
+                self.nodes.append(attrib['node_id'])
+        elif tag == "align":
+            self.nodes = []
+            self.type = attrib.get('type',"")
+        elif tag == "treebank":
+            self.treebanks.append(attrib.get('filename'))
+            self.treebank_ids.append(attrib.get('id'))
+
+    def end(self,tag):
+        if tag == "align":
+            self.alignments.append((self.nodes[0],self.nodes[1],self.type))
+            self.nodes = None
+
+    def close(self):
+        return {'treebanks': self.treebanks, 'treebank_ids': self.treebank_ids, 'alignments': self.alignments}
+
+class Terminals:
+## Collects the sentence IDs, and the IDs and words of the terminals of each sentence, in order.
+## Returns a dictionary with:
+## - corpus_id: the id attribute of the root element
+## - sent_ids: list of sentence IDs
+## - terminal_ids: one list of <t> IDs per sentence, i.e. a position => terminal ID table
+## - words: one list of words per sentence
+## - nodes: node ID => (sentence number, position) for all <t> and <nt> nodes; position is -1 for nonterminals
+    def __init__(self):
+        self.corpus_id = None
+        self.sent_ids = []
+        self.terminal_ids = []
+        self.words = []
+        self.nodes = {}
+
+    def start(self,tag,attrib):
+        if tag == "t":
+            id = attrib['id']
+            terminals = self.terminal_ids[-1]
+            self.nodes[id] = (len(self.sent_ids)-1,len(terminals))
+            terminals.append(id)
+            self.words[-1].append(attrib.get('word',""))
+        elif tag == "nt":
+            self.nodes[attrib['id']] = (len(self.sent_ids)-1,-1)
+        elif tag == "s":
+            self.sent_ids.append(attrib['id'])
+            self.terminal_ids.append([])
+            self.words.append([])
+        elif tag == "corpus":
+            self.corpus_id = attrib.get('id')
+
+    def close(self):
+        return {'corpus_id': self.corpus_id, 'sent_ids': self.sent_ids, 'terminal_ids': self.terminal_ids, 'words': self.words, 'nodes': self.nodes}
@@ -1,7 +1,10 @@
 #!/usr/bin/python3
 
 from pathlib import Path
-import re, os, sys
+import re, os, sys, shutil, subprocess, gzip, lzma
+
+## Compressed file extensions and the names of the formats they stand for.
+COMPRESSION_EXTENSIONS = {"gz": "gzip", "xz": "xz", "zst": "zstd"}
 
 class FileName:
 	def __init__(self):
@@ -15,6 +18,27 @@ class FileName:
 		match = re.match(self.extMatch,filename)
 		return match.group(1)
 
+	def getCompression(self,filename):
+## Returns the compression format of a file as indicated by its extension (e.g. "xz" for "de.xml.xz"), or "" if it is not compressed.
+		ext = Path(filename).suffix.lstrip(".")
+		return COMPRESSION_EXTENSIONS.get(ext,"")
+
+	def stripCompression(self,filename):
+## Removes a compression extension, if any, e.g. "de.xml.gz" becomes "de.xml".
+		if self.getCompression(filename):
+			return self.getExtendedStem(filename)
+		return filename
+
+	def find_file(self,file):
+## Returns the file if it exists. Otherwise, checks whether a compressed version of it exists (e.g. "de.xml.gz" for "de.xml") and returns that instead.
+## If nothing is found, returns "".
+		if Path(file).is_file():
+			return file
+		for ext in COMPRESSION_EXTENSIONS:
+			if Path(file+"."+ext).is_file():
+				return file+"."+ext
+		return ""
+
 	def check_absolute_path(self,file,dirpath):
 ## We have a file and a possible absolute path of the file (without the filename).
 ## We want to make sure that it exists, otherwise, we check if it exists in the current directory.
@@ -24,13 +48,119 @@ class FileName:
 		if not path_reg:
 #	        abs_treefile=dir_path+'/'+file
 			abs_file=dirpath+'/'+file
-			possible_file=Path(abs_file)
-			if possible_file.is_file():
-				return abs_file
-			else:
-				return ""
+			return self.find_file(abs_file)
 		else:
-			if Path(file).is_file():
-				return file
-			else:
-				return ""
+			return self.find_file(file)
+
+class PipeWriter:
+## A writable binary file object that sends its data through an external compressor (e.g. "xz -T0"), which writes to the output file.
+	def __init__(self,command,filename):
+		self.filename = filename
+		self.output = open(filename,"wb")
+		self.process = subprocess.Popen(command,stdin=subprocess.PIPE,stdout=self.output)
+
+	def write(self,data):
+		return self.process.stdin.write(data)
+
+	def flush(self):
+		self.process.stdin.flush()
+
+	def close(self):
+		self.process.stdin.close()
+		status = self.process.wait()
+		self.output.close()
+		if status != 0:
+			raise IOError("Compressor exited with status %s while writing %s" % (status,self.filename))
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self,*args):
+		self.close()
+
+class PipeReader:
+## A readable binary file object for the output of an external decompressor (e.g. "zstd -dc"). When the end of the output is reached, the exit status of the decompressor is checked, so that a corrupt or truncated file raises an IOError instead of reading as a shorter file.
+	def __init__(self,command,filename):
+		self.filename = filename
+		self.process = subprocess.Popen(command,stdout=subprocess.PIPE)
+		self.input = self.process.stdout
+		self.status = None
+
+	def finish(self):
+		if self.status is None:
+			self.status = self.process.wait()
+			if self.status != 0:
+				raise IOError("Decompressor exited with status %s while reading %s" % (self.status,self.filename))
+
+	def read(self,size=-1):
+		data = self.input.read(size)
+		if not data or size is None or size < 0:
+			self.finish()
+		return data
+
+	def readline(self,size=-1):
+		data = self.input.readline(size)
+		if not data:
+			self.finish()
+		return data
+
+	def __iter__(self):
+		return iter(self.readline,b"")
+
+	def close(self):
+		self.input.close()
+		if self.status is None: ## closed before the end: the decompressor stops on the closed pipe, which is not an error
+			self.status = self.process.wait()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self,*args):
+		self.close()
+
+class CompressedFile:
+## Opens plain, gzip, xz and zstd files in binary mode, with the format picked from the extension.
+## For writing, a multithreaded external compressor (pigz, xz -T, zstd -T) is used if it is installed, otherwise the Python module.
+## Example:
+## with compressed_file.open_read("de.xml.xz") as f:
+##     tree = etree.parse(f)
+	def __init__(self,threads=0):
+		self.threads = threads ## 0: use all available cores
+		self.file_name = FileName()
+
+	def open_read(self,filename):
+		compression = self.file_name.getCompression(filename)
+		if compression == "gzip":
+			return gzip.open(filename,"rb")
+		elif compression == "xz":
+			return lzma.open(filename,"rb")
+		elif compression == "zstd":
+			try:
+				import zstandard
+			except ImportError:
+				if not shutil.which("zstd"):
+					raise IOError("Reading %s requires the zstandard module or the zstd program." % (filename))
+				return PipeReader(["zstd","-dc",filename],filename)
+			return zstandard.ZstdDecompressor().stream_reader(open(filename,"rb"),read_across_frames=True,closefd=True)
+		return open(filename,"rb")
+
+	def open_write(self,filename):
+		compression = self.file_name.getCompression(filename)
+		threads = self.threads or os.cpu_count() or 1
+		if compression == "gzip":
+			if shutil.which("pigz"):
+				return PipeWriter(["pigz","-c","-p",str(threads)],filename)
+			return gzip.open(filename,"wb")
+		elif compression == "xz":
+			if shutil.which("xz"):
+				return PipeWriter(["xz","-c","-T",str(threads)],filename)
+			return lzma.open(filename,"wb")
+		elif compression == "zstd":
+			try:
+				import zstandard
+			except ImportError:
+				if not shutil.which("zstd"):
+					raise IOError("Writing %s requires the zstandard module or the zstd program." % (filename))
+				return PipeWriter(["zstd","-q","-c","-T"+str(threads)],filename)
+			return zstandard.ZstdCompressor(threads=threads).stream_writer(open(filename,"wb"),closefd=True)
+		return open(filename,"wb")
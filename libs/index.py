@@ -0,0 +1,420 @@
+#!/usr/bin/python3
+
+import os, sys, pickle, bisect, importlib
+from array import array
+if __package__:
+    from . import files
+else:
+    import files
+
+## Inverted index over TIGER-XML treebanks and query API over a parallel treebank.
+## For each treebank, the values of the attributes word, lemma, pos (<t>), cat (<nt>) and label (of the <edge> pointing to a node) are mapped to posting lists: sorted arrays of node numbers (the position of the node in the treebank).
+## Node numbers are mapped to node IDs and sentence IDs with two arrays, so sentence postings are derived from node postings.
+## The alignments are stored as pairs of node numbers, sorted on either side, so that the aligned nodes of any node can be looked up directly.
+## Indexes are saved next to the files they index (e.g. de.xml.idx for de.xml) and rebuilt automatically when those files change.
+## Example:
+## query = index.Query("ALM-308.xml")
+## query.aligned({'cat': "NP"},{'cat': "VP"}) ==> [("s1_500","s1_501"), ...]
+## query.sentences(0,word="huis") ==> ["s1", "s7", ...]
+
+FIELDS = ("word","lemma","pos","cat","label")
+INDEX_VERSION = 1
+
+def lib(name):
+## Imports a module of the library when it is first needed. lxml (and sta.py and writer.py, which import it) is only loaded when an index is built or exported, so that queries on saved indexes start quickly.
+    if __package__:
+        return importlib.import_module("."+name,__package__)
+    return importlib.import_module(name)
+
+def file_stamp(filename):
+    stat = os.stat(filename)
+    return (stat.st_size,stat.st_mtime)
+
+def intersect(a,b):
+## Intersects two sorted posting lists. The shorter list is looked up in the longer one with binary search.
+    if len(a) > len(b):
+        (a,b) = (b,a)
+    result = array('i')
+    lo = 0
+    for x in a:
+        lo = bisect.bisect_left(b,x,lo)
+        if lo == len(b):
+            break
+        if b[lo] == x:
+            result.append(x)
+    return result
+
+class IndexBuilder:
+## lxml parser target that builds the postings of a treebank without creating any elements.
+    def __init__(self):
+        self.sent_ids = []
+        self.node_ids = []
+        self.node_sents = array('i')
+        self.postings = {field: {} for field in FIELDS+("tag",)} ## tag: "t" or "nt"
+        self.local = {} ## node ID => node number, for the current sentence
+        self.edges = [] ## (idref,label) pairs of the current sentence
+
+    def add(self,field,value,node):
+        posting = self.postings[field].get(value)
+        if posting is None:
+            posting = self.postings[field][value] = array('i')
+        posting.append(node)
+
+    def start(self,tag,attrib):
+        if tag == "t" or tag == "nt":
+            node = len(self.node_ids)
+            id = attrib['id']
+            self.node_ids.append(id)
+            self.node_sents.append(len(self.sent_ids)-1)
+            self.local[id] = node
+            self.add("tag",tag,node)
+            for field in ("word","lemma","pos","cat"):
+                value = attrib.get(field)
+                if value is not None:
+                    self.add(field,value,node)
+        elif tag == "edge":
+            self.edges.append((attrib.get('idref'),attrib.get('label',"")))
+        elif tag == "s":
+            self.sent_ids.append(attrib['id'])
+
+    def end(self,tag):
+        if tag == "s":
+            ## Edges can point backwards, so the label postings of a sentence are sorted before they are added.
+            labelled = sorted((self.local[idref],label) for (idref,label) in self.edges if idref in self.local)
+            for (node,label) in labelled:
+                self.add("label",label,node)
+            self.local = {}
+            self.edges = []
+
+    def close(self):
+        return {
+            'sent_ids': self.sent_ids,
+            'node_ids': self.node_ids,
+            'node_sents': self.node_sents,
+            'postings': self.postings,
+        }
+
+class SavedIndex:
+## Base class for indexes that are saved next to the file they index (filename+suffix) and rebuilt when the stamp (sizes and modification times of the files it depends on) changes.
+## Subclasses set self.stamp and implement build().
+    suffix = ".idx"
+
+    def open(self,filename,rebuild):
+        self.filename = filename
+        self.index_file = filename+self.suffix
+        self.data = None
+        if not rebuild:
+            self.data = self.load()
+        if self.data is None:
+            self.data = self.build()
+            self.data['version'] = INDEX_VERSION
+            self.data['stamp'] = self.stamp
+            self.save()
+
+    def load(self):
+## Returns the saved index, or None if there is none or it is out of date.
+        try:
+            with open(self.index_file,"rb") as f:
+                data = pickle.load(f)
+        except (OSError,pickle.UnpicklingError,EOFError):
+            return None
+        if data.get('version') != INDEX_VERSION or data.get('stamp') != self.stamp:
+            return None
+        return data
+
+    def save(self):
+## The index is written to a temporary file first and then renamed, so that an interrupted run or another process never sees a partly written index.
+        temp = "%s.tmp-%s" % (self.index_file,os.getpid())
+        try:
+            with open(temp,"wb") as f:
+                pickle.dump(self.data,f,protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp,self.index_file)
+        except OSError as e:
+            if os.path.exists(temp):
+                os.remove(temp)
+            print("index.py: Warning: Could not save index to %s (%s)" % (self.index_file,e),file=sys.stderr)
+
+    def parse(self,target):
+        from lxml import etree
+        parser = etree.XMLParser(target=target,huge_tree=True)
+        with files.CompressedFile().open_read(self.filename) as f:
+            return etree.parse(f,parser)
+
+class TreebankIndex(SavedIndex):
+    def __init__(self,filename,rebuild=False):
+        self.stamp = file_stamp(filename)
+        self.node_numbers = None
+        self.open(filename,rebuild)
+
+    def build(self):
+        return self.parse(IndexBuilder())
+
+    def get_node_number(self,node_id):
+        if self.node_numbers is None:
+            self.node_numbers = {id: i for i,id in enumerate(self.data['node_ids'])}
+        return self.node_numbers.get(node_id,-1)
+
+    def posting(self,field,value):
+        return self.data['postings'].get(field,{}).get(value,array('i'))
+
+    def nodes(self,**conditions):
+## Returns the sorted node numbers of all nodes that match all conditions, e.g. nodes(tag="nt",cat="NP").
+## Without conditions, returns None (meaning all nodes).
+        result = None
+        for field,value in sorted(conditions.items(),key=lambda c: len(self.posting(*c))):
+            posting = self.posting(field,value)
+            result = posting if result is None else intersect(result,posting)
+            if not result:
+                break
+        return result
+
+    def node_ids(self,nodes):
+        return [self.data['node_ids'][n] for n in nodes]
+
+    def sentences(self,nodes):
+## Returns the sentence IDs of the given nodes, in order and without duplicates.
+        node_sents = self.data['node_sents']
+        sent_ids = self.data['sent_ids']
+        result = []
+        last = -1
+        for n in nodes:
+            sent = node_sents[n]
+            if sent != last:
+                result.append(sent_ids[sent])
+                last = sent
+        return result
+
+class AlignmentIndex(SavedIndex):
+## The alignments as node numbers, in compressed sparse row format: the nodes aligned to source node n are targets[source_offsets[n]:source_offsets[n+1]] (and the other way round).
+    def __init__(self,filename,sindex,tindex,rebuild=False):
+        self.stamp = [file_stamp(filename),sindex.data['stamp'],tindex.data['stamp']]
+        self.sindex = sindex
+        self.tindex = tindex
+        self.open(filename,rebuild)
+
+    def csr(self,pairs,nr_nodes):
+        pairs.sort()
+        offsets = array('i',[0]*(nr_nodes+1))
+        for (a,b) in pairs:
+            offsets[a+1] += 1
+        for i in range(nr_nodes):
+            offsets[i+1] += offsets[i]
+        return (offsets,array('i',[b for (a,b) in pairs]))
+
+    def build(self):
+        (sindex,tindex) = (self.sindex,self.tindex)
+        pairs = []
+        for pair in lib("sta").GetInfo().get_node_pairs(self.filename):
+            (s_id,t_id) = pair.split(";")
+            s = sindex.get_node_number(s_id)
+            t = tindex.get_node_number(t_id)
+            if s != -1 and t != -1:
+                pairs.append((s,t))
+        (source_offsets,targets) = self.csr(pairs,len(sindex.data['node_ids']))
+        (target_offsets,sources) = self.csr([(t,s) for (s,t) in pairs],len(tindex.data['node_ids']))
+        return {
+            'source_offsets': source_offsets,
+            'targets': targets,
+            'target_offsets': target_offsets,
+            'sources': sources,
+        }
+
+    def aligned(self,node,side):
+## Returns the node numbers aligned to a node number on the given side (0: source, 1: target).
+        if side == 0:
+            (offsets,nodes) = (self.data['source_offsets'],self.data['targets'])
+        else:
+            (offsets,nodes) = (self.data['target_offsets'],self.data['sources'])
+        return nodes[offsets[node]:offsets[node+1]]
+
+class Query:
+## Query API over a parallel treebank, given its STA-XML file. The treebanks are found with sta.Files.get_treebank_files.
+    def __init__(self,alignment_file,rebuild=False):
+        from lxml import etree
+        with files.CompressedFile().open_read(alignment_file) as f:
+            align_tree = etree.parse(f)
+        tree_files = lib("sta").Files().get_treebank_files(align_tree,os.path.abspath(alignment_file))
+        self.treebanks = [TreebankIndex(tree_files[0],rebuild),TreebankIndex(tree_files[1],rebuild)]
+        self.alignments = AlignmentIndex(alignment_file,self.treebanks[0],self.treebanks[1],rebuild)
+
+    def nodes(self,side,**conditions):
+## Returns the IDs of all nodes on the given side (0: source, 1: target) that match the conditions, e.g. nodes(0,cat="NP").
+        index = self.treebanks[side]
+        nodes = index.nodes(**conditions)
+        if nodes is None:
+            nodes = range(len(index.data['node_ids']))
+        return index.node_ids(nodes)
+
+    def sentences(self,side,**conditions):
+## Returns the IDs of all sentences on the given side that contain a node matching all conditions, e.g. sentences(1,word="house").
+        index = self.treebanks[side]
+        nodes = index.nodes(**conditions)
+        if nodes is None:
+            return list(index.data['sent_ids'])
+        return index.sentences(nodes)
+
+    def aligned(self,source_conditions,target_conditions):
+## Returns (source ID, target ID) pairs of aligned nodes that match the conditions on either side, e.g. aligned({'cat': "NP"},{'cat': "VP"}).
+## The lookup starts from the side with fewer matching nodes.
+        snodes = self.treebanks[0].nodes(**source_conditions)
+        tnodes = self.treebanks[1].nodes(**target_conditions)
+        if snodes is None:
+            snodes = range(len(self.treebanks[0].data['node_ids']))
+        if tnodes is None:
+            tnodes = range(len(self.treebanks[1].data['node_ids']))
+        pairs = []
+        if len(snodes) <= len(tnodes):
+            other = set(tnodes)
+            for s in snodes:
+                for t in self.alignments.aligned(s,0):
+                    if t in other:
+                        pairs.append((s,t))
+        else:
+            other = set(snodes)
+            for t in tnodes:
+                for s in self.alignments.aligned(t,1):
+                    if s in other:
+                        pairs.append((s,t))
+            pairs.sort()
+        (sids,tids) = (self.treebanks[0].data['node_ids'],self.treebanks[1].data['node_ids'])
+        return [(sids[s],tids[t]) for (s,t) in pairs]
+
+METADATA = ("type","author","last_change")
+
+class MetadataBuilder:
+## lxml parser target that collects the node pair and the type, author and last_change attributes of each <align>.
+    def __init__(self):
+        self.sources = []
+        self.targets = []
+        self.values = {a: {} for a in METADATA}
+        self.columns = {a: array('i') for a in METADATA}
+        self.nodes = None
+
+    def start(self,tag,attrib):
+        if tag == "node":
+            if self.nodes is not None:
+                self.nodes.append(attrib.get('node_id'))
+        elif tag == "align":
+            self.nodes = []
+            for a in METADATA:
+                self.columns[a].append(self.values[a].setdefault(attrib.get(a,""),len(self.values[a])))
+
+    def end(self,tag):
+        if tag == "align":
+            self.sources.append(self.nodes[0])
+            self.targets.append(self.nodes[1])
+            self.nodes = None
+
+    def close(self):
+        data = {'sources': self.sources, 'targets': self.targets}
+        for a in METADATA:
+            values = self.values[a]
+            codes = self.columns[a]
+            if a == "last_change":
+                ## Dates are dictionary-encoded in sorted order, so that a date range is a range of codes. ISO dates (e.g. 2017-08-17) sort correctly as strings.
+                order = sorted(values)
+                recode = array('i',[0]*len(values))
+                for new,value in enumerate(order):
+                    recode[values[value]] = new
+                codes = array('i',[recode[c] for c in codes])
+                data['date_rows'] = array('i',sorted(range(len(codes)),key=lambda row: codes[row]))
+                data['date_codes'] = array('i',[codes[row] for row in data['date_rows']])
+            else:
+                order = sorted(values,key=values.get)
+            postings = [array('i') for v in order]
+            for row,c in enumerate(codes):
+                postings[c].append(row)
+            data[a] = {'values': order, 'codes': codes, 'postings': postings}
+        return data
+
+class MetadataIndex(SavedIndex):
+## Index of the alignment metadata (type, author and last_change of each <align>), saved as <alignment file>.meta.idx.
+## Rows are numbered in the order of the <align> elements in the file. type and author are dictionary-encoded with a posting list of rows for each value, and rows are also sorted by date, so that all filters are lookups rather than scans.
+## Example:
+## meta = index.MetadataIndex("ALM-308.xml")
+## rows = meta.filter(type="fuzzy",author="OLEG",since="2017-06-01")
+## for (source_id,target_id,type,author,last_change) in meta.iter_rows(rows): ...
+## meta.export(rows,"ALM-308.fuzzy.xml")
+    suffix = ".meta.idx"
+
+    def __init__(self,filename,rebuild=False):
+        self.stamp = file_stamp(filename)
+        self.open(filename,rebuild)
+
+    def build(self):
+        return self.parse(MetadataBuilder())
+
+    def __len__(self):
+        return len(self.data['sources'])
+
+    def value_rows(self,attribute,value):
+## Rows with the given value (or any of a list of values) for type or author.
+        column = self.data[attribute]
+        if isinstance(value,str):
+            value = [value]
+        rows = []
+        for v in value:
+            if v in column['values']:
+                rows.extend(column['postings'][column['values'].index(v)])
+        return array('i',sorted(rows))
+
+    def date_rows(self,since=None,until=None):
+## Rows with since <= last_change <= until (both optional). until includes the whole day, e.g. until="2017-08-17" includes "2017-08-17 14:10".
+## Alignments without a last_change (stored as "", which sorts first) never match.
+        values = self.data['last_change']['values']
+        lo = bisect.bisect_right(values,"") if since is None else bisect.bisect_left(values,since)
+        hi = len(values) if until is None else bisect.bisect_right(values,until+"\uffff")
+        date_codes = self.data['date_codes']
+        start = bisect.bisect_left(date_codes,lo)
+        end = bisect.bisect_left(date_codes,hi)
+        return array('i',sorted(self.data['date_rows'][start:end]))
+
+    def filter(self,type=None,author=None,since=None,until=None):
+## Returns the sorted row numbers of all alignments that match all given conditions.
+        result = None
+        selections = []
+        if type is not None:
+            selections.append(self.value_rows("type",type))
+        if author is not None:
+            selections.append(self.value_rows("author",author))
+        if since is not None or until is not None:
+            selections.append(self.date_rows(since,until))
+        for rows in sorted(selections,key=len):
+            result = rows if result is None else intersect(result,rows)
+        if result is None:
+            return array('i',range(len(self)))
+        return result
+
+    def iter_rows(self,rows):
+## Yields (source ID, target ID, type, author, last_change) for the given rows.
+        columns = [self.data[a] for a in METADATA]
+        for row in rows:
+            yield tuple([self.data['sources'][row],self.data['targets'][row]]+[c['values'][c['codes'][row]] for c in columns])
+
+    def export(self,rows,output,pretty_print=True):
+## Writes a STA-XML file with the same header and only the <align> elements of the given rows.
+## The alignment file is read incrementally and the selected elements are streamed to the output (optionally compressed).
+        from lxml import etree
+        rows = set(rows)
+        with files.CompressedFile().open_read(self.filename) as f:
+            context = etree.iterparse(f,events=("start","end"),huge_tree=True)
+            root = None
+            for event,el in context:
+                if event == "start" and el.tag == "alignments":
+                    root = el.getparent() ## the header is complete at this point
+                    break
+            if root is None:
+                raise ValueError("No <alignments> found in %s" % (self.filename))
+            with files.CompressedFile().open_write(output) as out:
+                lib("writer").StreamWriter(pretty_print).write_sta(out,root,self.select(context,rows))
+
+    def select(self,context,rows):
+        row = 0
+        for event,el in context:
+            if event == "end" and el.tag == "align":
+                if row in rows:
+                    yield el
+                row += 1
+                el.clear()
+                while el.getprevious() is not None:
+                    del el.getparent()[0]
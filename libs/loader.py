@@ -0,0 +1,168 @@
+#!/usr/bin/python3
+
+import re, os, mmap, bisect
+from multiprocessing import Pool
+from lxml import etree
+if __package__:
+    from . import files
+else:
+    import files
+
+## Parses a single large TIGER-XML file in parallel.
+## Instead of parsing the whole file with etree.parse or objectify.parse, the <s> boundaries are found with a byte scan (a regular expression over the raw file, which is memory-mapped if it is not compressed).
+## The <body> is then split into chunks of complete sentences, and each chunk is parsed by a worker process. Workers return only plain Python data (e.g. their part of the node -> sentence ID index), which is merged in document order.
+## Example:
+## loader = loader.ChunkedLoader(processes=8)
+## snodes = loader.link_nodes_to_sentids("de.xml") ## same dictionary as tiger.GetInfo().link_nodes_to_sentids(etree.parse("de.xml"))
+
+XML_DECLARATION = re.compile(rb'\s*<\?xml[^>]*\?>')
+ROOT_START = re.compile(rb'<([A-Za-z_][^\s/>]*)[^>]*>') ## first start tag, i.e. the root element (<corpus ...>)
+SENT_START = re.compile(rb'<s[\s>]')
+SENT_END = b'</s>'
+BODY_START = b'<body'
+BODY_END = b'</body>'
+ALIGNMENTS_START = re.compile(rb'<alignments(\s[^>]*?)?(/?)>') ## STA-XML; group 2 is "/" for <alignments/>
+
+def root_start(data):
+## Returns the match of the start tag of the root element, after the XML declaration if there is one.
+    declaration = XML_DECLARATION.match(data)
+    return ROOT_START.search(data,declaration.end() if declaration else 0)
+
+def read_sta_header(data,filename):
+## Parses only the header of STA-XML data (everything before <alignments>). Returns the root element with the header, and the match of the <alignments> start tag.
+    start = ALIGNMENTS_START.search(data)
+    if start is None:
+        raise ValueError("No <alignments> found in %s" % (filename))
+    root = etree.fromstring(bytes(data[:start.start()])+b"</"+root_start(data).group(1)+b">")
+    return (root,start)
+
+def read_chunk(task):
+## Worker function: parses a chunk of sentences and applies the task's function to its root element.
+## The chunk is wrapped in the XML declaration and the root start tag of the original file, so that the encoding and any namespace prefixes are still declared.
+## If the task has a line offset, it is passed on to the function as a second argument: element.sourceline+line_offset is the line of the element in the original file.
+    (function,wrapper_start,wrapper_end,source,start,end) = task[:6]
+    if isinstance(source,bytes):
+        chunk = source
+    else:
+        with open(source,"rb") as f:
+            f.seek(start)
+            chunk = f.read(end-start)
+    root = etree.fromstring(wrapper_start+chunk+wrapper_end)
+    if len(task) > 6:
+        return function(root,task[6])
+    return function(root)
+
+def index_sents(root):
+## Same as tiger.GetInfo.link_nodes_to_sentids, for the sentences in a chunk.
+    linked_nodes = {}
+    for s in root.iter("s"):
+        sentid=s.attrib['id']
+        for t in s.iter("t"):
+            linked_nodes[t.attrib['id']] = sentid
+        for nt in s.iter("nt"):
+            linked_nodes[nt.attrib['id']] = sentid
+    return linked_nodes
+
+class ChunkedLoader:
+    def __init__(self,processes=None):
+        if processes is None:
+            processes = os.cpu_count() or 1
+        self.processes = processes
+        self.compressed_file = files.CompressedFile()
+        self.file_name = files.FileName()
+
+    def read(self,filename):
+## Returns the contents of the file: memory-mapped for plain files, decompressed bytes otherwise.
+        if self.file_name.getCompression(filename):
+            with self.compressed_file.open_read(filename) as f:
+                return f.read()
+        with open(filename,"rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+
+    def scan(self,data):
+## Returns the wrapper (XML declaration and root start tag, root end tag) and the byte offsets of all <s> start tags.
+## The last offset in the list is the end of the last sentence (the position of </body>).
+        declaration = XML_DECLARATION.match(data)
+        if declaration:
+            wrapper_start = declaration.group(0)
+            pos = declaration.end()
+        else:
+            wrapper_start = b""
+            pos = 0
+        root = ROOT_START.search(data,pos)
+        if not root:
+            raise ValueError("No root element found!")
+        wrapper_start += root.group(0)
+        wrapper_end = b"</"+root.group(1)+b">"
+        body_start = data.find(BODY_START,root.end())
+        if body_start == -1:
+            body_start = root.end()
+        offsets = [m.start() for m in SENT_START.finditer(data,body_start)]
+        if offsets:
+            body_end = data.find(BODY_END,offsets[-1])
+            if body_end == -1:
+                body_end = data.rfind(SENT_END)+len(SENT_END)
+            offsets.append(body_end)
+        return (wrapper_start,wrapper_end,offsets)
+
+    def get_sent_spans(self,data,offsets):
+## Given the offsets returned by scan, returns a (start,end) pair for each sentence, with end directly after its </s>.
+        spans = []
+        for i in range(len(offsets)-1):
+            end = data.rfind(SENT_END,offsets[i],offsets[i+1])+len(SENT_END)
+            spans.append((offsets[i],end))
+        return spans
+
+    def get_chunks(self,offsets,nr_chunks):
+## Splits the sentences into nr_chunks ranges of (roughly) equal size in bytes. Each range starts at a sentence boundary.
+        if len(offsets) < 2:
+            return []
+        first = offsets[0]
+        last = offsets[-1]
+        size = (last-first)/nr_chunks
+        bounds = [0]
+        for i in range(1,nr_chunks):
+            k = bisect.bisect_left(offsets,first+i*size,bounds[-1]+1,len(offsets)-1)
+            if k > bounds[-1] and k < len(offsets)-1:
+                bounds.append(k)
+        bounds.append(len(offsets)-1)
+        return [(offsets[bounds[i]],offsets[bounds[i+1]]) for i in range(len(bounds)-1)]
+
+    def map_chunks(self,function,filename,nr_chunks=None,line_numbers=False):
+## Applies function (a module-level function that receives the root element of a parsed chunk) to all chunks of the file in a process pool.
+## Returns the results as a list, in document order.
+## line_numbers: also pass each function the line offset of its chunk (see read_chunk), counted during the scan, so that errors can be reported with their line in the file.
+        if nr_chunks is None:
+            nr_chunks = self.processes*4
+        data = self.read(filename)
+        (wrapper_start,wrapper_end,offsets) = self.scan(data)
+        tasks = []
+        wrapper_lines = wrapper_start.count(b"\n")
+        lines = 0 ## newlines before the start of the current chunk
+        pos = 0
+        for (start,end) in self.get_chunks(offsets,nr_chunks):
+            if isinstance(data,mmap.mmap):
+                source = filename ## workers read the chunk from the file themselves
+            else:
+                source = data[start:end]
+            task = (function,wrapper_start,wrapper_end,source,start,end)
+            if line_numbers:
+                lines += data[pos:start].count(b"\n") ## mmap has no count()
+                pos = start
+                task += (lines-wrapper_lines,)
+            tasks.append(task)
+        if isinstance(data,mmap.mmap):
+            data.close()
+        if self.processes == 1 or len(tasks) < 2:
+            return [read_chunk(t) for t in tasks]
+        with Pool(min(self.processes,len(tasks))) as pool:
+            return pool.map(read_chunk,tasks)
+
+    def link_nodes_to_sentids(self,filename,nr_chunks=None):
+## Parallel version of tiger.GetInfo.link_nodes_to_sentids, reading the treebank from a file.
+        linked_nodes = {}
+        for part in self.map_chunks(index_sents,filename,nr_chunks):
+            linked_nodes.update(part)
+        return linked_nodes
@@ -0,0 +1,213 @@
+#!/usr/bin/python3
+
+import re, sys, heapq, pickle, tempfile, itertools
+from lxml import etree
+if __package__:
+    from . import files, tiger, writer
+else:
+    import files, tiger, writer
+
+## Merges and compares STA-XML files of several annotators who aligned the same parallel treebank.
+## The alignments of each file are read incrementally and reduced to small tuples, keyed by (sentence pair, node pair). Files written by the Stockholm TreeAligner are normally already in this order, so the files are streamed as they are and merged in a single k-way pass (heapq.merge), so that all links of all annotators for the same node pair arrive together. Memory use does not grow with the number of alignments.
+## Before the merge, each file is read once to check its order. If a key goes backwards, the links from there on are sorted externally right away (in sorted runs of RUN_SIZE links in temporary files), and are merged with the links before it, which are read again from the file.
+## Each group of links is classified as:
+## - agreement: all annotators have the link, with the same type
+## - conflict: at least two annotators have the link, but with different types
+## - partial: more than one but not all annotators have the link, with the same type
+## - one-sided: only one annotator has the link
+## Example:
+## merger = merge.AlignmentMerger(["oleg.xml","gideon.xml"])
+## stats = merger.merge("merged.xml",policy="majority",diff_file="diff.tsv")
+
+NUMBER = re.compile(r'([0-9]+)')
+RUN_SIZE = 100000 ## links per sorted run of the external sort
+
+def read_run(run):
+    run.seek(0)
+    try:
+        while True:
+            yield pickle.load(run)
+    except EOFError:
+        pass
+    finally:
+        run.close()
+
+def natural_key(id):
+## Sort key in which numbers are compared as numbers, e.g. s9_2 < s10_1.
+    return tuple(int(part) if part.isdigit() else part for part in NUMBER.split(id))
+
+class AlignmentMerger:
+    def __init__(self,alignment_files):
+        self.alignment_files = alignment_files
+        self.tiger_getinfo = tiger.GetInfo()
+        self.root = None ## header of the first file, used for the merged file
+
+    def key(self,s_id,t_id):
+        return (natural_key(self.tiger_getinfo.get_sentid(s_id)),natural_key(self.tiger_getinfo.get_sentid(t_id)),natural_key(s_id),natural_key(t_id))
+
+    def parse(self,nr):
+## Yields the alignments of a file in file order as (key, file number, align attributes, source node attributes, target node attributes).
+## The file is read incrementally and elements are discarded once their attributes have been taken.
+        with files.CompressedFile().open_read(self.alignment_files[nr]) as f:
+            for event,el in etree.iterparse(f,events=("start","end"),huge_tree=True):
+                if event == "start":
+                    if el.tag == "alignments" and nr == 0:
+                        self.root = el.getparent()
+                    continue
+                if el.tag != "align":
+                    continue
+                snode = dict(el[0].attrib)
+                tnode = dict(el[1].attrib)
+                item = (self.key(snode['node_id'],tnode['node_id']),nr,dict(el.attrib),snode,tnode)
+                el.clear()
+                while el.getprevious() is not None:
+                    del el.getparent()[0]
+                yield item
+
+    def sort_runs(self,items):
+## Sorts the items in runs of RUN_SIZE, which are written to temporary files. Returns a reader for each run.
+        runs = []
+        for run_items in iter(lambda: list(itertools.islice(items,RUN_SIZE)),[]):
+            run_items.sort(key=lambda item: item[0])
+            run = tempfile.TemporaryFile()
+            for item in run_items:
+                pickle.dump(item,run,protocol=pickle.HIGHEST_PROTOCOL)
+            runs.append(run)
+        return [read_run(run) for run in runs]
+
+    def check_order(self,nr):
+## Reads a file to check whether its alignments are in key order. Returns None if they are.
+## Otherwise, the links from the first one out of order on are sorted into runs right away, and the number of links before it is returned with the runs.
+        items = self.parse(nr)
+        previous = None
+        for count,item in enumerate(items):
+            if previous is not None and item[0] < previous:
+                print("merge.py: Warning: The alignments of %s are not sorted by sentence and node IDs, sorting them first." % (self.alignment_files[nr]),file=sys.stderr)
+                return (count,self.sort_runs(itertools.chain([item],items)))
+            previous = item[0]
+        return None
+
+    def read(self,nr,order):
+## Yields the alignments of a file in key order. order is the result of check_order: for a file that is not in order, its sorted beginning is read again and merged with the sorted runs of the rest.
+        if order is None:
+            return self.parse(nr)
+        (count,runs) = order
+        return heapq.merge(itertools.islice(self.parse(nr),count),*runs,key=lambda item: item[0])
+
+    def groups(self):
+## Yields, for each node pair, the list of links of all annotators (at most one per annotator), in key order.
+        orders = [self.check_order(nr) for nr in range(len(self.alignment_files))]
+        readers = [self.read(nr,order) for nr,order in enumerate(orders)]
+        merged = heapq.merge(*readers,key=lambda item: (item[0],item[1]))
+        for key,links in itertools.groupby(merged,key=lambda item: item[0]):
+            group = []
+            seen = set()
+            for link in links:
+                if link[1] not in seen: ## duplicates within one file count once
+                    seen.add(link[1])
+                    group.append(link)
+            yield group
+
+    def classify(self,group):
+        k = len(self.alignment_files)
+        types = {link[2].get('type',"") for link in group}
+        if len(group) == 1:
+            return "one-sided"
+        if len(types) > 1:
+            return "conflict"
+        if len(group) == k:
+            return "agreement"
+        return "partial"
+
+    def majority_link(self,group):
+## Returns the link with the most frequent type (ties go to the annotator listed first).
+        counts = {}
+        for link in group:
+            type = link[2].get('type',"")
+            counts[type] = counts.get(type,0)+1
+        best = max(counts.values())
+        for link in group:
+            if counts[link[2].get('type',"")] == best:
+                return link
+
+    def keep(self,group,policy):
+        k = len(self.alignment_files)
+        if policy == "union":
+            return True
+        elif policy == "intersection":
+            return len(group) == k
+        elif policy == "majority":
+            return len(group)*2 > k
+        raise ValueError("Unknown merge policy: %s" % (policy))
+
+    def to_element(self,link):
+        (key,nr,attrib,snode,tnode) = link
+        align = etree.Element("align",attrib)
+        etree.SubElement(align,"node",snode)
+        etree.SubElement(align,"node",tnode)
+        return align
+
+    def merge(self,output=None,policy="union",diff_file=None,pretty_print=True):
+## Merges all files in one pass. Writes the merged alignments to output (if given), the links that are not agreements to diff_file (if given) and returns the statistics.
+## policy: "union" (all links), "majority" (links of more than half of the annotators) or "intersection" (links of all annotators). Links with conflicting types get the majority type.
+        k = len(self.alignment_files)
+        stats = {
+            'links': [0]*k, ## links per annotator
+            'node_pairs': 0, ## distinct node pairs over all annotators
+            'agreement': 0,
+            'partial': 0,
+            'conflict': 0,
+            'one-sided': [0]*k, ## per annotator
+            'merged': 0,
+            'pairwise': {}, ## (i,j) => [shared links, shared links with the same type]
+        }
+        for i,j in itertools.combinations(range(k),2):
+            stats['pairwise'][(i,j)] = [0,0]
+        diff = open(diff_file,"w") if diff_file else None
+        if diff:
+            diff.write("source\ttarget\tstatus\t"+"\t".join(self.alignment_files)+"\n")
+
+        def merged_links():
+            for group in self.groups():
+                stats['node_pairs'] += 1
+                status = self.classify(group)
+                types = {}
+                for link in group:
+                    stats['links'][link[1]] += 1
+                    types[link[1]] = link[2].get('type',"")
+                if status == "one-sided":
+                    stats['one-sided'][group[0][1]] += 1
+                else:
+                    stats[status] += 1
+                for i,j in itertools.combinations(sorted(types),2):
+                    stats['pairwise'][(i,j)][0] += 1
+                    if types[i] == types[j]:
+                        stats['pairwise'][(i,j)][1] += 1
+                if diff and status != "agreement":
+                    diff.write("%s\t%s\t%s\t%s\n" % (group[0][3]['node_id'],group[0][4]['node_id'],status,"\t".join(types.get(nr,"-") for nr in range(k))))
+                if self.keep(group,policy):
+                    stats['merged'] += 1
+                    yield self.to_element(self.majority_link(group))
+
+        try:
+            if output:
+                links = merged_links()
+                first = next(links,None) ## starts reading all files, so that the header of the first file is available
+                with files.CompressedFile().open_write(output) as out:
+                    writer.StreamWriter(pretty_print).write_sta(out,self.root,itertools.chain([first] if first is not None else [],links))
+            else:
+                for link in merged_links():
+                    pass
+        finally:
+            if diff:
+                diff.close()
+        return stats
+
+    def agreement(self,stats):
+## Pairwise agreement between annotators as the Dice coefficient (F1) of their link sets, without and with types:
+## {(i,j): (dice, dice with types)}
+        result = {}
+        for (i,j),(shared,same_type) in stats['pairwise'].items():
+            total = stats['links'][i]+stats['links'][j]
+            result[(i,j)] = (2*shared/total if total else 0.0,2*same_type/total if total else 0.0)
+        return result
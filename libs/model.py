@@ -0,0 +1,376 @@
+#!/usr/bin/python3
+
+import re, copy
+from lxml import etree
+if __package__:
+    from . import files, tiger, writer
+else:
+    import files, tiger, writer
+
+## A compact in-memory model of TIGER-XML treebanks, as an alternative to lxml element trees for analytical passes.
+## Sentences and nodes are plain objects with __slots__; an edge refers to its child by its integer index in the sentence (terminals first, then nonterminals) instead of by its idref string.
+## Sentence and node IDs are integers: each ID string is stored once, in the string table of the treebank (Treebank.ids, shared by its sentences), and is only looked up again for queries and for writing TIGER-XML.
+## Elements inside a sentence that the model does not know (e.g. other children of <s>) are kept as lxml elements in Sentence.extra_elements, and written back in the same place.
+## The model is built directly from parser events (lxml parser target interface), so no element tree of the body is ever created.
+## Example:
+## treebank = model.parse("de.xml")
+## model.GetInfo().link_nodes_to_sentids(treebank) ==> same as tiger.GetInfo().link_nodes_to_sentids(etree.parse("de.xml"))
+## sent = treebank.sentences[0]
+## sent.string(sent.terminals[0].id) ==> "s1_1"
+## treebank.write("de.copy.xml") ==> back to TIGER-XML
+
+class Terminal:
+    __slots__ = ("id","word","lemma","pos","extra","secedges")
+    def __init__(self,id,word,lemma,pos,extra=None):
+        self.id = id ## number of the ID in the string table, or -1 if the node has no ID
+        self.word = word
+        self.lemma = lemma
+        self.pos = pos
+        self.extra = extra ## any other attributes, as a tuple of (name,value) pairs, or None
+        self.secedges = None ## <secedge> elements under the terminal, if any
+
+class NonTerminal:
+    __slots__ = ("id","cat","extra","edges")
+    def __init__(self,id,cat,extra=None):
+        self.id = id
+        self.cat = cat
+        self.extra = extra
+        self.edges = [] ## <edge> and <secedge> elements, in order
+
+class Edge:
+    __slots__ = ("label","child","idref","secondary","extra")
+    def __init__(self,label,idref,secondary=False,extra=None):
+        self.label = label
+        self.child = -1 ## index of the child node in Sentence.nodes, or -1 if the idref does not exist in the sentence
+        self.idref = idref ## number of the idref in the string table, only kept if the child does not exist (set to -1 once resolved)
+        self.secondary = secondary ## True for <secedge>
+        self.extra = extra
+
+class Sentence:
+    __slots__ = ("id","extra","graph","terminals","nonterminals","extra_elements","ids")
+    def __init__(self,id,ids,extra=None):
+        self.id = id
+        self.ids = ids ## the string table of the treebank
+        self.extra = extra
+        self.graph = () ## attributes of <graph>, e.g. (("root","s1_502"),)
+        self.terminals = []
+        self.nonterminals = []
+        self.extra_elements = None ## other elements in the sentence, as (parent tag, index of the parent's node in nodes() or -1, index of the parent's edge or -1, position among the children of the parent, element), or None
+
+    def string(self,number):
+## Returns the ID string with the given number, or None for -1.
+        return self.ids[number] if number != -1 else None
+
+    def node(self,index):
+        nr_terminals = len(self.terminals)
+        if index < nr_terminals:
+            return self.terminals[index]
+        return self.nonterminals[index-nr_terminals]
+
+    def nodes(self):
+        return self.terminals+self.nonterminals
+
+    def get_idref(self,edge):
+## Returns the idref of an edge, as it would appear in TIGER-XML.
+        if edge.child == -1:
+            return self.string(edge.idref)
+        return self.string(self.node(edge.child).id)
+
+    def resolve_edges(self):
+## Replaces idref strings with child indices, once all nodes of the sentence are known.
+        index = {}
+        for i,node in enumerate(self.nodes()):
+            index[node.id] = i
+        for node in self.nodes():
+            for e in (node.edges if isinstance(node,NonTerminal) else node.secedges or ()):
+                child = index.get(e.idref,-1) if e.idref != -1 else -1
+                if child != -1:
+                    e.child = child
+                    e.idref = -1
+
+    def to_element(self):
+## Returns the sentence as an lxml.etree <s> element.
+        s = etree.Element("s")
+        set_attribute(s,"id",self.string(self.id))
+        add_attributes(s,self.extra)
+        graph = etree.SubElement(s,"graph")
+        add_attributes(graph,self.graph)
+        parents = {("s",-1,-1): s, ("graph",-1,-1): graph} ## where the extra elements go
+        terminals = parents[("terminals",-1,-1)] = etree.SubElement(graph,"terminals")
+        for i,t in enumerate(self.terminals):
+            el = parents[("t",i,-1)] = etree.SubElement(terminals,"t")
+            set_attribute(el,"id",self.string(t.id))
+            set_attribute(el,"word",t.word)
+            set_attribute(el,"lemma",t.lemma)
+            set_attribute(el,"pos",t.pos)
+            add_attributes(el,t.extra)
+            for j,e in enumerate(t.secedges or ()):
+                parents[("secedge",i,j)] = self.edge_to_element(el,e)
+        nonterminals = parents[("nonterminals",-1,-1)] = etree.SubElement(graph,"nonterminals")
+        for i,nt in enumerate(self.nonterminals,len(self.terminals)):
+            el = parents[("nt",i,-1)] = etree.SubElement(nonterminals,"nt")
+            set_attribute(el,"id",self.string(nt.id))
+            set_attribute(el,"cat",nt.cat)
+            add_attributes(el,nt.extra)
+            for j,e in enumerate(nt.edges):
+                parents[("secedge" if e.secondary else "edge",i,j)] = self.edge_to_element(el,e)
+        for (parent,node,edge,position,element) in self.extra_elements or ():
+            parents[(parent,node,edge)].insert(position,copy.deepcopy(element))
+        return s
+
+    def edge_to_element(self,parent,e):
+        el = etree.SubElement(parent,"secedge" if e.secondary else "edge")
+        set_attribute(el,"label",e.label)
+        set_attribute(el,"idref",self.get_idref(e))
+        add_attributes(el,e.extra)
+        return el
+
+def set_attribute(el,name,value):
+    if value is not None:
+        el.set(name,value)
+
+def add_attributes(el,extra):
+    for (name,value) in extra or ():
+        el.set(name,value)
+
+def get_extra(attrib,known):
+    extra = tuple((k,v) for k,v in attrib.items() if k not in known)
+    return extra or None
+
+class Treebank:
+    __slots__ = ("root","sentences","ids")
+    def __init__(self,root,sentences,ids):
+        self.root = root ## the root element with the header (e.g. <head>) and an empty <body>
+        self.sentences = sentences
+        self.ids = ids ## string table: all sentence and node IDs (and idrefs of dangling edges), each once
+
+    def write(self,filename,pretty_print=True):
+## Writes the treebank as TIGER-XML (optionally compressed, depending on the extension).
+        with files.CompressedFile().open_write(filename) as f:
+            writer.StreamWriter(pretty_print).write_tiger(f,self.root,(s.to_element() for s in self.sentences))
+
+class TreebankBuilder:
+## lxml parser target that builds a Treebank.
+## Everything outside <body> is passed on to an etree.TreeBuilder, so that the header can be written again. Everything inside <body> becomes Sentence objects, with the IDs interned in one string table.
+## Unknown elements inside a sentence (and everything in them) are passed on to a TreeBuilder of their own, and kept in Sentence.extra_elements.
+    def __init__(self):
+        self.header = etree.TreeBuilder()
+        self.in_body = 0
+        self.sentences = []
+        self.ids = []
+        self.numbers = {} ## ID string => number in self.ids, only while building
+        self.sent = None
+        self.node = None
+        self.path = [] ## (tag, number of child elements so far) of the known elements from <s> down to the current element
+        self.other = None ## TreeBuilder of the current unknown element
+        self.other_depth = 0
+        self.failed = False
+
+    def intern(self,string):
+        if string is None:
+            return -1
+        number = self.numbers.get(string)
+        if number is None:
+            number = self.numbers[string] = len(self.ids)
+            self.ids.append(string)
+        return number
+
+    def error(self,message):
+## Raises a ValueError for a structure the model cannot represent. lxml raises it from parse, after calling close.
+        self.failed = True
+        if self.sent is not None:
+            message = "Sentence %s: %s" % (self.sent.string(self.sent.id),message)
+        raise ValueError(message)
+
+    def start(self,tag,attrib,nsmap=None):
+        if not self.in_body:
+            self.header.start(tag,attrib,nsmap)
+            if tag == "body":
+                self.in_body = 1
+            return
+        if self.other_depth:
+            self.other.start(tag,attrib,nsmap)
+            self.other_depth += 1
+            return
+        if tag != "s" and self.sent is None:
+            self.error("<%s> in <body> outside of a sentence" % (tag))
+        if self.path:
+            position = self.path[-1][1]
+            self.path[-1][1] += 1
+        if tag == "t" and self.path[-1][0] == "terminals":
+            self.node = Terminal(self.intern(attrib.get('id')),attrib.get('word'),attrib.get('lemma'),attrib.get('pos'),get_extra(attrib,("id","word","lemma","pos")))
+            self.sent.terminals.append(self.node)
+        elif tag == "nt" and self.path[-1][0] == "nonterminals":
+            self.node = NonTerminal(self.intern(attrib.get('id')),attrib.get('cat'),get_extra(attrib,("id","cat")))
+            self.sent.nonterminals.append(self.node)
+        elif tag == "edge" or tag == "secedge":
+            if self.path[-1][0] not in ("t","nt") or (tag == "edge" and self.path[-1][0] == "t"):
+                self.error("<%s> is not inside an <nt>%s" % (tag," or <t>" if tag == "secedge" else ""))
+            edge = Edge(attrib.get('label'),self.intern(attrib.get('idref')),tag == "secedge",get_extra(attrib,("label","idref")))
+            if isinstance(self.node,NonTerminal):
+                self.node.edges.append(edge)
+            elif self.node.secedges is None:
+                self.node.secedges = [edge]
+            else:
+                self.node.secedges.append(edge)
+        elif tag == "s" and not self.path:
+            self.sent = Sentence(self.intern(attrib.get('id')),self.ids,get_extra(attrib,("id",)))
+        elif tag == "graph" and self.path[-1][0] == "s":
+            self.sent.graph = tuple(attrib.items())
+        elif (tag,self.path[-1][0]) in (("terminals","graph"),("nonterminals","graph")):
+            pass
+        else:
+            self.start_other(tag,attrib,nsmap,position)
+            return
+        self.path.append([tag,0])
+
+    def start_other(self,tag,attrib,nsmap,position):
+## Starts an unknown element, which is kept with its parent's tag, the index of its node and edge, and its position among the children of its parent.
+        node = -1
+        edge = -1
+        parent = self.path[-1][0]
+        if parent in ("t","nt","edge","secedge"):
+            node = len(self.sent.terminals)-1
+            if isinstance(self.node,NonTerminal):
+                node += len(self.sent.nonterminals)
+        if parent in ("edge","secedge"):
+            edge = len(self.node.edges if isinstance(self.node,NonTerminal) else self.node.secedges)-1
+        self.other = etree.TreeBuilder()
+        self.other.start(tag,attrib,nsmap)
+        self.other_depth = 1
+        if self.sent.extra_elements is None:
+            self.sent.extra_elements = []
+        self.sent.extra_elements.append((parent,node,edge,position,None))
+
+    def end(self,tag):
+        if not self.in_body:
+            self.header.end(tag)
+            return
+        if self.other_depth:
+            self.other.end(tag)
+            self.other_depth -= 1
+            if not self.other_depth:
+                self.sent.extra_elements[-1] = self.sent.extra_elements[-1][:4]+(self.other.close(),)
+                self.other = None
+            return
+        if tag == "body":
+            self.in_body = 0
+            self.header.end(tag)
+            return
+        self.path.pop()
+        if tag == "s":
+            self.sent.resolve_edges()
+            self.sentences.append(self.sent)
+            self.sent = None
+        elif tag == "t" or tag == "nt":
+            self.node = None
+
+    def data(self,data):
+        if not self.in_body:
+            self.header.data(data)
+        elif self.other_depth:
+            self.other.data(data)
+
+    def comment(self,text):
+        if not self.in_body:
+            self.header.comment(text)
+        elif self.other_depth:
+            self.other.comment(text)
+
+    def pi(self,target,data=None):
+        if not self.in_body:
+            self.header.pi(target,data)
+        elif self.other_depth:
+            self.other.pi(target,data)
+
+    def close(self):
+        if self.failed:
+            return None
+        self.numbers = None
+        return Treebank(self.header.close(),self.sentences,self.ids)
+
+def parse(filename):
+## Parses a TIGER-XML file (optionally compressed) into a Treebank.
+    parser = etree.XMLParser(target=TreebankBuilder())
+    with files.CompressedFile().open_read(filename) as f:
+        return etree.parse(f,parser)
+
+class GetInfo:
+## The queries of tiger.GetInfo, for a Treebank instead of an lxml tree. They return ID strings, like tiger.GetInfo.
+    def __init__(self):
+        self.tiger_getinfo = tiger.GetInfo()
+
+    def get_sent_ids(self,treebank):
+        return [s.string(s.id) for s in treebank.sentences]
+
+    def get_unique_sentids_in_sent(self,sent):
+        ids = {sent.string(sent.id)}
+        for node in sent.nodes():
+            ids.add(self.tiger_getinfo.get_sentid(sent.string(node.id)))
+        for nt in sent.nonterminals:
+            for e in nt.edges:
+                if not e.secondary:
+                    ids.add(self.tiger_getinfo.get_sentid(sent.get_idref(e)))
+        return len(ids)
+
+    def get_nr_sents(self,treebank,also_check_other_nodes):
+        non_uniq = []
+        sents_with_two_or_more = []
+        id_dict = {}
+        for s in treebank.sentences:
+            if s.id in id_dict:
+                non_uniq.append(s.string(s.id))
+            else:
+                id_dict[s.id] = 1
+            if also_check_other_nodes and self.get_unique_sentids_in_sent(s) > 1:
+                sents_with_two_or_more.append(s.string(s.id))
+        nr_sents = len(treebank.sentences)
+        return (nr_sents,nr_sents-len(non_uniq),non_uniq,sents_with_two_or_more)
+
+    def any_sentids_have_leading_zeros(self,treebank):
+        leading_zeros = [id for id in self.get_sent_ids(treebank) if re.match('^s?0+[0-9]+', id)]
+        return (int(bool(leading_zeros)),leading_zeros)
+
+    def link_nodes_to_sentids(self,treebank):
+        ids = treebank.ids
+        linked_nodes = {}
+        for s in treebank.sentences:
+            for node in s.nodes():
+                linked_nodes[ids[node.id]] = ids[s.id]
+        return linked_nodes
+
+    def get_nodes(self,treebank,data_type):
+        if data_type not in ("list","dict"):
+            return {}
+        ids = treebank.ids
+        terminals = [ids[t.id] for s in treebank.sentences for t in s.terminals]
+        nonterminals = [ids[nt.id] for s in treebank.sentences for nt in s.nonterminals]
+        if data_type == "list":
+            return terminals+nonterminals
+        nodes = dict.fromkeys(terminals,"t")
+        nodes.update(dict.fromkeys(nonterminals,"nt"))
+        return nodes
+
+    def get_words(self,treebank):
+        return {treebank.ids[t.id]: t.word for s in treebank.sentences for t in s.terminals}
+
+    def get_sent_words(self,sent):
+        return " ".join(t.word for t in sent.terminals).rstrip()
+
+    def nodesarevalid(self,treebank):
+        invalidnodes = []
+        for s in treebank.sentences:
+            for nt in s.nonterminals:
+                for e in nt.edges:
+                    if e.child == -1:
+                        invalidnodes.append(s.string(e.idref))
+        return invalidnodes
+
+    def build_nonterm_links(self,sent):
+## Unlike tiger.GetInfo.build_nonterm_links, receives the Sentence rather than a list of <nt> elements.
+        nlinks = {}
+        for nt in sent.nonterminals:
+            for e in nt.edges:
+                if not e.secondary:
+                    nlinks.setdefault(sent.string(nt.id), []).append(sent.get_idref(e))
+        return nlinks
@@ -0,0 +1,241 @@
+#!/usr/bin/python3
+
+import os, re, datetime, logging
+from lxml import etree
+if __package__:
+    from . import files, extract, loader, writer
+else:
+    import files, extract, loader, writer
+
+## Exports a parallel treebank as plain parallel text and word alignments, e.g. to train the word aligners whose output is used as a feature for tree alignment.
+## Each treebank and the alignment file are read once with parser targets (see extract.py). While reading a treebank, a terminal position index (node ID => sentence number and position) is built, so that the terminal-to-terminal links in the STA-XML can be converted to "i-j" position pairs (Pharaoh format, 0-based) directly.
+## Sentence pairs are written in the order in which they first occur in the alignment file (the aligned_sents order of ten-fold.py):
+## - <prefix>.<source treebank ID>: one tokenised source sentence per line
+## - <prefix>.<target treebank ID>: one tokenised target sentence per line
+## - <prefix>.align: the word links of each sentence pair, e.g. "0-0 1-2 2-1"
+## - <prefix>.ids: the sentence ID pair of each line, e.g. "s12;s12"
+## Example:
+## parallel.ParallelTextExporter().export("ALM-308.xml","ALM-308")
+
+## The WordAlignmentImporter does the reverse: it converts files of word links ("i-j" lines, e.g. from GIZA++ or fast_align, one line per sentence pair) into STA-XML <align> elements.
+## Each treebank is read once into a position => terminal ID table per sentence (extract.Terminals), so every link is converted with two list lookups.
+## The alignments are streamed to a new STA-XML file, or merged into an existing one: the bytes of the existing file are copied up to </alignments>, the new <align> elements are written after them and the rest of the file is copied, so that the existing alignments are not parsed at all.
+## Example:
+## importer = parallel.WordAlignmentImporter(author="GIZA",type="good")
+## importer.import_links("ALM-308.align","nl.xml","en.xml","ALM-308.giza.xml",ids_file="ALM-308.ids")
+## importer.merge_links("ALM-308.align","ALM-308.xml","ALM-308.merged.xml",ids_file="ALM-308.ids")
+
+WHITESPACE = re.compile(r'\s+')
+ALIGNMENTS_END = b'</alignments>'
+COPY_BLOCK = 1<<24
+
+class ParallelTextExporter:
+    def __init__(self):
+        self.compressed_file = files.CompressedFile()
+        self.files_info = files.FileName()
+
+    def read_alignments(self,alignment_file):
+## Returns the resolved treebank filenames, the treebank IDs and the alignments, reading the alignment file once.
+        data = extract.extract(alignment_file,extract.Alignments())
+        dirpath = os.path.dirname(os.path.realpath(alignment_file))
+        treebanks = []
+        for t in data['treebanks']:
+            resolved = self.files_info.check_absolute_path(t,dirpath) if t else ""
+            if resolved == "":
+                raise IOError("Treebank %s referred to in %s not found!" % (t,alignment_file))
+            treebanks.append(resolved)
+        return (treebanks,data['treebank_ids'],data['alignments'])
+
+    def sentence_pairs(self,alignments,snodes,tnodes,types=None):
+## Returns the sentence pairs (source and target sentence numbers) in the order in which they first occur in the alignments, and the position pairs of the terminal links of each sentence pair.
+## types: if given, only links of these types (e.g. ["good"]) are exported as word links. All alignments still determine the sentence pairs.
+        pairs = {}
+        for (s_id,t_id,type) in alignments:
+            if s_id not in snodes or t_id not in tnodes:
+                continue
+            (ssent,spos) = snodes[s_id]
+            (tsent,tpos) = tnodes[t_id]
+            links = pairs.setdefault((ssent,tsent),set())
+            if spos != -1 and tpos != -1 and (types is None or type in types):
+                links.add((spos,tpos))
+        return pairs
+
+    def tokens(self,words):
+        return " ".join(WHITESPACE.sub("_",w) for w in words)
+
+    def export(self,alignment_file,prefix,types=None,compress=None):
+## Writes the files described above and returns the number of sentence pairs.
+## compress: optional compression extension (gz, xz or zst) added to all output files.
+        (treebanks,ids,alignments) = self.read_alignments(alignment_file)
+        source = extract.extract(treebanks[0],extract.Terminals())
+        target = extract.extract(treebanks[1],extract.Terminals())
+        pairs = self.sentence_pairs(alignments,source['nodes'],target['nodes'],types)
+        if len(ids) < 2 or not ids[0] or not ids[1] or ids[0] == ids[1]:
+            ids = ["src","trg"]
+        ext = "."+compress if compress else ""
+        with self.compressed_file.open_write(prefix+"."+ids[0]+ext) as sout, \
+             self.compressed_file.open_write(prefix+"."+ids[1]+ext) as tout, \
+             self.compressed_file.open_write(prefix+".align"+ext) as aout, \
+             self.compressed_file.open_write(prefix+".ids"+ext) as iout:
+            for (ssent,tsent),links in pairs.items():
+                sout.write((self.tokens(source['words'][ssent])+"\n").encode("utf-8"))
+                tout.write((self.tokens(target['words'][tsent])+"\n").encode("utf-8"))
+                aout.write((" ".join("%s-%s" % link for link in sorted(links))+"\n").encode("utf-8"))
+                iout.write(("%s;%s\n" % (source['sent_ids'][ssent],target['sent_ids'][tsent])).encode("utf-8"))
+        return len(pairs)
+
+class WordAlignmentImporter:
+    def __init__(self,author="GIZA",type="good",last_change=None,pretty_print=True):
+        self.author = author
+        self.type = type
+        self.last_change = last_change or datetime.date.today().isoformat()
+        self.pretty_print = pretty_print
+        self.compressed_file = files.CompressedFile()
+        self.files_info = files.FileName()
+        self.skipped = 0 ## malformed links, links with positions outside of the sentence, or sentence pairs that are not in the treebanks
+
+    def read_treebank(self,filename):
+## Returns the extract.Terminals data of the treebank, with an extra sentence ID => sentence number dictionary.
+        data = extract.extract(filename,extract.Terminals())
+        data['sent_numbers'] = {id: nr for nr,id in enumerate(data['sent_ids'])}
+        return data
+
+    def sentence_pairs(self,source,target,ids_file=None):
+## Yields the (source, target) sentence numbers of each line of the links file.
+## ids_file: a file with the sentence ID pair of each line ("s12;s12", as written by ParallelTextExporter). Without it, line n belongs to the n-th sentence of both treebanks.
+        if ids_file is None:
+            for nr in range(min(len(source['sent_ids']),len(target['sent_ids']))):
+                yield (nr,nr)
+            return
+        with self.compressed_file.open_read(ids_file) as f:
+            for line in f:
+                (s_id,t_id) = line.decode("utf-8").strip().split(";")
+                yield (source['sent_numbers'].get(s_id),target['sent_numbers'].get(t_id))
+
+    def parse_links(self,line,links_file=None,line_nr=None):
+## Returns the (source position, target position) pairs of a line of links, e.g. "0-0 1-2 2-1", without duplicates.
+## Malformed links (e.g. "3-" or "a-b") are skipped with a warning.
+        links = []
+        for link in line.split():
+            (i,_,j) = link.partition(b"-")
+            if not (i.isdigit() and j.isdigit()):
+                logging.warning("%s, line %s: malformed link %s" % (links_file,line_nr,link.decode("utf-8","replace")))
+                self.skipped += 1
+                continue
+            links.append((int(i),int(j)))
+        return dict.fromkeys(links)
+
+    def to_element(self,s_id,t_id,treebank_ids):
+        align = etree.Element("align",{'author': self.author, 'last_change': self.last_change, 'type': self.type})
+        etree.SubElement(align,"node",{'node_id': s_id, 'treebank_id': treebank_ids[0]})
+        etree.SubElement(align,"node",{'node_id': t_id, 'treebank_id': treebank_ids[1]})
+        return align
+
+    def aligns(self,links_file,source,target,treebank_ids,ids_file=None):
+## Yields an <align> element for each link in the links file.
+        pairs = self.sentence_pairs(source,target,ids_file)
+        with self.compressed_file.open_read(links_file) as f:
+            for line_nr,line in enumerate(f,1):
+                (ssent,tsent) = next(pairs,(None,None))
+                links = self.parse_links(line,links_file,line_nr)
+                if ssent is None or tsent is None:
+                    if links:
+                        logging.warning("%s, line %s: no sentence pair for these links" % (links_file,line_nr))
+                        self.skipped += len(links)
+                    continue
+                sterminals = source['terminal_ids'][ssent]
+                tterminals = target['terminal_ids'][tsent]
+                for (i,j) in links:
+                    if i < len(sterminals) and j < len(tterminals):
+                        yield self.to_element(sterminals[i],tterminals[j],treebank_ids)
+                    else:
+                        logging.warning("%s, line %s: link %s-%s is outside of the sentence pair %s;%s" % (links_file,line_nr,i,j,source['sent_ids'][ssent],target['sent_ids'][tsent]))
+                        self.skipped += 1
+
+    def header(self,output,source_file,target_file,treebank_ids):
+## Returns the root element of a new STA-XML file. The treebank filenames are relative to the output file.
+        dirpath = os.path.dirname(os.path.realpath(output))
+        root = etree.Element("treealign",{'subversion': "3", 'version': "2"})
+        head = etree.SubElement(root,"head")
+        metadata = etree.SubElement(head,"alignment-metadata")
+        etree.SubElement(metadata,"date").text = self.last_change
+        etree.SubElement(metadata,"author").text = self.author
+        treebanks = etree.SubElement(head,"treebanks")
+        for id,filename in zip(treebank_ids,(source_file,target_file)):
+            etree.SubElement(treebanks,"treebank",{'id': id, 'filename': os.path.relpath(os.path.realpath(filename),dirpath)})
+        etree.SubElement(root,"alignments")
+        return root
+
+    def import_links(self,links_file,source_file,target_file,output,ids_file=None,treebank_ids=None):
+## Writes a new STA-XML file with the links of links_file. Returns the number of alignments written.
+## treebank_ids: the IDs of the treebanks in the STA-XML (default: the id attributes of their root elements)
+        source = self.read_treebank(source_file)
+        target = self.read_treebank(target_file)
+        if treebank_ids is None:
+            treebank_ids = [source['corpus_id'] or "src",target['corpus_id'] or "trg"]
+            if treebank_ids[0] == treebank_ids[1]:
+                treebank_ids = ["src","trg"]
+        root = self.header(output,source_file,target_file,treebank_ids)
+        count = [0]
+        def counted(aligns):
+            for align in aligns:
+                count[0] += 1
+                yield align
+        with self.compressed_file.open_write(output) as out:
+            writer.StreamWriter(self.pretty_print).write_sta(out,root,counted(self.aligns(links_file,source,target,treebank_ids,ids_file)))
+        return count[0]
+
+    def copy(self,out,data,start,end):
+        for pos in range(start,end,COPY_BLOCK):
+            out.write(data[pos:min(pos+COPY_BLOCK,end)])
+
+    def merge_links(self,links_file,alignment_file,output,ids_file=None,source_file=None,target_file=None):
+## Writes a copy of the STA-XML alignment_file with the links of links_file added at the end of its alignments. Returns the number of alignments added.
+## The treebanks are those of the alignment file, unless source_file and target_file are given. output may be the same as alignment_file.
+        data = loader.ChunkedLoader().read(alignment_file)
+        (root,start) = loader.read_sta_header(data,alignment_file)
+        dirpath = os.path.dirname(os.path.realpath(alignment_file))
+        treebanks = root.findall("head/treebanks/treebank")
+        if len(treebanks) < 2:
+            raise ValueError("%s does not refer to two treebanks!" % (alignment_file))
+        treebank_ids = [t.attrib.get('id') for t in treebanks[:2]]
+        filenames = [source_file,target_file]
+        for nr in range(2):
+            if filenames[nr] is None:
+                filenames[nr] = self.files_info.check_absolute_path(treebanks[nr].attrib.get('filename',""),dirpath)
+                if filenames[nr] == "":
+                    raise IOError("Treebank %s referred to in %s not found!" % (treebanks[nr].attrib.get('filename'),alignment_file))
+        source = self.read_treebank(filenames[0])
+        target = self.read_treebank(filenames[1])
+        if start.group(2): ## <alignments/>, possibly with attributes, which are kept
+            (insert,resume) = (start.start(),start.end())
+            opening = bytes(data[start.start():start.end()-2])+b">"
+            if self.pretty_print:
+                opening += b"\n"
+            closing = ALIGNMENTS_END
+        else:
+            insert = data.rfind(ALIGNMENTS_END)
+            if insert < start.end():
+                raise ValueError("No </alignments> found in %s" % (alignment_file))
+            (resume,opening,closing) = (insert,b"",b"")
+        ## write to a temporary file next to the output (with the same extension), so that the output can replace the alignment file
+        temp = os.path.join(os.path.dirname(os.path.abspath(output)),".tmp-"+os.path.basename(output))
+        count = 0
+        try:
+            with self.compressed_file.open_write(temp) as out:
+                self.copy(out,data,0,insert)
+                out.write(opening)
+                for align in self.aligns(links_file,source,target,treebank_ids,ids_file):
+                    out.write(etree.tostring(align,encoding="UTF-8",xml_declaration=False,pretty_print=self.pretty_print))
+                    count += 1
+                out.write(closing)
+                self.copy(out,data,resume,len(data))
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+        finally:
+            if hasattr(data,"close"):
+                data.close()
+        os.replace(temp,output)
+        return count
@@ -0,0 +1,231 @@
+#!/usr/bin/python3
+
+import os, re, sys, pickle, hashlib
+from multiprocessing import Pool
+from lxml import etree
+if __package__:
+    from . import sta, loader, diagnostics
+else:
+    import sta, loader, diagnostics
+
+## Incremental validation of a parallel treebank, for repeated QA runs during annotation.
+## The treebanks and the alignment file are split into units with the byte scan of loader.py: one unit per <s> in the treebanks, and one per block of consecutive <align> elements of the same sentence pair in the alignment file.
+## Each unit is identified by a hash of its bytes. The results of checking a unit (for a sentence: its ID, node IDs and the errors of the deep check in diagnostics.py; for an alignment block: its node pairs and malformed alignments) are saved in a cache file together with the hash.
+## Without deep, only the IDs of each sentence and its nodes are extracted; the deep check of a sentence is run the first time a deep validation needs it. Cached deep results are also used by runs without deep.
+## Later runs hash all units again, which is much cheaper than parsing them, and only parse and check the units whose hashes are not in the cache. Lines are saved relative to the start of their unit, so that the results stay valid when other units change.
+## Whether aligned nodes exist is then looked up against the node IDs of all sentences on every run, so changes in the treebanks are always taken into account.
+## Example:
+## validator = revalidation.IncrementalValidator()
+## result = validator.validate("ALM-308.xml") ## saves ALM-308.xml.check-cache
+## result['missing'] ==> [("source", line, node ID), ...]
+
+CACHE_VERSION = 2
+ALIGN_START = re.compile(rb'<align[\s>]')
+ALIGN_END = b'</align>'
+NODE_ID = re.compile(rb'node_id="([^"]*)"')
+
+def unit_hash(data):
+    return hashlib.blake2b(data,digest_size=16).digest()
+
+def check_sentence(root,line_offset):
+## Worker function: checks the single sentence of a parsed unit. Returns its ID, its node IDs and the errors of the deep check, with lines relative to the <s> start tag.
+    report = diagnostics.Diagnostics().check_structures(root.iter("s"),line_offset)
+    ids = [id for (id,line) in report['ids']]
+    return {'id': ids[0] if ids else None, 'nodes': [(id,line) for (id,line,sentid) in report['nodes']], 'errors': report['errors']}
+
+def sentence_nodes(root,line_offset):
+## Worker function: returns the sentence ID and the node IDs of the single sentence of a parsed unit, without the deep check.
+    ids = [s.get('id') for s in root.iter("s")]
+    nodes = [(el.get('id'),el.sourceline+line_offset) for el in root.iter("t","nt") if el.get('id') is not None]
+    return {'id': ids[0] if ids else None, 'nodes': nodes}
+
+def check_block(root,line_offset):
+## Worker function: returns the node pairs of a block of <align> elements as (line, source ID, target ID, source treebank ID, target treebank ID), and the malformed alignments as (line, message), with lines relative to the first <align>.
+    pairs = []
+    errors = []
+    for align in root.iter("align"):
+        line = align.sourceline+line_offset
+        nodes = align.findall("node")
+        if len(nodes) != 2:
+            errors.append((line,"<align> with %s <node> elements instead of 2" % (len(nodes))))
+            continue
+        ids = [node.get('node_id') for node in nodes]
+        if None in ids:
+            errors.append((line,"<node> without node_id attribute"))
+            continue
+        pairs.append((line,ids[0],ids[1],nodes[0].get('treebank_id'),nodes[1].get('treebank_id')))
+    return {'pairs': pairs, 'errors': errors}
+
+class IncrementalValidator:
+    def __init__(self,processes=None):
+        if processes is None:
+            processes = os.cpu_count() or 1
+        self.processes = processes
+        self.chunked_loader = loader.ChunkedLoader(processes)
+        self.stats = {'checked': 0, 'reused': 0}
+
+    def load_cache(self,cache_file):
+        try:
+            with open(cache_file,"rb") as f:
+                cache = pickle.load(f)
+        except (OSError,pickle.UnpicklingError,EOFError):
+            return {}
+        if cache.get('version') != CACHE_VERSION:
+            return {}
+        return cache['files']
+
+    def save_cache(self,cache_file,cached_files):
+        try:
+            with open(cache_file,"wb") as f:
+                pickle.dump({'version': CACHE_VERSION, 'files': cached_files},f,protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError as e:
+            print("revalidation.py: Warning: Could not save cache to %s (%s)" % (cache_file,e),file=sys.stderr)
+
+    def line_numbers(self,data,offsets):
+## Returns the line of each offset, counting the newlines between consecutive offsets.
+        lines = []
+        line = 1
+        pos = 0
+        for offset in offsets:
+            line += data[pos:offset].count(b"\n")
+            pos = offset
+            lines.append(line)
+        return lines
+
+    def check_units(self,function,wrapper,units,data,cached):
+## Returns the results for all units (start, end) of data: from cached (hash => result) for known hashes, otherwise by parsing the unit in a worker process.
+## Also returns the results by hash, which is what is saved in the cache for the next run.
+        (wrapper_start,wrapper_end) = wrapper
+        line_offset = -(wrapper_start.count(b"\n")+1) ## lines relative to the first line of the unit
+        hashes = [unit_hash(data[start:end]) for (start,end) in units]
+        todo = {}
+        for h,(start,end) in zip(hashes,units):
+            if h not in cached and h not in todo:
+                todo[h] = (function,wrapper_start,wrapper_end,bytes(data[start:end]),start,end,line_offset)
+        tasks = list(todo.values())
+        if self.processes == 1 or len(tasks) < 2:
+            checked = [loader.read_chunk(t) for t in tasks]
+        else:
+            with Pool(min(self.processes,len(tasks))) as pool:
+                checked = pool.map(loader.read_chunk,tasks,chunksize=max(1,len(tasks)//(self.processes*4)))
+        results = dict(zip(todo.keys(),checked))
+        self.stats['checked'] += len(tasks)
+        self.stats['reused'] += len(units)-len(tasks)
+        by_hash = {}
+        for h in hashes:
+            by_hash[h] = results[h] if h in results else cached[h]
+        return ([by_hash[h] for h in hashes],by_hash)
+
+    def file_cache(self,cached_files,filename,wrapper):
+## Returns the cached results of a file, or an empty dictionary if the wrapper (XML declaration and root start tag, or the STA-XML header) changed.
+        entry = cached_files.get(os.path.realpath(filename))
+        if entry is None or entry['wrapper'] != unit_hash(b"".join(wrapper)):
+            return {}
+        return entry['units']
+
+    def check_treebank(self,filename,cached_files,new_cache,deep=False):
+## Returns the deep report (see diagnostics.py; None without deep) and the set of node IDs of a treebank.
+        data = self.chunked_loader.read(filename)
+        try:
+            (wrapper_start,wrapper_end,offsets) = self.chunked_loader.scan(data)
+            spans = self.chunked_loader.get_sent_spans(data,offsets)
+            lines = self.line_numbers(data,[start for (start,end) in spans])
+            wrapper = (wrapper_start,wrapper_end)
+            cached = self.file_cache(cached_files,filename,wrapper)
+            if deep:
+                cached = {h: result for h,result in cached.items() if 'errors' in result}
+            (results,by_hash) = self.check_units(check_sentence if deep else sentence_nodes,wrapper,spans,data,cached)
+        finally:
+            if hasattr(data,"close"):
+                data.close()
+        new_cache[os.path.realpath(filename)] = {'wrapper': unit_hash(b"".join(wrapper)), 'units': by_hash}
+        nodes = set()
+        for result in results:
+            nodes.update(id for (id,l) in result['nodes'])
+        if not deep:
+            return (None,nodes)
+        reports = []
+        for line,result in zip(lines,results):
+            reports.append({'ids': [(result['id'],line)], 'nodes': [(id,line+l,result['id']) for (id,l) in result['nodes']], 'errors': [(line+l,sentid,message) for (l,sentid,message) in result['errors']]})
+        return (diagnostics.Diagnostics().merge_deep(reports),nodes)
+
+    def alignment_blocks(self,data,start):
+## Returns the (start, end) spans of the blocks of consecutive <align> elements that belong to the same sentence pair, from the position of <alignments> on.
+## The sentence pair of an <align> is taken from the first two node_id attributes after its start tag.
+        blocks = []
+        key = None
+        for match in ALIGN_START.finditer(data,start):
+            align_start = match.start()
+            align_end = data.find(ALIGN_END,align_start)
+            if align_end == -1:
+                break
+            align_end += len(ALIGN_END)
+            ids = NODE_ID.findall(data[align_start:align_end])
+            align_key = tuple(diagnostics.sentid_prefix(id.decode("utf-8")) for id in ids[:2])
+            if blocks and align_key == key and data[blocks[-1][1]:align_start].strip() == b"":
+                blocks[-1] = (blocks[-1][0],align_end)
+            else:
+                blocks.append((align_start,align_end))
+            key = align_key
+        return blocks
+
+    def validate(self,alignment_file,source_file=None,target_file=None,cache_file=None,deep=False):
+## Validates the parallel treebank, reusing the results of the previous run from cache_file (default: the alignment file + ".check-cache"). Returns:
+## - treebanks: the source and target treebank files
+## - missing: the aligned nodes that do not exist, as (side, line of the <align>, node ID)
+## - alignment_errors: malformed alignments, as (line, message)
+## - treebank_errors: with deep, the deep report errors of each treebank, as {filename: [(line, sentence ID, message), ...]}
+## - stats: the number of units that were checked and reused
+        if cache_file is None:
+            cache_file = alignment_file+".check-cache"
+        cached_files = self.load_cache(cache_file)
+        new_cache = {}
+
+        data = self.chunked_loader.read(alignment_file)
+        try:
+            alignments = loader.ALIGNMENTS_START.search(data)
+            if alignments is None:
+                raise ValueError("No <alignments> found in %s" % (alignment_file))
+            (wrapper_start,wrapper_end,offsets) = self.chunked_loader.scan(data[:alignments.start()])
+            header = bytes(data[:alignments.start()])
+            root = etree.fromstring(header+wrapper_end)
+            blocks = self.alignment_blocks(data,alignments.start())
+            lines = self.line_numbers(data,[start for (start,end) in blocks])
+            wrapper = (wrapper_start,wrapper_end)
+            cached = self.file_cache(cached_files,alignment_file,(header,wrapper_end))
+            (results,by_hash) = self.check_units(check_block,wrapper,blocks,data,cached)
+        finally:
+            if hasattr(data,"close"):
+                data.close()
+        new_cache[os.path.realpath(alignment_file)] = {'wrapper': unit_hash(header+wrapper_end), 'units': by_hash}
+
+        treebank_ids = [t.get('id') for t in root.iter("treebank")][:2]
+        if not source_file or not target_file:
+            (source_file,target_file) = sta.Files().get_treebank_files(root,os.path.abspath(alignment_file))[:2]
+        (sreport,snodes) = self.check_treebank(source_file,cached_files,new_cache,deep)
+        (treport,tnodes) = self.check_treebank(target_file,cached_files,new_cache,deep)
+
+        missing = []
+        alignment_errors = []
+        for line,result in zip(lines,results):
+            for (l,message) in result['errors']:
+                alignment_errors.append((line+l,message))
+            for (l,s_id,t_id,s_tb,t_tb) in result['pairs']:
+                if len(treebank_ids) == 2 and (s_tb,t_tb) != tuple(treebank_ids):
+                    alignment_errors.append((line+l,"treebank IDs %s and %s do not match the header (%s and %s)" % (s_tb,t_tb,treebank_ids[0],treebank_ids[1])))
+                if s_id not in snodes:
+                    missing.append(("source",line+l,s_id))
+                if t_id not in tnodes:
+                    missing.append(("target",line+l,t_id))
+
+        self.save_cache(cache_file,new_cache)
+        result = {
+            'treebanks': (source_file,target_file),
+            'missing': missing,
+            'alignment_errors': alignment_errors,
+            'treebank_errors': {},
+            'stats': dict(self.stats),
+        }
+        if deep:
+            result['treebank_errors'] = {source_file: sreport['errors'], target_file: treport['errors']}
+        return result
@@ -0,0 +1,534 @@
+#!/usr/bin/python3
+
+import os, re, json, hashlib, heapq
+from array import array
+from multiprocessing import Pool
+if __package__:
+    from . import files, sta, tiger, loader, diagnostics
+else:
+    import files, sta, tiger, loader, diagnostics
+
+## Sharded parallel treebanks: a TIGER-XML pair and its STA-XML file split into N smaller parallel treebanks (shards), e.g. to process a corpus that does not fit into the memory of one machine.
+## Each shard is a complete parallel treebank in itself: two TIGER-XML files with the same header as the originals, and a STA-XML file that refers to them and holds exactly the alignments between their sentences.
+## Sentences that are aligned to each other (directly or through other sentences) always end up in the same shard. Shards are cut at sentence boundaries, so that they have roughly the same size in bytes.
+## The split is done on the raw bytes of the files, which are streamed block by block (see ElementReader), so that neither the original files nor the shards have to fit into memory: the headers, and the sentences and <align> elements together with the whitespace in front of them, are copied as they are, without being parsed and serialised again. Only the filename attributes in the STA-XML header are changed to the names of the shard treebanks.
+## A manifest (manifest.json) describes the shards: their files with SHA-256 checksums, the number of sentences and alignments, the first and last sentence ID on each side, and the positions of their sentences and alignments in the original files, so that merging restores the original files byte for byte.
+## The manifest also holds the SHA-256 of the (uncompressed) original files, and merging raises an IOError if the merged files differ from them.
+## Example:
+## shards.ShardSplitter().split("ALM-308.xml","shards",8)
+## sharded = shards.ShardedTreebank("shards/manifest.json")
+## sharded.get_info("link_nodes_to_sentids","source") ==> same as tiger.GetInfo().link_nodes_to_sentids(...) for the original treebank
+## shards.ShardMerger().merge("shards/manifest.json","merged")
+
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 2
+SIDES = ("source","target")
+SENT_ID = re.compile(rb'\sid="([^"]*)"')
+BODY_START = re.compile(rb'<body(\s[^>]*?)?/?>')
+ALIGN_START = re.compile(rb'<align[\s>]')
+ALIGN_END = b'</align>'
+TREEBANK_START = re.compile(rb'<treebank[\s/>][^>]*>')
+FILENAME = re.compile(rb'(\sfilename\s*=\s*)(["\'])(.*?)\2',re.S)
+NODE_ID = re.compile(rb'node_id="([^"]*)"')
+TREE_NODE_ID = re.compile(rb'<n?t\b[^>]*?\sid\s*=\s*(["\'])(.*?)\1',re.S) ## ID of a <t> or <nt> (group 2)
+BLOCK = 1<<20
+ELEMENTS = { ## kind of file => start tag of the container, start and end of the elements in it, name of the container
+    'treebank': (BODY_START,loader.SENT_START,loader.SENT_END,"<body>"),
+    'align': (loader.ALIGNMENTS_START,ALIGN_START,ALIGN_END,"<alignments>"),
+}
+
+class HashingWriter:
+## Passes the data on to a file object and computes its SHA-256, e.g. to compare the uncompressed contents of a merged file with the original.
+    def __init__(self,out):
+        self.out = out
+        self.digest = hashlib.sha256()
+
+    def write(self,data):
+        self.digest.update(data)
+        self.out.write(data)
+
+class ElementReader:
+## Reads a TIGER-XML ("treebank") or STA-XML ("align") file as raw bytes, block by block, and splits it into:
+## - head: everything up to and including the start tag of <body> or <alignments>
+## - the <s> or <align> elements, each with the bytes between it and the previous element (usually whitespace)
+## - tail: everything after the last element, set once all elements have been read
+## Only the current element and block are kept in memory, and the SHA-256 of the (uncompressed) file is computed on the way.
+## Example:
+## with shards.ElementReader("de.xml.gz","treebank") as reader:
+##     for (lead,element) in reader:
+##         ...
+##     reader.digest.hexdigest() ==> same as for the decompressed file
+    def __init__(self,filename,kind):
+        self.filename = filename
+        (container_start,self.element_start,self.element_end,container) = ELEMENTS[kind]
+        self.file = files.CompressedFile().open_read(filename)
+        self.digest = hashlib.sha256()
+        self.buffer = bytearray()
+        self.pos = 0
+        self.tail = None
+        try:
+            while True:
+                match = container_start.search(self.buffer)
+                if match is not None:
+                    break
+                if not self.fill():
+                    raise ValueError("No %s found in %s" % (container,filename))
+        except BaseException:
+            self.file.close()
+            raise
+        self.pos = match.end()
+        self.head = bytes(self.buffer[:self.pos])
+
+    def fill(self):
+## Reads the next block into the buffer. Returns False at the end of the file.
+        block = self.file.read(BLOCK)
+        if not block:
+            return False
+        self.digest.update(block)
+        self.buffer += block
+        return True
+
+    def __iter__(self):
+## Yields (lead, element) for each element. An element that is not closed before the end of the file is left in the tail.
+        while True:
+            match = self.element_start.search(self.buffer,self.pos)
+            if match is None:
+                if self.fill():
+                    continue
+                break
+            start = match.start()
+            end = self.buffer.find(self.element_end,match.end())
+            while end == -1:
+                search = max(match.end(),len(self.buffer)-len(self.element_end)+1)
+                if not self.fill():
+                    break
+                end = self.buffer.find(self.element_end,search)
+            if end == -1:
+                break
+            end += len(self.element_end)
+            lead = bytes(self.buffer[self.pos:start])
+            element = bytes(self.buffer[start:end])
+            if end > BLOCK:
+                del self.buffer[:end]
+                end = 0
+            self.pos = end
+            yield (lead,element)
+        while self.fill():
+            pass
+        self.tail = bytes(self.buffer[self.pos:])
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*args):
+        self.close()
+
+def checksum(filename):
+    digest = hashlib.sha256()
+    with open(filename,"rb") as f:
+        for block in iter(lambda: f.read(BLOCK),b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def add_to_ranges(ranges,p):
+## Adds position p (larger than all positions in ranges) to a list of ranges, e.g. 3 to [[0,3]] ==> [[0,4]]
+    if ranges and ranges[-1][1] == p:
+        ranges[-1][1] = p+1
+    else:
+        ranges.append([p,p+1])
+
+def to_ranges(positions):
+## [0,1,2,5,6] ==> [[0,3],[5,7]]
+    ranges = []
+    for p in positions:
+        add_to_ranges(ranges,p)
+    return ranges
+
+def from_ranges(ranges):
+    for (start,end) in ranges:
+        yield from range(start,end)
+
+def positions_in_order(shards,key):
+## Merges the positions of the shards into the order of the original file. Yields (original position, shard number, position in the shard).
+    def stream(nr,ranges):
+        for i,p in enumerate(from_ranges(ranges)):
+            yield (p,nr,i)
+    return heapq.merge(*[stream(nr,key(shard)) for nr,shard in enumerate(shards)])
+
+def shard_name(filename,nr,compress=None):
+## e.g. de.xml.gz ==> de.shard3.xml.gz, or de.shard3.xml.xz with compress="xz"
+    name = os.path.basename(filename)
+    if compress:
+        name = files.FileName().stripCompression(name)+"."+compress
+    match = re.match(r'^(.*?)((?:\.[^.]+)?(?:\.(?:gz|xz|zst))?)$',name)
+    return "%s.shard%s%s" % (match.group(1),nr,match.group(2))
+
+def escape_attribute(value,quote):
+    value = value.replace(b"&",b"&amp;").replace(b"<",b"&lt;")
+    return value.replace(quote,b"&quot;" if quote == b'"' else b"&apos;")
+
+def splice_filenames(head,values):
+## Replaces the raw values of the filename attributes of the <treebank> elements in the STA-XML header bytes, in order, leaving all other bytes as they are.
+## values are raw (escaped) byte strings, or functions that receive the quote character of the attribute and return one; None keeps a value.
+## Returns the new header and the old raw values.
+    old = []
+    parts = []
+    pos = 0
+    for tag in TREEBANK_START.finditer(head):
+        if len(old) == len(values):
+            break
+        attribute = FILENAME.search(head,tag.start(),tag.end())
+        if attribute is None:
+            raise ValueError("A <treebank> element in the STA-XML header has no filename attribute!")
+        old.append(attribute.group(3))
+        value = values[len(old)-1]
+        if callable(value):
+            value = value(attribute.group(2))
+        if value is not None:
+            parts.append(head[pos:attribute.start(3)])
+            parts.append(value)
+            pos = attribute.end(3)
+    parts.append(head[pos:])
+    return (b"".join(parts),old)
+
+def sent_id(element):
+    match = SENT_ID.search(element,0,element.find(b">"))
+    return match.group(1).decode("utf-8") if match else None
+
+class ShardSplitter:
+## Each input file is read twice as a stream (see ElementReader): once to find the sentence of each aligned node and the size of each sentence, and once to copy the sentences and alignments into the shards.
+## Only the aligned node IDs and a few numbers per sentence and alignment are kept in memory.
+    def __init__(self):
+        self.compressed_file = files.CompressedFile()
+
+    def components(self,nr_sents,pairs):
+## Union-find over the sentence pairs (source position, target position). Source sentences are numbered 0..nr_sents[0]-1, target sentences follow them.
+        parent = list(range(nr_sents[0]+nr_sents[1]))
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+        for (s,t) in pairs:
+            (a,b) = (find(s),find(nr_sents[0]+t))
+            if a != b:
+                parent[max(a,b)] = min(a,b)
+        return [find(x) for x in range(len(parent))]
+
+    def assign(self,sizes,nr_target_sents,pairs,nr_shards):
+## Returns the shard number of each source and each target sentence, given the sizes of the source sentences in bytes.
+## Source sentences are visited in order and the shard is increased when the current one has its share of the bytes. All sentences of a component go to the shard of its first source sentence; unaligned target sentences go to the shard of the preceding target sentence.
+        nr_sents = (len(sizes),nr_target_sents)
+        component = self.components(nr_sents,pairs)
+        total = sum(sizes) or 1
+        shard_of_component = {}
+        source_shards = []
+        shard = 0
+        done = 0
+        for s in range(nr_sents[0]):
+            if done >= total*(shard+1)/nr_shards and shard < nr_shards-1:
+                shard += 1
+            c = component[s]
+            if c not in shard_of_component:
+                shard_of_component[c] = shard
+            source_shards.append(shard_of_component[c])
+            done += sizes[s]
+        target_shards = []
+        previous = 0
+        for t in range(nr_sents[1]):
+            c = component[nr_sents[0]+t]
+            previous = shard_of_component.get(c,previous)
+            target_shards.append(previous)
+        return (source_shards,target_shards)
+
+    def scan_alignments(self,alignment_file):
+## Returns the head and tail of the alignment file, its SHA-256, and the (source, target) node IDs of each <align>.
+        nodes = []
+        with ElementReader(alignment_file,"align") as reader:
+            for (lead,element) in reader:
+                ids = NODE_ID.findall(element)
+                nodes.append((ids[0] if ids else None,ids[1] if len(ids) > 1 else None))
+        return (reader.head,reader.tail,reader.digest.hexdigest(),nodes)
+
+    def scan_treebank(self,filename,wanted):
+## Returns the head and tail of the treebank, its SHA-256, the size of each sentence in bytes, and the sentence number of each node ID in wanted (the aligned nodes).
+        sizes = array("q")
+        node_sents = {}
+        with ElementReader(filename,"treebank") as reader:
+            for p,(lead,element) in enumerate(reader):
+                sizes.append(len(element))
+                for match in TREE_NODE_ID.finditer(element):
+                    if match.group(2) in wanted:
+                        node_sents[match.group(2)] = p
+        return (reader.head,reader.tail,reader.digest.hexdigest(),sizes,node_sents)
+
+    def write_shards(self,filename,kind,heads,tail,shard_of,outputs):
+## Copies the elements of a file into the shard files outputs in one pass, with the head of each shard file and the tail of the original. shard_of has the shard number of each element.
+## A shard file is opened when its first element comes up and closed after its last one, so that only the shards whose elements are interleaved are open at the same time.
+## Returns the positions of the elements of each shard as ranges, and the first and last element of each shard.
+        nr_shards = len(outputs)
+        last = [-1]*nr_shards
+        for p,shard in enumerate(shard_of):
+            last[shard] = p
+        positions = [[] for shard in range(nr_shards)]
+        firsts = [None]*nr_shards
+        lasts = [None]*nr_shards
+        outs = {}
+        try:
+            with ElementReader(filename,kind) as reader:
+                for p,(lead,element) in enumerate(reader):
+                    shard = shard_of[p]
+                    if shard not in outs:
+                        outs[shard] = self.compressed_file.open_write(outputs[shard])
+                        outs[shard].write(heads[shard])
+                        firsts[shard] = element
+                    outs[shard].write(lead)
+                    outs[shard].write(element)
+                    add_to_ranges(positions[shard],p)
+                    lasts[shard] = element
+                    if p == last[shard]:
+                        outs[shard].write(tail)
+                        outs.pop(shard).close()
+            for shard in range(nr_shards):
+                if last[shard] == -1: ## no elements
+                    with self.compressed_file.open_write(outputs[shard]) as out:
+                        out.write(heads[shard])
+                        out.write(tail)
+        finally:
+            for out in outs.values():
+                out.close()
+        return (positions,firsts,lasts)
+
+    def split(self,alignment_file,outdir,nr_shards,compress=None):
+## Splits the parallel treebank into nr_shards shards in outdir and writes the manifest. Returns the manifest.
+## compress: optional compression extension (gz, xz or zst) for the shard files
+        (head,tail,align_sha256,align_nodes) = self.scan_alignments(alignment_file)
+        (header,alignments) = loader.read_sta_header(head,alignment_file)
+        treebank_files = sta.Files().get_treebank_files(header,os.path.abspath(alignment_file))[:2]
+        if len(treebank_files) < 2:
+            raise IOError("The treebanks referred to in %s were not found!" % (alignment_file))
+        treebank_attribs = [dict(t.attrib) for t in header.iter("treebank")]
+        filename_values = splice_filenames(head,[None,None])[1]
+        scans = [self.scan_treebank(filename,{ids[side] for ids in align_nodes}) for side,filename in enumerate(treebank_files)]
+        align_sents = [(scans[0][4].get(s_id),scans[1][4].get(t_id)) for (s_id,t_id) in align_nodes]
+        pairs = {(s,t) for (s,t) in align_sents if s is not None and t is not None}
+        sent_shards = self.assign(scans[0][3],len(scans[1][3]),pairs,nr_shards)
+        align_shards = []
+        for (s,t) in align_sents:
+            if s is not None:
+                align_shards.append(sent_shards[0][s])
+            elif t is not None:
+                align_shards.append(sent_shards[1][t])
+            else:
+                align_shards.append(0) ## neither node exists; kept so that the checks of the shard report it
+
+        os.makedirs(outdir,exist_ok=True)
+        names = [[shard_name(f,shard+1,compress) for f in treebank_files+[alignment_file]] for shard in range(nr_shards)]
+        paths = [[os.path.join(outdir,name) for name in shard_names] for shard_names in names]
+        sides = []
+        for side in range(2):
+            (positions,firsts,lasts) = self.write_shards(treebank_files[side],"treebank",[scans[side][0]]*nr_shards,scans[side][1],sent_shards[side],[p[side] for p in paths])
+            sides.append([{
+                'sentences': sum(end-start for (start,end) in positions[shard]),
+                'first': sent_id(firsts[shard]) if firsts[shard] else None,
+                'last': sent_id(lasts[shard]) if lasts[shard] else None,
+                'positions': positions[shard],
+            } for shard in range(nr_shards)])
+        heads = []
+        for shard in range(nr_shards):
+            values = [lambda quote,filename=filename: escape_attribute(filename.encode("utf-8"),quote) for filename in names[shard][:2]]
+            heads.append(splice_filenames(head,values)[0])
+        align_positions = self.write_shards(alignment_file,"align",heads,tail,align_shards,[p[2] for p in paths])[0]
+
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'alignment_file': os.path.basename(alignment_file),
+            'treebank_files': [os.path.basename(f) for f in treebank_files],
+            'treebank_attributes': treebank_attribs,
+            'treebank_filename_values': [value.decode("utf-8","surrogateescape") for value in filename_values], ## as they are in the header, for merging
+            'sha256': {
+                'source': scans[0][2],
+                'target': scans[1][2],
+                'align': align_sha256,
+            },
+            'nr_shards': nr_shards,
+            'shards': [],
+        }
+        for shard in range(nr_shards):
+            entry = {
+                'files': {kind: {'filename': name, 'sha256': checksum(path)} for kind,name,path in zip(SIDES+("align",),names[shard],paths[shard])},
+                'alignments': sum(end-start for (start,end) in align_positions[shard]),
+                'align_positions': align_positions[shard],
+                'source': sides[0][shard],
+                'target': sides[1][shard],
+            }
+            manifest['shards'].append(entry)
+        with open(os.path.join(outdir,MANIFEST),"w") as f:
+            json.dump(manifest,f,indent=1)
+        return manifest
+
+def load_manifest(manifest_file,verify=True):
+## Returns the manifest, with the shard filenames made absolute. With verify, raises an IOError if a shard file is missing or its checksum differs.
+    with open(manifest_file) as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError("%s: unknown manifest version %s" % (manifest_file,manifest.get('version')))
+    dirpath = os.path.dirname(os.path.abspath(manifest_file))
+    for nr,shard in enumerate(manifest['shards'],1):
+        for kind,entry in shard['files'].items():
+            entry['path'] = os.path.join(dirpath,entry['filename'])
+            if verify and (not os.path.isfile(entry['path']) or checksum(entry['path']) != entry['sha256']):
+                raise IOError("Shard %s: %s is missing or its checksum does not match the manifest!" % (nr,entry['path']))
+    return manifest
+
+class ShardMerger:
+    def __init__(self):
+        self.compressed_file = files.CompressedFile()
+
+    def merge_file(self,manifest,kind,output,head_changes=None):
+## Writes the elements of one kind of shard file (source, target or align) in their original order, with the head and tail of the shards (which are the same in all shards, apart from the treebank filenames of the alignment files). Returns the SHA-256 of the uncompressed output.
+## head_changes: optional function that receives the head of the first shard and returns the head to be written
+## The shards are streamed one element at a time (see ElementReader). A shard is opened when its first element comes up and closed after its last one, so that shards whose elements are not interleaved are read one after another.
+        shards = manifest['shards']
+        if kind == "align":
+            (reader_kind,key) = ("align",lambda shard: shard['align_positions'])
+        else:
+            (reader_kind,key) = ("treebank",lambda shard: shard[kind]['positions'])
+        remaining = [sum(end-start for (start,end) in key(shard)) for shard in shards]
+        readers = {} ## shard number => (reader, iterator over its elements)
+        def open_shard(nr):
+            reader = ElementReader(shards[nr]['files'][kind]['path'],reader_kind)
+            readers[nr] = (reader,iter(reader))
+        def close_shard(nr):
+        ## Reads the tail after the last element of the shard. Returns the tail.
+            (reader,elements) = readers.pop(nr)
+            with reader:
+                if next(elements,None) is not None:
+                    raise ValueError("%s has more elements than the manifest says!" % (reader.filename))
+            return reader.tail
+        try:
+            open_shard(0)
+            head = readers[0][0].head
+            if head_changes is not None:
+                head = head_changes(head)
+            tail = None
+            with self.compressed_file.open_write(output) as f:
+                out = HashingWriter(f)
+                out.write(head)
+                for (p,nr,i) in positions_in_order(shards,key):
+                    if nr not in readers:
+                        open_shard(nr)
+                    (reader,elements) = readers[nr]
+                    item = next(elements,None)
+                    if item is None:
+                        raise ValueError("%s has fewer elements than the manifest says!" % (reader.filename))
+                    out.write(item[0])
+                    out.write(item[1])
+                    remaining[nr] -= 1
+                    if remaining[nr] == 0:
+                        tail = close_shard(nr)
+                if tail is None: ## no elements in any shard
+                    tail = close_shard(0)
+                out.write(tail)
+        finally:
+            for (reader,elements) in readers.values():
+                reader.close()
+        return out.digest.hexdigest()
+
+    def merge_treebank(self,manifest,side,output):
+        return self.merge_file(manifest,side,output)
+
+    def merge_alignments(self,manifest,output):
+## The original filename attributes are restored in the header.
+        values = [value.encode("utf-8","surrogateescape") for value in manifest['treebank_filename_values']]
+        return self.merge_file(manifest,"align",output,lambda head: splice_filenames(head,values)[0])
+
+    def merge(self,manifest_file,outdir):
+## Merges the shards into a parallel treebank in outdir, with the original filenames. Returns the three filenames.
+## Raises an IOError if the contents of a merged file differ from the original (e.g. because the shards were edited).
+        manifest = load_manifest(manifest_file)
+        os.makedirs(outdir,exist_ok=True)
+        outputs = [os.path.join(outdir,f) for f in manifest['treebank_files']]+[os.path.join(outdir,manifest['alignment_file'])]
+        digests = [self.merge_treebank(manifest,side,output) for side,output in zip(SIDES,outputs[:2])]
+        digests.append(self.merge_alignments(manifest,outputs[2]))
+        for kind,output,digest in zip(SIDES+("align",),outputs,digests):
+            if digest != manifest['sha256'][kind]:
+                raise IOError("%s differs from the original file that was split!" % (output))
+        return outputs
+
+def get_info_shard(task):
+## Worker function: calls a GetInfo method (of tiger.py or sta.py) with the filename of a shard.
+    (module,method,filename,args) = task
+    getinfo = tiger.GetInfo() if module == "tiger" else sta.GetInfo()
+    return getattr(getinfo,method)(filename,*args)
+
+def check_shard(task):
+## Worker function: checks that all aligned nodes of a shard exist in its treebanks, like check-STA-align.py. With deep, also runs the deep check of diagnostics.py on both treebanks.
+    (source_file,target_file,alignment_file,deep) = task
+    tiger_getinfo = tiger.GetInfo()
+    snodes = tiger_getinfo.get_nodes(source_file,"dict")
+    tnodes = tiger_getinfo.get_nodes(target_file,"dict")
+    missing = []
+    for pair in sta.GetInfo().get_node_pairs(alignment_file):
+        (s_id,t_id) = pair.split(";")
+        if s_id not in snodes:
+            missing.append(("source",s_id))
+        if t_id not in tnodes:
+            missing.append(("target",t_id))
+    errors = {}
+    if deep:
+        for treebank in (source_file,target_file):
+            errors[treebank] = diagnostics.Diagnostics().check_file(treebank,processes=1,deep=True)['errors']
+    return {'missing': missing, 'treebank_errors': errors}
+
+class ShardedTreebank:
+## Runs queries on all shards of a manifest in parallel and combines the results.
+    def __init__(self,manifest_file,processes=None,verify=True):
+        self.manifest = load_manifest(manifest_file,verify)
+        self.processes = processes or os.cpu_count() or 1
+
+    def shard_files(self,kind):
+        return [shard['files'][kind]['path'] for shard in self.manifest['shards']]
+
+    def map(self,function,tasks):
+        if self.processes == 1 or len(tasks) < 2:
+            return [function(t) for t in tasks]
+        with Pool(min(self.processes,len(tasks))) as pool:
+            return pool.map(function,tasks)
+
+    def combine(self,results):
+## Dictionaries are merged, lists concatenated and numbers added up, in shard order. Tuples (e.g. of tiger.GetInfo.get_nr_sents) are combined position by position.
+        if not results:
+            return None
+        if isinstance(results[0],dict):
+            combined = {}
+            for r in results:
+                combined.update(r)
+            return combined
+        if isinstance(results[0],list):
+            return [x for r in results for x in r]
+        if isinstance(results[0],tuple):
+            return tuple(self.combine(list(values)) for values in zip(*results))
+        if isinstance(results[0],(int,float)):
+            return sum(results)
+        raise TypeError("Results of type %s cannot be combined over shards!" % (type(results[0]).__name__))
+
+    def get_info(self,method,kind,*args):
+## Calls a GetInfo method that accepts a filename on every shard and combines the results, e.g.
+## get_info("get_nodes","source","dict"), get_info("link_nodes_to_sentids","target"), get_info("get_node_pairs","align")
+## Lists come in shard order; for the original document order, see ShardMerger.
+        module = "sta" if kind == "align" else "tiger"
+        return self.combine(self.map(get_info_shard,[(module,method,filename,args) for filename in self.shard_files(kind)]))
+
+    def check(self,deep=False):
+## Checks all shards in parallel. Returns the missing nodes as (shard number, side, node ID) and the errors of the deep check by treebank file.
+        tasks = [(s,t,a,deep) for (s,t,a) in zip(self.shard_files("source"),self.shard_files("target"),self.shard_files("align"))]
+        missing = []
+        errors = {}
+        for nr,result in enumerate(self.map(check_shard,tasks),1):
+            missing.extend((nr,side,id) for (side,id) in result['missing'])
+            errors.update(result['treebank_errors'])
+        return {'missing': missing, 'treebank_errors': errors}
@@ -0,0 +1,228 @@
+#!/usr/bin/python3
+
+import sys, struct, bisect, weakref
+from array import array
+from multiprocessing import shared_memory, resource_tracker
+if __package__:
+    from . import extract, loader
+else:
+    import extract, loader
+
+## Treebank index in shared memory, for pools of worker processes that all need node => sentence lookups (e.g. evaluation.py).
+## Instead of every worker building the dictionaries of tiger.GetInfo.link_nodes_to_sentids and get_nodes itself, the index is built once and published as read-only typed arrays in a single multiprocessing.shared_memory segment:
+## - node IDs (sorted, as one block of UTF-8 bytes with offsets), so they can be found with binary search
+## - the sentence number, node type (t or nt) and document position of each node
+## - sentence IDs, and the byte offsets of each <s> ... </s> in the (decompressed) file
+## Workers attach to the segment by name and read the arrays in place, so memory use does not grow with the number of workers.
+## The segment is removed when the publishing object is closed or garbage collected, or when its process exits.
+## Example:
+## with shared.SharedTreebankIndex(filename="de.xml") as index:
+##     pool.map(worker,[(index.name,task) for task in tasks])
+## def worker(args):
+##     index = shared.attach(args[0])
+##     index.sentence("s12_3") ==> "s12"
+##     index["s12_500"] ==> "nt"
+
+MAGIC = b"TIGERIDX"
+HEADER = struct.Struct("<8sqqqq") ## magic, number of sentences, number of nodes, bytes of sentence IDs, bytes of node IDs
+TYPES = ("t","nt")
+TRACK_PARAMETER = sys.version_info >= (3,13) ## SharedMemory(track=False)
+
+def layout(nr_sents,nr_nodes,sent_bytes,node_bytes):
+## Returns the arrays of the segment as name => (typecode, byte offset, number of items), and the size of the segment. Each array starts at a multiple of 8 bytes.
+    sections = (
+        ('sent_starts',"q",nr_sents),
+        ('sent_ends',"q",nr_sents),
+        ('sent_id_offsets',"q",nr_sents+1),
+        ('sent_order',"i",nr_sents), ## sentence numbers sorted by sentence ID
+        ('node_id_offsets',"q",nr_nodes+1),
+        ('node_sents',"i",nr_nodes),
+        ('node_positions',"i",nr_nodes),
+        ('node_types',"b",nr_nodes),
+        ('sent_id_data',"B",sent_bytes),
+        ('node_id_data',"B",node_bytes),
+    )
+    result = {}
+    offset = HEADER.size
+    for (name,typecode,count) in sections:
+        offset = (offset+7)//8*8
+        result[name] = (typecode,offset,count)
+        offset += struct.calcsize(typecode)*count
+    return (result,offset)
+
+def release(shm,views,unlink):
+## Finalizer: the views have to be released before the segment can be closed.
+    for view in views:
+        view.release()
+    shm.close()
+    if unlink:
+        if not TRACK_PARAMETER:
+            ## Worker processes usually share the resource tracker of this process, and have unregistered the segment after attaching (see SharedTreebankIndex); unlink unregisters it once more.
+            resource_tracker.register(shm._name,"shared_memory")
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+_attached = {} ## name => SharedTreebankIndex, one per process
+
+def attach(name):
+## Returns the index in the segment with the given name, attaching to it only once per process.
+    index = _attached.get(name)
+    if index is None:
+        index = _attached[name] = SharedTreebankIndex(name)
+    return index
+
+class Strings:
+## Read-only sequence of the strings stored in a block of bytes with offsets, e.g. for bisect.
+    def __init__(self,offsets,data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets)-1
+
+    def __getitem__(self,i):
+        return bytes(self.data[self.offsets[i]:self.offsets[i+1]])
+
+class SharedTreebankIndex:
+    def __init__(self,name=None,filename=None):
+## Publishes the index of the treebank filename in a new segment, or attaches to the existing segment name.
+        if filename is not None:
+            self.shm = self.publish(filename)
+            self.owner = True
+        else:
+            if TRACK_PARAMETER:
+                self.shm = shared_memory.SharedMemory(name=name,track=False) ## only the publisher removes the segment
+            else:
+                self.shm = shared_memory.SharedMemory(name=name)
+                ## Before Python 3.13, attaching registers the segment with the resource tracker of this process, which would remove it (with a "leaked shared_memory" warning) when the worker exits, while the publisher still owns it.
+                resource_tracker.unregister(self.shm._name,"shared_memory")
+            self.owner = False
+        self.name = self.shm.name
+        self.views = []
+        self.finalizer = weakref.finalize(self,release,self.shm,self.views,self.owner)
+        (magic,nr_sents,nr_nodes,sent_bytes,node_bytes) = HEADER.unpack_from(self.shm.buf,0)
+        if magic != MAGIC:
+            raise ValueError("Shared memory segment %s does not contain a treebank index!" % (name))
+        self.nr_sents = nr_sents
+        self.nr_nodes = nr_nodes
+        self.arrays = {}
+        (sections,size) = layout(nr_sents,nr_nodes,sent_bytes,node_bytes)
+        for array_name,(typecode,offset,count) in sections.items():
+            view = self.shm.buf[offset:offset+struct.calcsize(typecode)*count].toreadonly().cast(typecode)
+            self.views.append(view)
+            self.arrays[array_name] = view
+        self.sent_ids = Strings(self.arrays['sent_id_offsets'],self.arrays['sent_id_data'])
+        self.node_ids = Strings(self.arrays['node_id_offsets'],self.arrays['node_id_data'])
+
+    def publish(self,filename):
+## Builds the index of the treebank and copies it into a new shared memory segment.
+        data = extract.extract(filename,extract.Terminals())
+        chunked_loader = loader.ChunkedLoader(1)
+        contents = chunked_loader.read(filename)
+        try:
+            (wrapper_start,wrapper_end,offsets) = chunked_loader.scan(contents)
+            spans = chunked_loader.get_sent_spans(contents,offsets)
+        finally:
+            if hasattr(contents,"close"):
+                contents.close()
+        if len(spans) != len(data['sent_ids']):
+            raise ValueError("%s: found %s sentences with the byte scan, but %s with the parser!" % (filename,len(spans),len(data['sent_ids'])))
+        sent_ids = [id.encode("utf-8") for id in data['sent_ids']]
+        nodes = sorted((id.encode("utf-8"),position,sent,pos) for position,(id,(sent,pos)) in enumerate(data['nodes'].items()))
+        sent_id_data = b"".join(sent_ids)
+        node_id_data = b"".join(node[0] for node in nodes)
+        (sections,size) = layout(len(sent_ids),len(nodes),len(sent_id_data),len(node_id_data))
+        shm = shared_memory.SharedMemory(create=True,size=size)
+        try:
+            HEADER.pack_into(shm.buf,0,MAGIC,len(sent_ids),len(nodes),len(sent_id_data),len(node_id_data))
+            def offsets_of(strings):
+                offsets = [0]
+                for s in strings:
+                    offsets.append(offsets[-1]+len(s))
+                return offsets
+            values = {
+                'sent_starts': [start for (start,end) in spans],
+                'sent_ends': [end for (start,end) in spans],
+                'sent_id_offsets': offsets_of(sent_ids),
+                'sent_order': sorted(range(len(sent_ids)),key=lambda i: sent_ids[i]),
+                'node_id_offsets': offsets_of(node[0] for node in nodes),
+                'node_sents': [node[2] for node in nodes],
+                'node_positions': [node[1] for node in nodes],
+                'node_types': [0 if node[3] != -1 else 1 for node in nodes],
+            }
+            blocks = [(array_name,array(sections[array_name][0],items).tobytes()) for array_name,items in values.items()]
+            blocks += [('sent_id_data',sent_id_data),('node_id_data',node_id_data)]
+            for array_name,block in blocks:
+                offset = sections[array_name][1]
+                shm.buf[offset:offset+len(block)] = block
+        except BaseException:
+            shm.close()
+            shm.unlink()
+            raise
+        return shm
+
+    def close(self):
+## Detaches from the segment, and removes it if this object published it.
+        self.finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*args):
+        self.close()
+
+    def find(self,node_id):
+## Returns the number of the node in the sorted node IDs, or -1.
+        key = node_id.encode("utf-8")
+        i = bisect.bisect_left(self.node_ids,key)
+        if i < self.nr_nodes and self.node_ids[i] == key:
+            return i
+        return -1
+
+    def find_sent(self,sent_id):
+## Returns the sentence number (position in the treebank) of a sentence ID, or -1.
+        key = sent_id.encode("utf-8")
+        order = self.arrays['sent_order']
+        lo = 0
+        hi = self.nr_sents
+        while lo < hi:
+            mid = (lo+hi)//2
+            if self.sent_ids[order[mid]] < key:
+                lo = mid+1
+            else:
+                hi = mid
+        if lo < self.nr_sents and self.sent_ids[order[lo]] == key:
+            return order[lo]
+        return -1
+
+    def __contains__(self,node_id):
+        return self.find(node_id) != -1
+
+    def __getitem__(self,node_id):
+## Same as the dictionary of tiger.GetInfo.get_nodes(tree,"dict"): "t" or "nt".
+        i = self.find(node_id)
+        if i == -1:
+            raise KeyError(node_id)
+        return TYPES[self.arrays['node_types'][i]]
+
+    def __len__(self):
+        return self.nr_nodes
+
+    def sentence(self,node_id):
+## Same as the dictionary of tiger.GetInfo.link_nodes_to_sentids: the sentence ID of a node, or None.
+        i = self.find(node_id)
+        if i == -1:
+            return None
+        return self.sent_ids[self.arrays['node_sents'][i]].decode("utf-8")
+
+    def sent_span(self,sent_nr):
+## Returns the byte offsets (start, end) of a sentence in the decompressed treebank file, e.g. to read or hash it without parsing the file.
+        return (self.arrays['sent_starts'][sent_nr],self.arrays['sent_ends'][sent_nr])
+
+    def link_nodes_to_sentids(self):
+## Returns a copy of the index as the dictionary of tiger.GetInfo.link_nodes_to_sentids.
+        sent_ids = [self.sent_ids[i].decode("utf-8") for i in range(self.nr_sents)]
+        node_sents = self.arrays['node_sents']
+        return {self.node_ids[i].decode("utf-8"): sent_ids[node_sents[i]] for i in sorted(range(self.nr_nodes),key=lambda i: self.arrays['node_positions'][i])}
@@ -5,7 +5,10 @@ from lxml import etree
 from pathlib import Path
 #lib_path = os.path.abspath(os.path.join(__file__, '..', '..', 'Python-libs'))
 #sys.path.append(lib_path)
-import files
+if __package__:
+    from . import files, extract
+else:
+    import files, extract
 
 # LXML tutorial:
 # http://lxml.de/3.0/tutorial.html
@@ -17,15 +20,15 @@ class Files:
         files_list=[]
         for x in treebanks:
             file=x.attrib['filename'] ## reference to source or target treebank in alignment file
-            possible_file=Path(file)
-            if possible_file.is_file(): ## check if file exists
-                files_list.append(file)
+            possible_file=files_info.find_file(file) ## also finds a compressed version of the file, e.g. de.xml.gz for de.xml
+            if possible_file != "": ## check if file exists
+                files_list.append(possible_file)
             else: ## treebank file does not exist. The alignment file might refer to files within its directory without using an absolute path, so let's make sure.
                 abs_file = files_info.check_absolute_path(file,os.path.dirname(os.path.realpath(alignment_file)))
                 if abs_file != "":
                     files_list.append(abs_file)
                 else:
-                    print("File in treebank file (%s) not found!" % (abs_file), file=sys.stderr)
+                    print("File in treebank file (%s) not found!" % (file), file=sys.stderr)
                     exit(1)
         return files_list
 
@@ -58,6 +61,9 @@ class GetInfo:
 ## s158_7;s158_3
 ## s158_505;s158_508
 ## ...
+## tree can also be the filename of the alignment file (see extract.py).
+        if extract.is_filename(tree):
+            return extract.extract(tree,extract.NodePairs())
         root = tree.getroot()
         nodes = []
 #        alignments=root[1]
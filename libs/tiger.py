@@ -2,7 +2,10 @@
 
 import re, sys, os
 from lxml import etree
-import sta, data
+if __package__:
+    from . import sta, data, extract
+else:
+    import sta, data, extract
 
 # class Elements:
 #     def __init__(self,tree):
@@ -10,6 +13,8 @@ import sta, data
 
 class GetInfo:
     def get_sent_ids(self,tree):
+        if extract.is_filename(tree):
+            return extract.extract(tree,extract.SentIds())
         root=tree.getroot()
 #        sents = tree.findall('.//s')
         ids=[]
@@ -94,6 +99,9 @@ class GetInfo:
 
     def link_nodes_to_sentids(self,tree):
 ## Returns a dictionary, linking each alignable node in a given treebank to its sentence ID. In this way, we can count the real number of sentences represented even if some sentences in the treebank can consist of nodes referring to more than one sentence ID.
+## tree can also be the filename of the treebank, in which case the IDs are extracted without building a tree (see extract.py).
+        if extract.is_filename(tree):
+            return extract.extract(tree,extract.NodesToSentIds())
         linked_nodes = {}
         root = tree.getroot()
         for s in root.iter("s"):
@@ -109,7 +117,10 @@ class GetInfo:
 
     ## Returns a list of all <t> and <nt> nodes (attribute "id") values in the tree object
     ## Returns either as a list or dictionary
+    ## tree can also be the filename of the treebank (see extract.py)
     def get_nodes(self,tree,data_type):
+        if extract.is_filename(tree):
+            return extract.extract(tree,extract.Nodes(data_type))
         root = tree.getroot()
         if data_type == "dict":
             nodes={}
@@ -131,6 +142,8 @@ class GetInfo:
         return nodes
 
     def get_words(self,tree):
+        if extract.is_filename(tree):
+            return extract.extract(tree,extract.Words())
         words = {}
         for element in tree.iter("t"):
             id = element.attrib['id']
@@ -139,10 +152,7 @@ class GetInfo:
         return words
 
     def get_sent_words(self,sent_tree):
-        sent = ""
-        for t in sent_tree.iter("t"):
-            sent = sent+t.attrib['word']+" "
-        return sent.rstrip()
+        return " ".join(t.attrib['word'] for t in sent_tree.iter("t")).rstrip()
 
     def getnodesentid(self,node_el):
 ## E.g. (nodeid,sentid) = tiger_getinfo.getnodesentid(t)
@@ -0,0 +1,184 @@
+#!/usr/bin/python3
+
+import os, re, copy, json, hashlib
+from lxml import etree
+
+# Incremental serialisation:
+# https://lxml.de/api.html#incremental-xml-generation
+
+class StreamWriter:
+## Writes TIGER-XML and STA-XML documents element by element using etree.xmlfile, instead of building a complete tree and serialising it with etree.tostring.
+## Only one <s> or <align> element is serialised at a time, so memory use does not grow with the size of the output file.
+## The header elements (everything under the root except <body> or <alignments>) are copied over from an existing root element.
+    def __init__(self,pretty_print=True):
+        self.pretty_print = pretty_print
+
+    def newline(self,xf):
+        if self.pretty_print:
+            xf.write("\n")
+
+    def write_element(self,xf,el):
+        xf.write(el, pretty_print=self.pretty_print, with_tail=False) ## pretty-printed elements already end with a newline
+
+    def write_document(self,output,root,container,elements,header_changes=None):
+## output: a filename or a file object opened in binary mode
+## root: the root element of the original document, from which the header is copied
+## container: the tag of the element that holds the streamed elements ("body" or "alignments")
+## elements: any iterable of elements to be written inside the container, e.g. a generator
+## header_changes: optional function that receives a copy of a header element and may change it before it is written
+        with etree.xmlfile(output, encoding="UTF-8") as xf:
+            xf.write_declaration()
+            with xf.element(root.tag, dict(root.attrib), nsmap=root.nsmap):
+                self.newline(xf)
+                found = 0
+                for child in root:
+                    if child.tag == container:
+                        self.write_container(xf,container,elements,child.attrib)
+                        found = 1
+                    elif header_changes is not None:
+                        header = copy.deepcopy(child)
+                        header_changes(header)
+                        self.write_element(xf,header)
+                    else:
+                        self.write_element(xf,child)
+                if not found: ## e.g. an empty document without a body. We still want to write the elements.
+                    self.write_container(xf,container,elements)
+
+    def write_container(self,xf,container,elements,attrib=None):
+## attrib: the attributes of the original container element, if any
+        with xf.element(container,dict(attrib) if attrib is not None else {}):
+            self.newline(xf)
+            for el in elements:
+                self.write_element(xf,el)
+        self.newline(xf)
+
+    def write_tiger(self,output,root,sents):
+## Writes a TIGER-XML file with the header of root and the given <s> elements under <body>.
+## Example: writer.write_tiger("de.rand1.train.xml",stree.getroot(),sents)
+        self.write_document(output,root,"body",sents)
+
+    def write_sta(self,output,root,aligns,filenames=None):
+## Writes a STA-XML file with the header of root and the given <align> elements under <alignments>.
+## filenames: optional list of new values for the "filename" attribute of each <treebank> element, in order, e.g. the names of the fold treebanks that the alignments refer to.
+        header_changes = None
+        if filenames:
+            def header_changes(header):
+                for treebank,filename in zip(header.iter("treebank"),filenames):
+                    treebank.attrib['filename'] = filename
+        self.write_document(output,root,"alignments",aligns,header_changes)
+
+OUTPUT_CACHE_VERSION = 1 ## part of every digest: increase it when the output of StreamWriter changes, so that all files are written again
+OUTPUT_MANIFEST = "digests.json"
+TEMP_FILE = re.compile(r'^.+\.tmp-([0-9]+)(\.[^.]*)?$') ## temporary files of OutputCache.write, e.g. "de.rand1.train.xml.tmp-1234.xml"
+
+def file_sha256(filename):
+    sha = hashlib.sha256()
+    with open(filename,"rb") as f:
+        for block in iter(lambda: f.read(1<<24),b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def pid_running(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid,0)
+    except ProcessLookupError:
+        return False
+    except OSError: ## e.g. the process belongs to another user
+        return True
+    return True
+
+class OutputCache:
+## Content-addressed output files, so that running a script again with the same inputs does not rewrite files that would come out the same (which would invalidate the build caches that depend on them).
+## The digest of an output is computed before writing it, from everything its content depends on: the fingerprints (SHA-256) of the input files, and e.g. the seed and the sentence list.
+## The digest, size and modification time of each written file are recorded in a manifest (<outdir>/digests.json). A file is skipped if its recorded digest matches and it has not been changed on disk since.
+## Files are written to a temporary file in the same directory first and then renamed, so that an interrupted run never leaves a truncated file behind. Temporary files left behind by a killed run are removed when the cache is opened again.
+## Example:
+## cache = writer.OutputCache("folds")
+## digest = cache.digest(cache.fingerprint("de.xml"),seed,sent_ids)
+## cache.write("folds/de.rand1.train.xml",digest,lambda f: stream_writer.write_tiger(f,root,sents)) ==> False if the file was up to date
+    def __init__(self,outdir,manifest_name=OUTPUT_MANIFEST):
+        self.outdir = outdir
+        self.manifest_file = os.path.join(outdir,manifest_name)
+        self.manifest = self.load_manifest()
+        self.stats = {'written': 0, 'skipped': 0}
+        self.remove_stale_temp_files()
+
+    def remove_stale_temp_files(self):
+## Removes the temporary files of runs that are no longer running (e.g. killed with SIGKILL, so that write could not clean up).
+        try:
+            names = os.listdir(self.outdir)
+        except OSError:
+            return
+        for name in names:
+            match = TEMP_FILE.match(name)
+            if not match or pid_running(int(match.group(1))):
+                continue
+            try:
+                os.remove(os.path.join(self.outdir,name))
+            except OSError:
+                pass
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_file) as f:
+                manifest = json.load(f)
+        except (OSError,ValueError):
+            manifest = {}
+        if manifest.get('version') != OUTPUT_CACHE_VERSION:
+            manifest = {'version': OUTPUT_CACHE_VERSION, 'inputs': {}, 'outputs': {}}
+        return manifest
+
+    def save_manifest(self):
+        temp = self.manifest_file+".tmp"
+        with open(temp,"w") as f:
+            json.dump(self.manifest,f,indent=1,sort_keys=True)
+        os.replace(temp,self.manifest_file)
+
+    def fingerprint(self,filename):
+## Returns the SHA-256 of an input file. The hash is recorded with the size and modification time of the file, so that an unchanged input is not read again on the next run.
+        path = os.path.realpath(filename)
+        stat = os.stat(path)
+        entry = self.manifest['inputs'].get(path)
+        if entry is None or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_sha256(path)}
+            self.manifest['inputs'][path] = entry
+        return entry['sha256']
+
+    def digest(self,*parts):
+## Returns the digest of any JSON-serialisable values (strings, numbers, lists of sentence IDs, ...), in order.
+        data = json.dumps([OUTPUT_CACHE_VERSION]+list(parts),ensure_ascii=False,separators=(",",":"))
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def is_current(self,filename,digest):
+        entry = self.manifest['outputs'].get(os.path.basename(filename))
+        if entry is None or entry['digest'] != digest:
+            return False
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return False
+        return stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']
+
+    def write(self,filename,digest,write_function):
+## Calls write_function with a temporary filename (with the same extension, so that the same compression is used) and renames the result to filename, unless filename is already current.
+## The temporary filename keeps the whole name in front of ".tmp-<pid>", so that it does not match the fold file names that crossval.py looks for (crossval.FOLD_FILE).
+## Returns True if the file was written.
+        if self.is_current(filename,digest):
+            self.stats['skipped'] += 1
+            return False
+        (dirname,basename) = os.path.split(filename)
+        temp = os.path.join(dirname,"%s.tmp-%s%s" % (basename,os.getpid(),os.path.splitext(basename)[1]))
+        try:
+            write_function(temp)
+            os.replace(temp,filename)
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+        stat = os.stat(filename)
+        self.manifest['outputs'][basename] = {'digest': digest, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        self.save_manifest() ## after every file, so that an interrupted run keeps the files it finished
+        self.stats['written'] += 1
+        return True
@@ -9,7 +9,7 @@
 
 ## Usage:
 
-# >>> python3 check-STA-align.py -a STA.xml [ -s source-tiger.xml ] [ -t target-tiger.xml ]
+# >>> python3 check-STA-align.py -a STA.xml | -m manifest.json [ -s source-tiger.xml ] [ -t target-tiger.xml ] [ --deep ] [ --cache [ cache-file ] ] [ --processes N ]
 
 ## Example use:
 
@@ -20,6 +20,24 @@
 
 # >>> python3 check-STA-align.py -a ~/align/lit+law/308_corpus-with-308/ALM-308_normalized.xml
 
+## Any of the files may be compressed with gzip (.gz), xz (.xz) or zstd (.zst). If a referenced treebank such as 308DE_LIT_LAW_normalized.xml does not exist, a compressed version of it (e.g. 308DE_LIT_LAW_normalized.xml.xz) is used instead.
+
+## With --deep, the structure of both treebanks is also checked, each in one pass over the file, split across worker processes (see diagnostics.py): dangling edge and secedge idrefs, missing graph roots, nodes with more than one parent, cycles, node IDs that do not match their sentence ID, and duplicate sentence and node IDs.
+## All problems are reported with their file, line and sentence, e.g.
+
+# >>> python3 check-STA-align.py -a ~/align/lit+law/308_corpus-with-308/ALM-308_normalized.xml --deep
+# 308DE_LIT_LAW_normalized.xml:1204: s45: node s45_3 has more than one parent (s45_500 and s45_502)
+
+## With --cache, the results of each run are saved (by default in STA.xml.check-cache), and later runs only parse the sentences and blocks of alignments whose contents changed, which are found by hashing the byte ranges of all <s> and <align> elements.
+
+# >>> python3 check-STA-align.py -a ~/align/lit+law/308_corpus-with-308/ALM-308_normalized.xml --deep --cache
+# Checked 3 and reused 2719 sentences and alignment blocks.
+# Referenced treebanks exist, all alignments are valid and the treebanks are well-formed.
+
+## With --manifest instead of -a, all shards written by split-shards.py are checked in parallel (also with --deep), after verifying their checksums:
+
+# >>> python3 check-STA-align.py -m ~/align/lit+law/308_shards/manifest.json --deep
+
 ## It can appear like below, or using absolute or relative paths:
 
 # <treebanks>
@@ -27,91 +45,168 @@
 # <treebank id="ka" language="ka_GE" filename="308KA_LIT_LAW_normalized.xml"/>
 # </treebanks>
 
-## Requires sta.py, tiger.py and data.py in ../../libs.
+## The exit status is 0 if no problems were found, and 1 if nodes or treebanks are missing, alignments are invalid, the treebanks are not well-formed (with --deep) or a file could not be read, so the script can be used in shell pipelines and Makefiles.
+
+## Requires sta.py, tiger.py, data.py, files.py, diagnostics.py, loader.py, revalidation.py, shards.py and extract.py in ../../libs.
 ## Requires the lxml package and its dependencies. (https://lxml.de/installation.html)
 
 import sys
 import os
 import argparse
-from lxml import etree
 from pathlib import Path
 lib_path = os.path.abspath(os.path.join(__file__, '..', '..', '..', 'libs'))
-sys.path.append(lib_path)
-import sta, tiger
 
 def eprint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
 ## *** MAIN CODE ***
-parser = argparse.ArgumentParser()
-parser.add_argument("--align", "-a", help="Stockholm TreeAligner style alignment file", required=True)
+parser = argparse.ArgumentParser(epilog="Exit status: 0 if all referenced nodes exist (and, with --deep, the treebanks are well-formed), 1 if problems were reported or the files could not be read.")
+parser.add_argument("--align", "-a", help="Stockholm TreeAligner style alignment file")
+parser.add_argument("--manifest", "-m", help="Check all shards of a sharded parallel treebank (manifest.json of split-shards.py) instead")
 parser.add_argument("--source", "-s", help="Source-side TIGER-XML file")
 parser.add_argument("--target", "-t", help="Target-side TIGER-XML file")
+parser.add_argument("--deep", help="Also check the structure of the treebanks", action="store_true")
+parser.add_argument("--processes", "-p", help="Number of worker processes for --deep and --cache (default: one per core)", type=int)
+parser.add_argument("--cache", help="Only check the sentences and alignment blocks that changed since the previous run, whose results are saved in this file (default: STA.xml.check-cache)", nargs="?", const="")
+
+def check_shards(args):
+## Sharded mode: the shards are checked in parallel and the results are combined (see shards.py)
+    if __package__:
+        from .. import shards
+    else:
+        import shards
+    try:
+        sharded = shards.ShardedTreebank(args.manifest,args.processes)
+    except (IOError,ValueError) as e:
+        eprint("check-STA-align.py: %s" % (e))
+        return 1
+    result = sharded.check(args.deep)
+    for (shard,side,node_id) in result['missing']:
+        eprint("Shard %s: The following %s-side node ID, which is referenced by the alignment file, does not occur in the %s-side tree! %s" % (shard,side,side,node_id))
+    for treebank,errors in result['treebank_errors'].items():
+        for (line,sentid,message) in errors:
+            eprint("%s:%s: %s: %s" % (treebank,line,sentid,message))
+    if result['missing'] or any(result['treebank_errors'].values()):
+        return 1
+    eprint("All %s shards are intact, and all alignments are valid%s." % (len(sharded.manifest['shards'])," and the treebanks are well-formed" if args.deep else ""))
+    return 0
+
+def check_incremental(args):
+## Incremental mode: only changed units are parsed (see revalidation.py)
+    if __package__:
+        from .. import revalidation
+    else:
+        import revalidation
+    validator = revalidation.IncrementalValidator(args.processes)
+    result = validator.validate(args.align,args.source,args.target,args.cache or None,args.deep)
+    for (side,line,node_id) in result['missing']:
+        eprint("%s:%s: The following %s-side node ID, which is referenced by the alignment file, does not occur in the %s-side tree! %s" % (args.align,line,side,side,node_id))
+    for (line,message) in result['alignment_errors']:
+        eprint("%s:%s: %s" % (args.align,line,message))
+    for treebank,errors in result['treebank_errors'].items():
+        for (line,sentid,message) in errors:
+            eprint("%s:%s: %s: %s" % (treebank,line,sentid,message))
+    eprint("Checked %s and reused %s sentences and alignment blocks." % (result['stats']['checked'],result['stats']['reused']))
+    if result['missing'] or result['alignment_errors'] or any(result['treebank_errors'].values()):
+        return 1
+    if args.deep:
+        eprint("Referenced treebanks exist, all alignments are valid and the treebanks are well-formed.")
+    else:
+        eprint("Referenced treebanks exist and all alignments are valid.")
+    return 0
 
-## Parse arguments
-args = parser.parse_args()
-
-## Get tree objects of STA-XML
-align_tree = etree.parse(args.align)
-
-## Get object of Files class in sta.py
-files = sta.Files()
-
-## Get objects of Nodes class in tiger.py
-source_nodes = tiger.GetInfo()
-target_nodes = tiger.GetInfo()
-
-def get_treebanks():
-    ## Get absolute path of alignment file
-    abs_input=os.path.abspath(args.align)
-    filenames=files.get_treebank_files(align_tree,abs_input)
-    if not filenames:
-        eprint("At least one of the treebanks referred to in the alignment file does not exist!")
-        sys.exit(1)
+def check_full(args):
+    from lxml import etree
+    if __package__:
+        from .. import sta, tiger, files, diagnostics
     else:
-        stree = etree.parse(filenames[0])
-        ttree = etree.parse(filenames[1])
-        return filenames
-
-if (not args.source or not args.target):
-    (stree,ttree) = get_treebanks()
-else:
-    possible_stree=Path(args.source)
-    possible_ttree=Path(args.target)
-    if not possible_stree.is_file():
-        eprint("check-STA-align.py: Specified source-side TIGER-XML file (args.source) does not exist!")
-        sys.exit(1)
+        import sta, tiger, files, diagnostics
+
+    ## Get object of CompressedFile class in files.py
+    compressed_file = files.CompressedFile()
+
+    ## Get tree objects of STA-XML
+    with compressed_file.open_read(args.align) as f:
+        align_tree = etree.parse(f)
+
+    ## Get object of Files class in sta.py
+    sta_files = sta.Files()
+
+    ## Get objects of Nodes class in tiger.py
+    source_nodes = tiger.GetInfo()
+    target_nodes = tiger.GetInfo()
+
+    if (not args.source or not args.target):
+        ## Get absolute path of alignment file
+        abs_input=os.path.abspath(args.align)
+        filenames=sta_files.get_treebank_files(align_tree,abs_input)
+        if not filenames:
+            eprint("At least one of the treebanks referred to in the alignment file does not exist!")
+            return 1
+        (stree,ttree) = filenames
     else:
-        stree = args.source
-    if not possible_ttree.is_file():
-        eprint("check-STA-align.py: Specified target-side TIGER-XML file (args.target) does not exist!")
-        sys.exit(1)
+        possible_stree=Path(args.source)
+        possible_ttree=Path(args.target)
+        if not possible_stree.is_file():
+            eprint("check-STA-align.py: Specified source-side TIGER-XML file (args.source) does not exist!")
+            return 1
+        else:
+            stree = args.source
+        if not possible_ttree.is_file():
+            eprint("check-STA-align.py: Specified target-side TIGER-XML file (args.target) does not exist!")
+            return 1
+        else:
+            ttree = args.target
+
+    ## Now that we know that the TIGER-XML trees exist, get all treebank IDs in dictionary format so we can quickly check them.
+    ## Given the filenames, get_nodes only extracts the IDs and does not build the trees.
+    snodes = source_nodes.get_nodes(stree,"dict")
+    tnodes = target_nodes.get_nodes(ttree,"dict")
+
+    is_ok = 1
+
+    ## Now iterate through the STA-XML
+    align_root = align_tree.getroot()
+    for align in align_root.iter("align"):
+        source_node = align[0]
+        target_node = align[1]
+        source_align_id = source_node.attrib['node_id']
+        target_align_id = target_node.attrib['node_id']
+        if source_align_id not in snodes:
+            eprint ("The following source-side node ID, which is referenced by the alignment file, does not occur in the source-side tree! ",source_align_id)
+            is_ok = 0
+        if target_align_id not in tnodes:
+            eprint ("The following target-side node ID, which is referenced by the alignment file, does not occur in the target-side tree! ",target_align_id)
+            is_ok = 0
+
+    if args.deep:
+        treebank_diagnostics = diagnostics.Diagnostics()
+        for treebank in (stree,ttree):
+            report = treebank_diagnostics.check_file(treebank,args.processes,deep=True)
+            for (line,sentid,message) in report['errors']:
+                eprint("%s:%s: %s: %s" % (treebank,line,sentid,message))
+                is_ok = 0
+
+    if is_ok == 0:
+        return 1
+    if args.deep:
+        eprint("Referenced treebanks exist, all alignments are valid and the treebanks are well-formed.")
     else:
-        ttree = args.target
-
-## Now that we know that the TIGER-XML trees exist, let's create objects for them.
-source_tree = etree.parse(stree)
-target_tree = etree.parse(ttree)
-
-## Get all treebank IDs in dictionary format so we can quickly check them.
-snodes = source_nodes.get_nodes(source_tree,"dict")
-tnodes = target_nodes.get_nodes(target_tree,"dict")
-
-is_ok = 1
-
-## Now iterate through the STA-XML
-align_root = align_tree.getroot()
-for align in align_root.iter("align"):
-    source_node = align[0]
-    target_node = align[1]
-    source_align_id = source_node.attrib['node_id']
-    target_align_id = target_node.attrib['node_id']
-    if source_align_id not in snodes:
-        eprint ("The following source-side node ID, which is referenced by the alignment file, does not occur in the source-side tree! ",source_align_id)
-        is_ok = 0
-    if target_align_id not in tnodes:
-        eprint ("The following target-side node ID, which is referenced by the alignment file, does not occur in the target-side tree! ",target_align_id)
-        is_ok = 0
-
-if is_ok == 1:
-    eprint("Referenced treebanks exist and all alignments are valid.")
+        eprint("Referenced treebanks exist and all alignments are valid.")
+    return 0
+
+def main(argv=None):
+## The libraries (and lxml) are only imported by the mode that needs them, so that --help and the --cache mode start quickly.
+    args = parser.parse_args(argv)
+    if not args.align and not args.manifest:
+        parser.error("either --align or --manifest is required")
+    if not __package__ and lib_path not in sys.path:
+        sys.path.append(lib_path)
+    if args.manifest:
+        return check_shards(args)
+    if args.cache is not None:
+        return check_incremental(args)
+    return check_full(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
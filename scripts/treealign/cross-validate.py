@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+## Runs the cross validation of an external tree aligner over the folds created by ten-fold.py, and optionally scores the predicted alignments.
+## For each fold, the training command and then the alignment command are run. Both are templates in which the following fields are filled in with the (shell-quoted) files of the fold:
+## {fold}: fold number
+## {train_align}, {train_source}, {train_target}: STA-XML and TIGER-XML files of the training set
+## {test_align}, {test_source}, {test_target}: STA-XML and TIGER-XML files of the test set
+## {workdir}: a directory for this fold in the run directory, {model}: {workdir}/model
+## {predicted}: the STA-XML file that the alignment command must write
+## The output of each command is saved in {workdir}/train.log and {workdir}/align.log, and its start, duration and exit status in {workdir}/status.json.
+## If the script is interrupted or a fold fails, running it again with the same directories skips the folds that are already complete.
+
+## Usage:
+
+# >>> python3 cross-validate.py -f fold-directory -r run-directory --train "command template" --align "command template" [ -j jobs ] [ --memory MB ] [ --cputime seconds ] [ --timeout seconds ] [ --evaluate ]
+
+## Example use:
+
+# >>> python3 cross-validate.py -f ~/align/lit+law/308_folds_corpus-with-308 -r ~/align/lit+law/308_runs -j 4 --memory 8000 --train "treealign -c train -a {train_align} -f {model}" --align "treealign -c align -a {test_align} -f {model} > {predicted}" --evaluate
+
+## Requires crossval.py, evaluation.py, extract.py, tiger.py and files.py in ../../libs.
+## Requires the lxml package and its dependencies. (https://lxml.de/installation.html)
+
+import sys
+import os
+import argparse
+lib_path = os.path.abspath(os.path.join(__file__, '..', '..', '..', 'libs'))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--folds", "-f", help="Output directory of ten-fold.py", required=True)
+parser.add_argument("--rundir", "-r", help="Directory for the models, logs and predicted alignments", required=True)
+parser.add_argument("--train", help="Training command template", required=True)
+parser.add_argument("--align", help="Alignment command template, which writes {predicted}", required=True)
+parser.add_argument("--jobs", "-j", help="Number of folds to run at the same time (default: 1)", type=int, default=1)
+parser.add_argument("--memory", help="Maximum memory (address space) of each command in MB", type=int)
+parser.add_argument("--cputime", help="Maximum CPU time of each command in seconds", type=int)
+parser.add_argument("--timeout", help="Maximum wall-clock time of each command in seconds", type=int)
+parser.add_argument("--only", help="Only run these fold numbers", type=int, nargs="+")
+parser.add_argument("--evaluate", help="Score the predicted alignments of all complete folds against the test folds", action="store_true")
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    if __package__:
+        from .. import crossval, evaluation
+    else:
+        if lib_path not in sys.path:
+            sys.path.append(lib_path)
+        import crossval, evaluation
+
+    if not os.path.isdir(args.folds):
+        print("cross-validate.py: Fold directory (%s) does not exist!" % (args.folds),file=sys.stderr)
+        return 1
+
+    cv = crossval.CrossValidation(args.folds,args.rundir,args.train,args.align,args.jobs,args.memory*1024*1024 if args.memory else None,args.cputime,args.timeout)
+    if not cv.folds:
+        print("cross-validate.py: No folds found in %s!" % (args.folds),file=sys.stderr)
+        return 1
+    if args.only:
+        unknown = [fold for fold in args.only if fold not in cv.folds]
+        if unknown:
+            parser.error("unknown fold numbers in --only: %s (available: %s)" % (" ".join(map(str,unknown))," ".join(map(str,sorted(cv.folds)))))
+    try:
+        cv.command("train",min(cv.folds))
+        cv.command("align",min(cv.folds))
+    except (KeyError,IndexError) as e:
+        print("cross-validate.py: Unknown field in command template: %s" % (e),file=sys.stderr)
+        return 1
+
+    statuses = cv.run(args.only)
+
+    print("fold\tstatus\ttrain seconds\talign seconds\tpredicted")
+    failed = 0
+    for fold,status in statuses.items():
+        if cv.completed(fold):
+            state = "ok"
+        else:
+            state = "failed"
+            failed += 1
+        seconds = [str(status.get(phase,{}).get('seconds',"-")) for phase in crossval.PHASES]
+        print("%s\t%s\t%s\t%s\t%s" % (fold,state,seconds[0],seconds[1],cv.predicted_file(fold)))
+
+    if args.evaluate:
+        pairs = cv.predictions()
+        if pairs:
+            evaluator = evaluation.Evaluator()
+            aggregated = evaluator.aggregate(evaluator.evaluate_folds(pairs))
+            print()
+            print("%s folds\tprecision\trecall\tf1" % (len(pairs)))
+            summary = aggregated['overall']
+            print("overall\t%.4f ± %.4f\t%.4f ± %.4f\t%.4f ± %.4f" % (*summary['precision'],*summary['recall'],*summary['f1']))
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+## Evaluates predicted tree alignments against gold standard alignments, both in STA-XML format (Stockholm TreeAligner format), e.g. for the test folds created by ten-fold.py.
+
+## For each pair of gold and predicted files, precision, recall and F1 are computed overall, per alignment type and per node class (t: terminal to terminal, nt: nonterminal to nonterminal, mixed). Pairs are evaluated in parallel, and the scores are aggregated with mean and standard deviation over the folds.
+## Node classes are looked up in the treebanks referred to by the gold files. If they cannot be found, nodes numbered 500 or higher (e.g. s3_500) are taken to be nonterminals.
+## The treebanks are indexed once and shared with the worker processes (see shared.py). For folds created by ten-fold.py, --treebanks gives the original source and target treebanks, so that only those two are indexed instead of the treebanks of every fold.
+
+## Usage:
+
+# >>> python3 evaluate.py -g gold1.xml gold2.xml ... -p predicted1.xml predicted2.xml ... [ --sentences scores.tsv ] [ --processes N ] [ --treebanks source.xml target.xml ]
+
+## Example use:
+
+# >>> python3 evaluate.py -g ~/align/lit+law/folds/ALM-308.rand{1..10}.test.xml -p ~/align/lit+law/predicted/ALM-308.rand{1..10}.test.xml
+
+## Requires evaluation.py, extract.py, shared.py, loader.py, tiger.py and files.py in ../../libs.
+## Requires the lxml package and its dependencies. (https://lxml.de/installation.html)
+
+import sys
+import os
+import argparse
+lib_path = os.path.abspath(os.path.join(__file__, '..', '..', '..', 'libs'))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--gold", "-g", help="Gold standard STA-XML files, one per fold", nargs="+", required=True)
+parser.add_argument("--predicted", "-p", help="Predicted STA-XML files, in the same order as the gold files", nargs="+", required=True)
+parser.add_argument("--sentences", help="Write precision, recall and F1 per sentence pair and fold to this file (tab-separated)")
+parser.add_argument("--processes", help="Number of worker processes (default: number of cores)", type=int)
+parser.add_argument("--treebanks", "-t", help="Source and target treebanks that the folds were cut from (e.g. by ten-fold.py): their node indexes are shared by all worker processes, instead of indexing the treebanks of every fold", nargs=2, metavar=("SOURCE","TARGET"))
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    if __package__:
+        from .. import evaluation
+    else:
+        if lib_path not in sys.path:
+            sys.path.append(lib_path)
+        import evaluation
+
+    if len(args.gold) != len(args.predicted):
+        print("evaluate.py: The number of gold files (%s) and predicted files (%s) differ!" % (len(args.gold),len(args.predicted)),file=sys.stderr)
+        return 1
+
+    evaluator = evaluation.Evaluator()
+    results = evaluator.evaluate_folds(list(zip(args.gold,args.predicted)),args.processes,args.treebanks)
+
+    print("fold\tprecision\trecall\tf1\tcorrect\tpredicted\tgold")
+    for i,r in enumerate(results,1):
+        (p,r_,f) = evaluation.scores(*r['overall'])
+        print("%s\t%.4f\t%.4f\t%.4f\t%s\t%s\t%s" % (i,p,r_,f,*r['overall']))
+
+    aggregated = evaluator.aggregate(results)
+    def print_summary(label,summary):
+        print("%s\t%.4f ± %.4f\t%.4f ± %.4f\t%.4f ± %.4f" % (label,*summary['precision'],*summary['recall'],*summary['f1']))
+
+    print()
+    print("mean ± std\tprecision\trecall\tf1")
+    print_summary("overall",aggregated['overall'])
+    for name in ('type','class'):
+        for value,summary in aggregated[name].items():
+            print_summary(name+" "+value,summary)
+
+    if args.sentences:
+        with open(args.sentences,"w") as file:
+            file.write("fold\tsentences\tprecision\trecall\tf1\tcorrect\tpredicted\tgold\n")
+            for i,r in enumerate(results,1):
+                for sent,counts in r['sentence'].items():
+                    file.write("%s\t%s\t%.4f\t%.4f\t%.4f\t%s\t%s\t%s\n" % (i,sent,*evaluation.scores(*counts),*counts))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+## Receives a parallel treebank in the following format:
+## - STA-XML alignment file (Stockholm TreeAligner format)
+## - Two treebanks in the source and target language, in TIGER-XML, as referred to by the STA-XML
+
+## Exports the node attributes (node ID, sentence ID, word, lemma, pos, cat, parent and parent edge label) of both treebanks and the alignments (aligned nodes, type, author, last_change) to columnar tables.
+## String columns are dictionary-encoded. The tables can be loaded (memory-mapped) with columns.load in ../../libs/columns.py, so that statistics can be computed without parsing XML.
+
+## Usage:
+
+# >>> python3 export-columns.py -a STA.xml -o outdir [ -f npy|parquet ]
+
+## Example use:
+
+# >>> python3 export-columns.py -a ~/align/lit+law/308_corpus-with-308/ALM-308_normalized.xml -o ~/align/lit+law/308_columns
+# >>> python3 -c "import columns; t = columns.load('308_columns'); print(len(t['alignments']['type']))"
+
+## Requires columns.py, sta.py and files.py in ../../libs.
+## Requires the lxml and numpy packages, and pyarrow for the Parquet format.
+
+import sys
+import os
+import argparse
+lib_path = os.path.abspath(os.path.join(__file__, '..', '..', '..', 'libs'))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--align", "-a", help="Stockholm TreeAligner style alignment file", required=True)
+parser.add_argument("--outdir", "-o", help="Output directory for the tables", required=True)
+parser.add_argument("--format", "-f", help="Storage format (default: npy)", choices=["npy","parquet"], default="npy")
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    if __package__:
+        from .. import columns
+    else:
+        if lib_path not in sys.path:
+            sys.path.append(lib_path)
+        import columns
+
+    manifest = columns.ColumnExporter().export(args.align,args.outdir,args.format)
+    for name,info in manifest['tables'].items():
+        print("%s: %s rows" % (name,info['rows']),file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
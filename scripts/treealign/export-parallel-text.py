@@ -0,0 +1,50 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+## Receives a parallel treebank in the following format:
+## - STA-XML alignment file (Stockholm TreeAligner format)
+## - Two treebanks in the source and target language, in TIGER-XML, as referred to by the STA-XML
+
+## Exports the aligned sentence pairs as tokenised parallel text (one sentence per line), and the alignments between terminals as word links in Pharaoh format (e.g. "0-0 1-2 2-1"), e.g. to train word aligners.
+## Sentence pairs are written in the order in which they first occur in the alignment file. The output files are named after the treebank IDs in the STA-XML header:
+## - <prefix>.<source ID>, <prefix>.<target ID>: the sentences
+## - <prefix>.align: the word links
+## - <prefix>.ids: the sentence ID pair of each line
+
+## Usage:
+
+# >>> python3 export-parallel-text.py -a STA.xml -o prefix [ --type good ] [ --compress gz|xz|zst ]
+
+## Example use:
+
+# >>> python3 export-parallel-text.py -a ~/align/lit+law/308_corpus-with-308/ALM-308_normalized.xml -o ~/align/lit+law/308_text/ALM-308
+
+## Requires parallel.py, extract.py and files.py in ../../libs.
+## Requires the lxml package and its dependencies. (https://lxml.de/installation.html)
+
+import sys
+import os
+import argparse
+lib_path = os.path.abspath(os.path.join(__file__, '..', '..', '..', 'libs'))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--align", "-a", help="Stockholm TreeAligner style alignment file", required=True)
+parser.add_argument("--output", "-o", help="Prefix of the output files", required=True)
+parser.add_argument("--type", help="Only export word links of this alignment type (can be repeated)", action="append")
+parser.add_argument("--compress", "-c", help="Compress the output files with gzip, xz or zstd", choices=["gz","xz","zst"])
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    if __package__:
+        from .. import parallel
+    else:
+        if lib_path not in sys.path:
+            sys.path.append(lib_path)
+        import parallel
+
+    nr_pairs = parallel.ParallelTextExporter().export(args.align,args.output,args.type,args.compress)
+    print("Wrote %s sentence pairs to %s.*" % (nr_pairs,args.output),file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
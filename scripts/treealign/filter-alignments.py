@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+## Receives a STA-XML alignment file (Stockholm TreeAligner format) and selects alignments by type, author and/or date of the last change (attribute last_change of <align>).
+
+## The selected alignments are listed (source node ID, target node ID, type, author, last_change) or, with -o, written to a new STA-XML file with the same header.
+## The metadata is indexed in a file next to the alignment file (<alignment file>.meta.idx), so that later queries do not need to parse the alignment file again.
+
+## Usage:
+
+# >>> python3 filter-alignments.py -a STA.xml [ --type TYPE ] [ --author AUTHOR ] [ --since DATE ] [ --until DATE ] [ -o output.xml ]
+
+## Example use:
+
+# >>> python3 filter-alignments.py -a ~/align/lit+law/308_corpus-with-308/ALM-308_normalized.xml --type fuzzy --author OLEG --since 2017-06-01
+# >>> python3 filter-alignments.py -a ~/align/lit+law/308_corpus-with-308/ALM-308_normalized.xml --type fuzzy -o ALM-308_fuzzy.xml
+
+## Requires index.py, sta.py, writer.py and files.py in ../../libs.
+## Requires the lxml package and its dependencies. (https://lxml.de/installation.html)
+
+import sys
+import os
+import argparse
+lib_path = os.path.abspath(os.path.join(__file__, '..', '..', '..', 'libs'))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--align", "-a", help="Stockholm TreeAligner style alignment file", required=True)
+parser.add_argument("--type", help="Alignment type, e.g. good or fuzzy (can be repeated)", action="append")
+parser.add_argument("--author", help="Author of the alignment (can be repeated)", action="append")
+parser.add_argument("--since", help="Only alignments changed on or after this date (e.g. 2017-06-01)")
+parser.add_argument("--until", help="Only alignments changed on or before this date (e.g. 2017-12-31)")
+parser.add_argument("--output", "-o", help="Write the selected alignments to this STA-XML file instead of listing them")
+parser.add_argument("--rebuild", help="Rebuild the metadata index", action="store_true")
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    if __package__:
+        from .. import index
+    else:
+        if lib_path not in sys.path:
+            sys.path.append(lib_path)
+        import index
+
+    meta = index.MetadataIndex(args.align,args.rebuild)
+    rows = meta.filter(args.type,args.author,args.since,args.until)
+
+    if args.output:
+        meta.export(rows,args.output)
+        print("Wrote %s of %s alignments to %s" % (len(rows),len(meta),args.output),file=sys.stderr)
+    else:
+        for row in meta.iter_rows(rows):
+            print("\t".join(row))
+        print("%s of %s alignments selected" % (len(rows),len(meta)),file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
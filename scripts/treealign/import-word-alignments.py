@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+## Receives word alignments in Pharaoh format (e.g. the output of GIZA++ or fast_align): one line of "i-j" links (0-based token positions) per sentence pair, e.g. "0-0 1-2 2-1".
+## Converts them into STA-XML alignments between the terminals of two TIGER-XML treebanks, and writes them to a new STA-XML file, or adds them to an existing one without parsing its alignments.
+## The lines belong to the sentences of the treebanks in order, unless a file with the sentence ID pair of each line is given (--ids, e.g. the .ids file of export-parallel-text.py).
+
+## Usage:
+
+# >>> python3 import-word-alignments.py -l links -s source.xml -t target.xml -o STA.xml [ --ids ids ] [ --author GIZA ] [ --type good ] [ --date YYYY-MM-DD ]
+# >>> python3 import-word-alignments.py -l links --into STA.xml -o merged_STA.xml [ --ids ids ]
+
+## Example use:
+
+# >>> python3 import-word-alignments.py -l ~/align/lit+law/308_text/ALM-308.align --ids ~/align/lit+law/308_text/ALM-308.ids --into ~/align/lit+law/308_corpus-with-308/ALM-308_normalized.xml -o ~/align/lit+law/308_corpus-with-308/ALM-308_giza.xml
+
+## Requires parallel.py, extract.py, loader.py, writer.py and files.py in ../../libs.
+## Requires the lxml package and its dependencies. (https://lxml.de/installation.html)
+
+import sys
+import os
+import argparse
+lib_path = os.path.abspath(os.path.join(__file__, '..', '..', '..', 'libs'))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--links", "-l", help="Word alignments in Pharaoh format, one line per sentence pair", required=True)
+parser.add_argument("--source", "-s", help="Source TIGER-XML treebank (default with --into: the first treebank of the STA-XML)")
+parser.add_argument("--target", "-t", help="Target TIGER-XML treebank (default with --into: the second treebank of the STA-XML)")
+parser.add_argument("--into", help="Existing STA-XML file to which the alignments are added")
+parser.add_argument("--output", "-o", help="Output STA-XML file (compressed if it ends in .gz, .xz or .zst)", required=True)
+parser.add_argument("--ids", "-i", help="Sentence ID pair (source;target) of each line of the links file")
+parser.add_argument("--author", help="Author of the alignments (default: GIZA)", default="GIZA")
+parser.add_argument("--type", help="Type of the alignments (default: good)", default="good")
+parser.add_argument("--date", help="last_change of the alignments (default: today)")
+parser.add_argument("--nopretty", help="Do not pretty-print the output", action="store_true")
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    if __package__:
+        from .. import parallel
+    else:
+        if lib_path not in sys.path:
+            sys.path.append(lib_path)
+        import parallel
+
+    importer = parallel.WordAlignmentImporter(args.author,args.type,args.date,not args.nopretty)
+    if args.into:
+        count = importer.merge_links(args.links,args.into,args.output,args.ids,args.source,args.target)
+    else:
+        if not args.source or not args.target:
+            print("Please give the source and target treebanks (-s, -t), or an existing STA-XML file (--into).",file=sys.stderr)
+            return 1
+        count = importer.import_links(args.links,args.source,args.target,args.output,args.ids)
+    print("Wrote %s alignments to %s" % (count,args.output),file=sys.stderr)
+    if importer.skipped:
+        print("Skipped %s links that do not fit the sentence pairs" % (importer.skipped),file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+## Receives two or more STA-XML alignment files (Stockholm TreeAligner format) of different annotators who aligned the same parallel treebank.
+
+## Compares the alignments of all annotators in one pass and reports agreements, type conflicts and links that only some annotators made, together with pairwise agreement (Dice coefficient of the link sets, without and with alignment types).
+## Optionally writes a merged STA-XML file (with the header of the first file) and a tab-separated list of all node pairs on which the annotators do not fully agree.
+
+## Usage:
+
+# >>> python3 merge-STA.py -a STA1.xml STA2.xml ... [ -o merged.xml ] [ --policy union|majority|intersection ] [ --diff diff.tsv ]
+
+## Example use:
+
+# >>> python3 merge-STA.py -a ~/align/lit+law/ALM-308_oleg.xml ~/align/lit+law/ALM-308_gideon.xml -o ~/align/lit+law/ALM-308_merged.xml --policy intersection --diff ~/align/lit+law/ALM-308_diff.tsv
+
+## Requires merge.py, writer.py, tiger.py and files.py in ../../libs.
+## Requires the lxml package and its dependencies. (https://lxml.de/installation.html)
+
+import sys
+import os
+import argparse
+lib_path = os.path.abspath(os.path.join(__file__, '..', '..', '..', 'libs'))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--align", "-a", help="Stockholm TreeAligner style alignment files, one per annotator", nargs="+", required=True)
+parser.add_argument("--output", "-o", help="Merged STA-XML file")
+parser.add_argument("--policy", help="Which links to keep in the merged file (default: union)", choices=["union","majority","intersection"], default="union")
+parser.add_argument("--diff", help="Write node pairs without full agreement to this file (tab-separated)")
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    if __package__:
+        from .. import merge
+    else:
+        if lib_path not in sys.path:
+            sys.path.append(lib_path)
+        import merge
+
+    if len(args.align) < 2:
+        print("merge-STA.py: At least two alignment files are required!",file=sys.stderr)
+        return 1
+
+    merger = merge.AlignmentMerger(args.align)
+    stats = merger.merge(args.output,args.policy,args.diff)
+
+    print("Node pairs: %s" % (stats['node_pairs']))
+    print("Agreements (all annotators, same type): %s" % (stats['agreement']))
+    print("Partial (some annotators, same type): %s" % (stats['partial']))
+    print("Type conflicts: %s" % (stats['conflict']))
+    for nr,filename in enumerate(args.align):
+        print("%s: %s links, %s only in this file" % (filename,stats['links'][nr],stats['one-sided'][nr]))
+    for (i,j),(dice,dice_types) in merger.agreement(stats).items():
+        print("Agreement %s - %s: %.4f (with types: %.4f)" % (args.align[i],args.align[j],dice,dice_types))
+    if args.output:
+        print("Wrote %s links to %s" % (stats['merged'],args.output),file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+## Merges the shards written by split-shards.py back into one parallel treebank (two TIGER-XML files and a STA-XML file) with the original filenames, and with the sentences and alignments in their original order.
+## The checksums in the manifest are verified first.
+
+## Usage:
+
+# >>> python3 merge-shards.py -m outdir/manifest.json -o merged-dir
+
+## Example use:
+
+# >>> python3 merge-shards.py -m ~/align/lit+law/308_shards/manifest.json -o ~/align/lit+law/308_merged
+
+## Requires shards.py, sta.py, tiger.py, extract.py, loader.py and files.py in ../../libs.
+## Requires the lxml package and its dependencies. (https://lxml.de/installation.html)
+
+import sys
+import os
+import argparse
+lib_path = os.path.abspath(os.path.join(__file__, '..', '..', '..', 'libs'))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--manifest", "-m", help="Manifest written by split-shards.py", required=True)
+parser.add_argument("--outdir", "-o", help="Output directory", required=True)
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    if __package__:
+        from .. import shards
+    else:
+        if lib_path not in sys.path:
+            sys.path.append(lib_path)
+        import shards
+
+    try:
+        outputs = shards.ShardMerger().merge(args.manifest,args.outdir)
+    except (IOError,ValueError) as e:
+        print("merge-shards.py: %s" % (e),file=sys.stderr)
+        return 1
+    for output in outputs:
+        print("Wrote %s" % (output),file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
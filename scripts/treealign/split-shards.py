@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+## Receives a parallel treebank in the following format:
+## - STA-XML alignment file (Stockholm TreeAligner format)
+## - Two treebanks in the source and target language, in TIGER-XML, as referred to by the STA-XML
+
+## Splits it into N shards: smaller parallel treebanks of roughly equal size, each with complete sentence pairs and the alignments between them, and writes a manifest (manifest.json) with the sentence ID range, sentence positions and SHA-256 checksum of each shard file.
+## Sentences and alignments are copied byte for byte, with the whitespace in front of them, so that merge-shards.py restores the original files exactly. The files are streamed, so the original treebanks do not have to fit into memory. With --verify, the shards are merged into a temporary directory right away and compared with the original files. Sentences that are aligned to each other always end up in the same shard.
+## The shards can be checked with check-STA-align.py --manifest, and merged back into the original parallel treebank with merge-shards.py.
+
+## Usage:
+
+# >>> python3 split-shards.py -a STA.xml -o outdir -n N [ --compress gz|xz|zst ] [ --verify ]
+
+## Example use:
+
+# >>> python3 split-shards.py -a ~/align/lit+law/308_corpus-with-308/ALM-308_normalized.xml -o ~/align/lit+law/308_shards -n 16
+
+## Requires shards.py, sta.py, tiger.py, extract.py, loader.py and files.py in ../../libs.
+## Requires the lxml package and its dependencies. (https://lxml.de/installation.html)
+
+import sys
+import os
+import argparse
+import tempfile
+lib_path = os.path.abspath(os.path.join(__file__, '..', '..', '..', 'libs'))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--align", "-a", help="Stockholm TreeAligner style alignment file", required=True)
+parser.add_argument("--outdir", "-o", help="Output directory for the shards and the manifest", required=True)
+parser.add_argument("--shards", "-n", help="Number of shards", type=int, required=True)
+parser.add_argument("--compress", "-c", help="Compress the shard files with gzip, xz or zstd", choices=["gz","xz","zst"])
+parser.add_argument("--verify", help="Check that merging the shards gives back the original files", action="store_true")
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    if __package__:
+        from .. import shards
+    else:
+        if lib_path not in sys.path:
+            sys.path.append(lib_path)
+        import shards
+
+    if args.shards < 1:
+        print("split-shards.py: The number of shards must be at least 1!",file=sys.stderr)
+        return 1
+
+    manifest = shards.ShardSplitter().split(args.align,args.outdir,args.shards,args.compress)
+    for nr,shard in enumerate(manifest['shards'],1):
+        print("Shard %s: %s source and %s target sentences (%s to %s), %s alignments" % (nr,shard['source']['sentences'],shard['target']['sentences'],shard['source']['first'],shard['source']['last'],shard['alignments']),file=sys.stderr)
+    print("Wrote %s" % (os.path.join(args.outdir,shards.MANIFEST)),file=sys.stderr)
+    if args.verify:
+        with tempfile.TemporaryDirectory() as tempdir:
+            try:
+                shards.ShardMerger().merge(os.path.join(args.outdir,shards.MANIFEST),tempdir)
+            except (IOError,ValueError) as e:
+                print("split-shards.py: Verification failed: %s" % (e),file=sys.stderr)
+                return 1
+        print("Verified: merging the shards gives back the original files.",file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
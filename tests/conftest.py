@@ -0,0 +1,25 @@
+import os, sys, shutil
+import pytest
+
+## The tests import the modules in libs directly, the same way the scripts do.
+## tests/data holds a small parallel treebank: nl.xml and en.xml (33 sentences each) and align.xml (132 alignments).
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(TESTS_DIR,"data")
+sys.path.insert(0,os.path.join(TESTS_DIR,"..","libs"))
+
+@pytest.fixture
+def data(tmp_path,monkeypatch):
+## Copies the test data to a temporary directory and changes to it, so that index and cache files are written there and the treebanks of align.xml are found relative to it.
+    for name in os.listdir(DATA_DIR):
+        shutil.copy(os.path.join(DATA_DIR,name),tmp_path)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def replace_in_file(filename,old,new,count=1):
+## Changes a copy of the test data, e.g. to introduce an error.
+    with open(filename,encoding="utf-8") as f:
+        text = f.read()
+    assert old in text
+    with open(filename,"w",encoding="utf-8") as f:
+        f.write(text.replace(old,new,count))
@@ -0,0 +1,29 @@
+from lxml import etree
+import pytest
+import columns
+
+numpy = pytest.importorskip("numpy")
+
+@pytest.mark.parametrize("format",["npy","parquet"])
+def test_round_trip(data,format):
+    if format == "parquet":
+        pytest.importorskip("pyarrow")
+    columns.ColumnExporter().export("align.xml","columns",format)
+    tables = columns.load("columns")
+
+    nodes = list(etree.parse("nl.xml").getroot().iter("t","nt"))
+    source = tables['source']
+    assert source['node_id'].decode() == [el.get('id') for el in nodes]
+    assert source['word'].decode() == [el.get('word',"") for el in nodes]
+    assert source['cat'].decode() == [el.get('cat',"") for el in nodes]
+    assert list(source['kind']) == [0 if el.tag == "t" else 1 for el in nodes]
+    rows = {el.get('id'): row for row,el in enumerate(nodes)}
+    parents = {edge.get('idref'): rows[edge.getparent().get('id')] for edge in etree.parse("nl.xml").getroot().iter("edge")}
+    assert list(source['parent']) == [parents.get(el.get('id'),-1) for el in nodes]
+    assert (source['cat'].codes == source['cat'].code("NP")).sum() == sum(1 for el in nodes if el.get('cat') == "NP")
+
+    aligns = list(etree.parse("align.xml").getroot().iter("align"))
+    alignments = tables['alignments']
+    assert alignments['type'].decode() == [align.get('type') for align in aligns]
+    assert [source['node_id'][row] for row in alignments['source']] == [align[0].get('node_id') for align in aligns]
+    assert [tables['target']['node_id'][row] for row in alignments['target']] == [align[1].get('node_id') for align in aligns]
@@ -0,0 +1,42 @@
+import os, sys, subprocess
+import pytest
+import crossval, evaluation
+from conftest import TESTS_DIR
+
+SCRIPTS_DIR = os.path.join(TESTS_DIR,"..","scripts","treealign")
+
+def run_script(name,*args):
+    return subprocess.run([sys.executable,os.path.join(SCRIPTS_DIR,name)]+list(args),capture_output=True,text=True)
+
+@pytest.fixture
+def folds(data):
+    os.mkdir("folds")
+    assert run_script("ten-fold.py","-a","align.xml","-o","folds","-s","1").returncode == 0
+    return "folds"
+
+def test_run(folds):
+    cv = crossval.CrossValidation(folds,"runs","true {train_align}","cp {test_align} {predicted}",jobs=3)
+    assert sorted(cv.folds) == list(range(1,11))
+    statuses = cv.run()
+    assert all(cv.completed(fold) for fold in statuses)
+    assert all(status['align']['returncode'] == 0 for status in statuses.values())
+    pairs = cv.predictions()
+    assert len(pairs) == 10
+    aggregated = evaluation.Evaluator().aggregate(evaluation.Evaluator().evaluate_folds(pairs,processes=1))
+    assert aggregated['overall']['f1'] == (1.0,0.0)
+    ## complete folds are not run again
+    cv = crossval.CrossValidation(folds,"runs","false","false")
+    assert cv.run() == statuses
+
+def test_failed_and_unknown_folds(folds):
+    cv = crossval.CrossValidation(folds,"runs","true","exit 3")
+    statuses = cv.run([1,2])
+    assert [statuses[fold]['align']['returncode'] for fold in (1,2)] == [3,3]
+    assert not cv.completed(1)
+    with pytest.raises(ValueError):
+        cv.run([1,11])
+
+def test_script_rejects_unknown_folds(folds):
+    result = run_script("cross-validate.py","-f",folds,"-r","runs","--train","true","--align","true","--only","1","99")
+    assert result.returncode == 2
+    assert "unknown fold numbers in --only: 99" in result.stderr
@@ -0,0 +1,36 @@
+from lxml import etree
+import diagnostics, tiger
+from conftest import replace_in_file
+
+def test_matches_getinfo(data):
+    report = diagnostics.Diagnostics().check_file("nl.xml",processes=2,nr_chunks=4)
+    tree = etree.parse("nl.xml")
+    info = tiger.GetInfo()
+    (nr_sents,nr_uniq,non_uniq,sents_with_two_or_more) = info.get_nr_sents(tree,1)
+    assert (report['nr_sents'],report['nr_uniq'],report['non_uniq'],report['sents_with_two_or_more']) == (nr_sents,nr_uniq,non_uniq,sents_with_two_or_more)
+    assert report['leading_zeros'] == info.any_sentids_have_leading_zeros(tree)[1]
+    assert report['nr_terminals'] == len(tree.findall(".//t"))
+    assert report['nr_nonterminals'] == len(tree.findall(".//nt"))
+    assert report['nr_edges'] == len(tree.findall(".//edge"))
+
+def test_chunks_match_single_process(data):
+    replace_in_file("nl.xml",'<s id="s7">','<s id="s2">')
+    serial = diagnostics.Diagnostics().check_tree(etree.parse("nl.xml"))
+    for nr_chunks in (1,3,33):
+        assert diagnostics.Diagnostics().check_file("nl.xml",processes=2,nr_chunks=nr_chunks) == serial
+    assert serial['non_uniq'] == ["s2"]
+
+def test_deep_clean(data):
+    report = diagnostics.Diagnostics().check_file("nl.xml",processes=2,nr_chunks=4,deep=True)
+    assert report == {'nr_sents': 33, 'errors': []}
+
+def test_deep_errors(data):
+    replace_in_file("nl.xml",'<t id="s2_1"','<t id="s1_1"')
+    replace_in_file("nl.xml",'<graph root="s12_502">','<graph>')
+    for nr_chunks in (1,4):
+        errors = diagnostics.Diagnostics().check_file("nl.xml",processes=2,nr_chunks=nr_chunks,deep=True)['errors']
+        messages = [(sentid,message) for (line,sentid,message) in errors]
+        assert ("s2","duplicate node ID s1_1 (first at line 11)") in messages ## a node ID of another sentence, possibly in another chunk
+        assert ("s2","node ID s1_1 does not match sentence ID s2") in messages
+        assert ("s12","<graph> without root attribute") in messages
+        assert [line for (line,sentid,message) in errors] == sorted(line for (line,sentid,message) in errors)
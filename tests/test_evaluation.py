@@ -0,0 +1,50 @@
+from lxml import etree
+import pytest
+import evaluation
+
+def write_prediction(filename,drop=3,retype=5):
+## Writes a "predicted" copy of align.xml without every drop-th alignment, with the type of every retype-th alignment changed, and with one wrong alignment.
+## Returns the gold and predicted alignments as (source ID, target ID, type).
+    tree = etree.parse("align.xml")
+    alignments = tree.getroot().find("alignments")
+    gold = [(align[0].get('node_id'),align[1].get('node_id'),align.get('type')) for align in alignments]
+    for i,align in enumerate(list(alignments)):
+        if i % drop == 0:
+            alignments.remove(align)
+        elif i % retype == 0:
+            align.set('type',"fuzzy" if align.get('type') == "good" else "good")
+    wrong = etree.SubElement(alignments,"align",{'author': "test", 'last_change': "2020-01-01", 'type': "good"})
+    etree.SubElement(wrong,"node",{'node_id': "s1_1", 'treebank_id': "nl"})
+    etree.SubElement(wrong,"node",{'node_id': "s33_500", 'treebank_id': "en"})
+    tree.write(filename)
+    predicted = [(align[0].get('node_id'),align[1].get('node_id'),align.get('type')) for align in alignments]
+    return (gold,predicted)
+
+def test_evaluate(data):
+    (gold,predicted) = write_prediction("predicted.xml")
+    result = evaluation.Evaluator().evaluate("align.xml","predicted.xml")
+    gold_pairs = {(s,t): type for (s,t,type) in gold}
+    predicted_pairs = {(s,t): type for (s,t,type) in predicted}
+    assert result['overall'] == [len(gold_pairs.keys() & predicted_pairs.keys()),len(predicted_pairs),len(gold_pairs)]
+    for type in ("good","fuzzy"):
+        correct = sum(1 for pair,t in gold_pairs.items() if t == type and predicted_pairs.get(pair) == type)
+        assert result['type'][type] == [correct,list(predicted_pairs.values()).count(type),list(gold_pairs.values()).count(type)]
+    assert sum(counts[1] for counts in result['class'].values()) == len(predicted_pairs)
+    assert result['sentence']["s1;s33"] == [0,1,0]
+
+def test_perfect_prediction(data):
+    result = evaluation.Evaluator().evaluate("align.xml","align.xml")
+    assert evaluation.scores(*result['overall']) == (1.0,1.0,1.0)
+
+def test_evaluate_folds(data):
+    pairs = []
+    for nr in range(3):
+        write_prediction("predicted%s.xml" % (nr),drop=nr+2,retype=nr+4)
+        pairs.append(("align.xml","predicted%s.xml" % (nr)))
+    evaluator = evaluation.Evaluator()
+    serial = evaluator.evaluate_folds(pairs,processes=1)
+    assert evaluator.evaluate_folds(pairs,processes=3) == serial
+    assert serial == [evaluator.evaluate(gold_file,predicted_file) for (gold_file,predicted_file) in pairs]
+    aggregated = evaluator.aggregate(serial)
+    precisions = [evaluation.scores(*result['overall'])[0] for result in serial]
+    assert aggregated['overall']['precision'][0] == pytest.approx(sum(precisions)/3)
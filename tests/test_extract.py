@@ -0,0 +1,14 @@
+from lxml import etree
+import tiger, sta
+
+def test_tiger_getinfo(data):
+    info = tiger.GetInfo()
+    tree = etree.parse("nl.xml")
+    assert info.get_sent_ids("nl.xml") == info.get_sent_ids(tree)
+    assert info.link_nodes_to_sentids("nl.xml") == info.link_nodes_to_sentids(tree)
+    assert info.get_nodes("nl.xml","list") == info.get_nodes(tree,"list")
+    assert info.get_nodes("nl.xml","dict") == info.get_nodes(tree,"dict")
+    assert info.get_words("nl.xml") == info.get_words(tree)
+
+def test_sta_getinfo(data):
+    assert sta.GetInfo().get_node_pairs("align.xml") == sta.GetInfo().get_node_pairs(etree.parse("align.xml"))
@@ -0,0 +1,23 @@
+import pytest
+import files
+
+@pytest.mark.parametrize("extension",["",".gz",".xz",".zst"])
+def test_round_trip(tmp_path,extension):
+    if extension == ".zst":
+        pytest.importorskip("zstandard")
+    filename = str(tmp_path/("de.xml"+extension))
+    data = b"<corpus>\n"+b"<s id=\"s1\"/>\n"*10000+b"</corpus>\n"
+    compressed_file = files.CompressedFile()
+    with compressed_file.open_write(filename) as f:
+        f.write(data)
+    with compressed_file.open_read(filename) as f:
+        assert f.read() == data
+
+def test_zstd_frames(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    filename = str(tmp_path/"de.xml.zst")
+    with open(filename,"wb") as f: ## e.g. concatenated with cat
+        f.write(zstandard.ZstdCompressor().compress(b"<corpus>"))
+        f.write(zstandard.ZstdCompressor().compress(b"</corpus>"))
+    with files.CompressedFile().open_read(filename) as f:
+        assert f.read() == b"<corpus></corpus>"
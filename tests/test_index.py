@@ -0,0 +1,73 @@
+import os
+from lxml import etree
+import index, tiger
+from conftest import replace_in_file
+
+def nodes_where(filename,**conditions):
+## The IDs of the nodes that match all conditions, computed from the element tree (label is that of the edge pointing to the node).
+    root = etree.parse(filename).getroot()
+    labels = {edge.get('idref'): edge.get('label') for edge in root.iter("edge")}
+    ids = []
+    for el in root.iter("t","nt"):
+        values = dict(el.attrib,label=labels.get(el.get('id')))
+        if all(values.get(k) == v for k,v in conditions.items()):
+            ids.append(el.get('id'))
+    return ids
+
+def test_query(data):
+    query = index.Query("align.xml")
+    assert query.nodes(0,cat="NP") == nodes_where("nl.xml",cat="NP")
+    assert query.nodes(1,pos="DT",label="HD") == nodes_where("en.xml",pos="DT",label="HD")
+    assert query.nodes(0,word="no such word") == []
+    sentids = tiger.GetInfo().link_nodes_to_sentids(etree.parse("nl.xml"))
+    assert query.sentences(0,cat="VP") == list(dict.fromkeys(sentids[id] for id in nodes_where("nl.xml",cat="VP")))
+
+    source_np = set(nodes_where("nl.xml",cat="NP"))
+    target_vp = set(nodes_where("en.xml",cat="VP"))
+    pairs = [(align[0].get('node_id'),align[1].get('node_id')) for align in etree.parse("align.xml").getroot().iter("align")]
+    expected = sorted(set(p for p in pairs if p[0] in source_np and p[1] in target_vp),key=lambda p: (query.treebanks[0].get_node_number(p[0]),query.treebanks[1].get_node_number(p[1])))
+    assert query.aligned({'cat': "NP"},{'cat': "VP"}) == expected
+    assert len(query.aligned({},{})) == len(set(pairs))
+
+def test_saved_and_rebuilt(data):
+    index.Query("align.xml")
+    assert os.path.exists("nl.xml.idx") and os.path.exists("align.xml.idx")
+    assert not [name for name in os.listdir(".") if ".tmp-" in name]
+    with open("nl.xml",encoding="utf-8") as f:
+        text = f.read()
+    with open("nl.xml","w",encoding="utf-8") as f:
+        f.write(text.replace('cat="NP"','cat="XP"'))
+    stat = os.stat("nl.xml")
+    os.utime("nl.xml",ns=(stat.st_atime_ns,stat.st_mtime_ns+10**9)) ## a different stamp, even on file systems with coarse timestamps
+    query = index.Query("align.xml")
+    assert query.nodes(0,cat="NP") == []
+    assert query.nodes(0,cat="XP") == nodes_where("nl.xml",cat="XP")
+
+def aligns_where(filename,**conditions):
+## The row numbers of the <align> elements for which the function of each attribute returns True.
+    aligns = etree.parse(filename).getroot().iter("align")
+    return [row for row,align in enumerate(aligns) if all(condition(align.get(a)) for a,condition in conditions.items())]
+
+def test_metadata_filter(data):
+    meta = index.MetadataIndex("align.xml")
+    assert list(meta.filter()) == list(range(132))
+    assert list(meta.filter(type="fuzzy")) == aligns_where("align.xml",type=lambda v: v == "fuzzy")
+    assert list(meta.filter(type=["good","fuzzy"],author="OLEG")) == aligns_where("align.xml",type=lambda v: v in ("good","fuzzy"),author=lambda v: v == "OLEG")
+    assert list(meta.filter(since="2017-09-01",until="2017-11-15")) == aligns_where("align.xml",last_change=lambda v: "2017-09-01" <= v[:10] <= "2017-11-15")
+    assert list(meta.filter(author="nobody")) == []
+
+def test_metadata_without_last_change(data):
+    replace_in_file("align.xml",'<align author="OLEG" last_change="2017-08-21" type="good">','<align author="OLEG" type="good">')
+    meta = index.MetadataIndex("align.xml")
+    assert 0 not in meta.filter(until="2017-12-31")
+    assert 0 not in meta.filter(since="2000-01-01")
+    assert 0 in meta.filter(type="good")
+    assert list(meta.filter(until="2017-12-31")) == aligns_where("align.xml",last_change=lambda v: v is not None and v[:10] <= "2017-12-31")
+
+def test_metadata_export(data):
+    meta = index.MetadataIndex("align.xml")
+    rows = meta.filter(type="fuzzy")
+    meta.export(rows,"fuzzy.xml")
+    exported = etree.parse("fuzzy.xml").getroot()
+    assert exported.find("head") is not None
+    assert [(align[0].get('node_id'),align[1].get('node_id')) for align in exported.iter("align")] == [row[:2] for row in meta.iter_rows(rows)]
@@ -0,0 +1,25 @@
+import gzip, lzma
+from lxml import etree
+import pytest
+import loader, tiger
+
+def test_link_nodes_to_sentids(data):
+    expected = tiger.GetInfo().link_nodes_to_sentids(etree.parse("nl.xml"))
+    for processes,nr_chunks in ((1,1),(2,3),(2,33),(2,100)):
+        assert loader.ChunkedLoader(processes).link_nodes_to_sentids("nl.xml",nr_chunks) == expected
+
+@pytest.mark.parametrize("extension,open_function",[(".gz",gzip.open),(".xz",lzma.open)])
+def test_compressed(data,extension,open_function):
+    with open("en.xml","rb") as f, open_function("en.xml"+extension,"wb") as out:
+        out.write(f.read())
+    expected = tiger.GetInfo().link_nodes_to_sentids(etree.parse("en.xml"))
+    assert loader.ChunkedLoader(2).link_nodes_to_sentids("en.xml"+extension,4) == expected
+
+def test_sent_spans(data):
+    chunked_loader = loader.ChunkedLoader(1)
+    data = chunked_loader.read("nl.xml")
+    (wrapper_start,wrapper_end,offsets) = chunked_loader.scan(data)
+    spans = chunked_loader.get_sent_spans(data,offsets)
+    ids = [etree.fromstring(data[start:end]).get('id') for (start,end) in spans]
+    data.close()
+    assert ids == tiger.GetInfo().get_sent_ids(etree.parse("nl.xml"))
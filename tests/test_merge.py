@@ -0,0 +1,86 @@
+import random
+from lxml import etree
+import pytest
+import merge
+
+def write_annotator(filename,drop,retype,shuffle=False):
+## Writes a copy of align.xml as another annotator's file: without the alignments whose number is in drop, with the other type for those in retype, and optionally in random order.
+## Returns the links of the file as (source ID, target ID) => type.
+    tree = etree.parse("align.xml")
+    alignments = tree.getroot().find("alignments")
+    aligns = list(alignments)
+    for i,align in enumerate(aligns):
+        if i in drop:
+            alignments.remove(align)
+        elif i in retype:
+            align.set('type',"fuzzy" if align.get('type') == "good" else "good")
+    if shuffle:
+        aligns = list(alignments)
+        random.Random(1).shuffle(aligns)
+        alignments[:] = aligns
+    tree.write(filename)
+    links = {}
+    for align in alignments:
+        links.setdefault((align[0].get('node_id'),align[1].get('node_id')),align.get('type'))
+    return links
+
+def expected_merge(links,policy):
+## Brute-force merge: the status of each node pair, and the merged links as (source ID, target ID, type).
+    k = len(links)
+    statuses = {}
+    merged = {}
+    for pair in set().union(*links):
+        types = [l[pair] for l in links if pair in l]
+        if len(types) == 1:
+            statuses[pair] = "one-sided"
+        elif len(set(types)) > 1:
+            statuses[pair] = "conflict"
+        elif len(types) == k:
+            statuses[pair] = "agreement"
+        else:
+            statuses[pair] = "partial"
+        if policy == "union" or (policy == "majority" and len(types)*2 > k) or (policy == "intersection" and len(types) == k):
+            merged[pair] = max(types,key=lambda type: (types.count(type),-types.index(type)))
+    return (statuses,merged)
+
+@pytest.fixture
+def annotators(data):
+    links = [
+        write_annotator("a.xml",set(),set()),
+        write_annotator("b.xml",set(range(0,132,4)),set(range(1,132,5))),
+        write_annotator("c.xml",set(range(2,132,3)),set(range(1,132,7)),shuffle=True),
+    ]
+    return (["a.xml","b.xml","c.xml"],links)
+
+@pytest.mark.parametrize("policy",["union","majority","intersection"])
+def test_policies(annotators,policy):
+    (filenames,links) = annotators
+    merger = merge.AlignmentMerger(filenames)
+    stats = merger.merge("merged.xml",policy=policy,diff_file="diff.tsv")
+    (statuses,merged) = expected_merge(links,policy)
+    written = [(align[0].get('node_id'),align[1].get('node_id'),align.get('type')) for align in etree.parse("merged.xml").getroot().iter("align")]
+    assert written == sorted(((s,t,type) for (s,t),type in merged.items()),key=lambda link: merger.key(link[0],link[1]))
+    assert stats['merged'] == len(merged)
+    assert stats['links'] == [len(l) for l in links]
+    assert stats['node_pairs'] == len(statuses)
+    for status in ("agreement","partial","conflict"):
+        assert stats[status] == list(statuses.values()).count(status)
+    with open("diff.tsv") as f:
+        assert len(f.readlines())-1 == sum(1 for status in statuses.values() if status != "agreement")
+
+def test_agreement(annotators):
+    (filenames,links) = annotators
+    merger = merge.AlignmentMerger(filenames)
+    agreement = merger.agreement(merger.merge())
+    shared = links[0].keys() & links[1].keys()
+    same_type = sum(1 for pair in shared if links[0][pair] == links[1][pair])
+    total = len(links[0])+len(links[1])
+    assert agreement[(0,1)] == pytest.approx((2*len(shared)/total,2*same_type/total))
+
+def test_external_sort(annotators,monkeypatch):
+    (filenames,links) = annotators
+    expected = merge.AlignmentMerger(filenames).merge("expected.xml")
+    monkeypatch.setattr(merge,"RUN_SIZE",7) ## several runs for the unsorted file
+    assert merge.AlignmentMerger(filenames).merge("merged.xml") == expected
+    with open("merged.xml","rb") as merged, open("expected.xml","rb") as f:
+        assert merged.read() == f.read()
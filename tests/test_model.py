@@ -0,0 +1,54 @@
+from lxml import etree
+import pytest
+import model, tiger
+from conftest import replace_in_file
+
+def canonical(filename):
+## C14N of the file without whitespace-only text, which the model does not keep.
+    tree = etree.parse(filename)
+    for el in tree.iter():
+        if el.text is not None and not el.text.strip():
+            el.text = None
+        if el.tail is not None and not el.tail.strip():
+            el.tail = None
+    return etree.tostring(tree,method="c14n")
+
+def test_getinfo(data):
+    treebank = model.parse("nl.xml")
+    tree = etree.parse("nl.xml")
+    info = model.GetInfo()
+    expected = tiger.GetInfo()
+    assert info.get_sent_ids(treebank) == expected.get_sent_ids(tree)
+    assert info.get_nr_sents(treebank,1) == expected.get_nr_sents(tree,1)
+    assert info.any_sentids_have_leading_zeros(treebank) == expected.any_sentids_have_leading_zeros(tree)
+    assert info.link_nodes_to_sentids(treebank) == expected.link_nodes_to_sentids(tree)
+    assert info.get_nodes(treebank,"list") == expected.get_nodes(tree,"list")
+    assert info.get_nodes(treebank,"dict") == expected.get_nodes(tree,"dict")
+    assert info.get_words(treebank) == expected.get_words(tree)
+    assert info.nodesarevalid(treebank) == expected.nodesarevalid(tree)
+    for sent,s in zip(treebank.sentences,tree.getroot().iter("s")):
+        assert info.build_nonterm_links(sent) == expected.build_nonterm_links(list(s.iter("nt")))
+
+def test_round_trip(data):
+    model.parse("nl.xml").write("copy.xml")
+    assert canonical("copy.xml") == canonical("nl.xml")
+
+def test_round_trip_unknown_content(data):
+    replace_in_file("nl.xml",'<s id="s2">','<s id="s2" status="checked"><note>first <b>draft</b></note>')
+    replace_in_file("nl.xml",'<t id="s2_1"','<t id="s2_1" morph="sg"')
+    replace_in_file("nl.xml",'<edge label="HD" idref="s1_1"/>','<edge label="HD" idref="s1_1"><comment-el/></edge><secedge label="RE" idref="s1_3"/>')
+    replace_in_file("nl.xml",'<edge label="--" idref="s1_3"/>','<edge label="--" idref="s1_99"/>')
+    treebank = model.parse("nl.xml")
+    assert treebank.sentences[1].extra == (("status","checked"),)
+    assert model.GetInfo().nodesarevalid(treebank) == ["s1_99"]
+    treebank.write("copy.xml")
+    assert canonical("copy.xml") == canonical("nl.xml")
+
+def test_compressed(data):
+    model.parse("nl.xml").write("copy.xml.gz")
+    assert model.GetInfo().link_nodes_to_sentids(model.parse("copy.xml.gz")) == tiger.GetInfo().link_nodes_to_sentids(etree.parse("nl.xml"))
+
+def test_edge_outside_nt(data):
+    replace_in_file("nl.xml",'<t id="s1_1" word="man" lemma="a" pos="DT"/>','<t id="s1_1" word="man" lemma="a" pos="DT"><edge label="HD" idref="s1_2"/></t>')
+    with pytest.raises(ValueError):
+        model.parse("nl.xml")
@@ -0,0 +1,73 @@
+from lxml import etree
+import parallel
+
+def terminal_positions(filename):
+## node ID => (sentence ID, position of the terminal or -1), and sentence ID => words, from the element tree.
+    positions = {}
+    words = {}
+    for s in etree.parse(filename).getroot().iter("s"):
+        terminals = list(s.iter("t"))
+        words[s.get('id')] = [t.get('word') for t in terminals]
+        for i,t in enumerate(terminals):
+            positions[t.get('id')] = (s.get('id'),i)
+        for nt in s.iter("nt"):
+            positions[nt.get('id')] = (s.get('id'),-1)
+    return (positions,words)
+
+def read_lines(filename):
+    with open(filename,encoding="utf-8") as f:
+        return f.read().splitlines()
+
+def test_export(data):
+    assert parallel.ParallelTextExporter().export("align.xml","corpus",types=["good"]) == len(read_lines("corpus.ids"))
+    (spositions,swords) = terminal_positions("nl.xml")
+    (tpositions,twords) = terminal_positions("en.xml")
+    pairs = {}
+    for align in etree.parse("align.xml").getroot().iter("align"):
+        (ssent,spos) = spositions[align[0].get('node_id')]
+        (tsent,tpos) = tpositions[align[1].get('node_id')]
+        links = pairs.setdefault((ssent,tsent),set())
+        if spos != -1 and tpos != -1 and align.get('type') == "good":
+            links.add((spos,tpos))
+    assert read_lines("corpus.ids") == ["%s;%s" % pair for pair in pairs]
+    assert read_lines("corpus.nl") == [" ".join(swords[ssent]) for (ssent,tsent) in pairs]
+    assert read_lines("corpus.en") == [" ".join(twords[tsent]) for (ssent,tsent) in pairs]
+    assert read_lines("corpus.align") == [" ".join("%s-%s" % link for link in sorted(links)) for links in pairs.values()]
+
+def word_links(filename,type="good"):
+## The terminal-to-terminal alignments of the given type, as (source ID, target ID).
+    (spositions,swords) = terminal_positions("nl.xml")
+    (tpositions,twords) = terminal_positions("en.xml")
+    links = set()
+    for align in etree.parse(filename).getroot().iter("align"):
+        (s_id,t_id) = (align[0].get('node_id'),align[1].get('node_id'))
+        if align.get('type') == type and spositions[s_id][1] != -1 and tpositions[t_id][1] != -1:
+            links.add((s_id,t_id))
+    return links
+
+def test_export_import_round_trip(data):
+    parallel.ParallelTextExporter().export("align.xml","corpus",types=["good"])
+    importer = parallel.WordAlignmentImporter(author="test",type="good",last_change="2020-01-01")
+    count = importer.import_links("corpus.align","nl.xml","en.xml","imported.xml",ids_file="corpus.ids")
+    assert importer.skipped == 0
+    assert count == len(word_links("align.xml"))
+    assert word_links("imported.xml") == word_links("align.xml")
+    root = etree.parse("imported.xml").getroot()
+    assert [t.get('id') for t in root.iter("treebank")] == ["nl","en"]
+
+def test_merge_links(data):
+    parallel.ParallelTextExporter().export("align.xml","corpus",types=["good"])
+    importer = parallel.WordAlignmentImporter(author="test",type="auto",last_change="2020-01-01")
+    count = importer.merge_links("corpus.align","align.xml","merged.xml",ids_file="corpus.ids")
+    aligns = list(etree.parse("merged.xml").getroot().iter("align"))
+    original = list(etree.parse("align.xml").getroot().iter("align"))
+    assert len(aligns) == len(original)+count
+    assert [etree.tostring(a) for a in aligns[:len(original)]] == [etree.tostring(a) for a in original]
+    assert word_links("merged.xml",type="auto") == word_links("align.xml")
+
+def test_malformed_links(data):
+    with open("links.align","w") as f:
+        f.write("0-0 3- a-b 1-1\n-1-2 0-99\n")
+    importer = parallel.WordAlignmentImporter()
+    assert importer.import_links("links.align","nl.xml","en.xml","imported.xml") == 2
+    assert importer.skipped == 4
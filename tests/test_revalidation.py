@@ -0,0 +1,47 @@
+import diagnostics, revalidation
+from conftest import replace_in_file
+
+def full_check(deep):
+## What a run without cache reports, for comparison.
+    result = revalidation.IncrementalValidator(1).validate("align.xml",cache_file="none.check-cache",deep=deep)
+    del result['stats']
+    return result
+
+def incremental_check(deep,processes=2):
+    validator = revalidation.IncrementalValidator(processes)
+    result = validator.validate("align.xml",deep=deep)
+    stats = result.pop('stats')
+    return (result,stats)
+
+def test_reuses_unchanged_units(data):
+    (result,stats) = incremental_check(True)
+    assert stats == {'checked': 99, 'reused': 0} ## 33 sentences in each treebank and 33 alignment blocks
+    assert result['missing'] == [] and result['alignment_errors'] == []
+    (again,stats) = incremental_check(True)
+    assert again == result
+    assert stats == {'checked': 0, 'reused': 99}
+
+def test_incremental_matches_full(data):
+    incremental_check(True)
+    replace_in_file("nl.xml",'<t id="s2_1"','<t id="s1_1"')
+    replace_in_file("en.xml",'<graph root="s12_502">','<graph>')
+    replace_in_file("align.xml",'<node node_id="s1_2" treebank_id="nl"/>','<node node_id="s1_77" treebank_id="nl"/>')
+    (result,stats) = incremental_check(True)
+    assert stats == {'checked': 3, 'reused': 96}
+    assert result == full_check(True)
+    assert result['missing'] == [("source",15,"s1_77"),("source",27,"s2_1")] ## lines of the <align> elements
+    assert result['treebank_errors']["nl.xml"] == diagnostics.Diagnostics().check_file("nl.xml",deep=True)['errors']
+    assert (33,"s2","duplicate node ID s1_1 (first at line 11)") in result['treebank_errors']["nl.xml"]
+    assert result['treebank_errors']["en.xml"] == diagnostics.Diagnostics().check_file("en.xml",deep=True)['errors']
+
+def test_without_deep(data):
+    (result,stats) = incremental_check(False)
+    assert result['treebank_errors'] == {}
+    replace_in_file("nl.xml",'<t id="s1_1"','<t id="s1_100"')
+    (result,stats) = incremental_check(False)
+    assert stats == {'checked': 1, 'reused': 98}
+    assert result == full_check(False)
+    assert [(side,node_id) for (side,line,node_id) in result['missing']] == [("source","s1_1")]
+    (result,stats) = incremental_check(True) ## the deep check has not been run on any sentence yet
+    assert stats == {'checked': 66, 'reused': 33}
+    assert result == full_check(True)
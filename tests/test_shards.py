@@ -0,0 +1,55 @@
+import os
+from lxml import etree
+import pytest
+import shards, tiger, sta
+
+def read(filename):
+    with open(filename,"rb") as f:
+        return f.read()
+
+@pytest.mark.parametrize("nr_shards",[1,3,50]) ## 50: more shards than sentences, so some shards are empty
+def test_split_merge_byte_exact(data,nr_shards):
+    manifest = shards.ShardSplitter().split("align.xml","shards",nr_shards)
+    assert len(manifest['shards']) == nr_shards
+    assert sum(shard['source']['sentences'] for shard in manifest['shards']) == 33
+    assert sum(shard['alignments'] for shard in manifest['shards']) == 132
+    outputs = shards.ShardMerger().merge(os.path.join("shards",shards.MANIFEST),"merged")
+    for output,original in zip(outputs,("nl.xml","en.xml","align.xml")):
+        assert read(output) == read(original)
+
+def test_small_blocks_and_compression(data,monkeypatch):
+    monkeypatch.setattr(shards,"BLOCK",7) ## elements and tags cut across blocks
+    shards.ShardSplitter().split("align.xml","shards",4,compress="gz")
+    assert all(name.endswith(".gz") for name in os.listdir("shards") if name != shards.MANIFEST)
+    outputs = shards.ShardMerger().merge(os.path.join("shards",shards.MANIFEST),"merged")
+    for output,original in zip(outputs,("nl.xml","en.xml","align.xml")):
+        assert read(output) == read(original)
+
+def test_shards_are_parallel_treebanks(data):
+    shards.ShardSplitter().split("align.xml","shards",4)
+    sharded = shards.ShardedTreebank(os.path.join("shards",shards.MANIFEST),processes=2)
+    assert sharded.check(deep=True) == {'missing': [], 'treebank_errors': {filename: [] for kind in ("source","target") for filename in sharded.shard_files(kind)}}
+    assert sharded.get_info("link_nodes_to_sentids","source") == tiger.GetInfo().link_nodes_to_sentids(etree.parse("nl.xml"))
+    assert sharded.get_info("get_nodes","target","dict") == tiger.GetInfo().get_nodes(etree.parse("en.xml"),"dict")
+    assert sorted(sharded.get_info("get_node_pairs","align")) == sorted(sta.GetInfo().get_node_pairs(etree.parse("align.xml")))
+    for shard in sharded.manifest['shards']:
+        root = etree.parse(shard['files']['align']['path']).getroot()
+        assert [t.get('filename') for t in root.iter("treebank")] == [shard['files']['source']['filename'],shard['files']['target']['filename']]
+
+def test_merge_detects_changes(data):
+    shards.ShardSplitter().split("align.xml","shards",2)
+    manifest_file = os.path.join("shards",shards.MANIFEST)
+    shard_file = shards.load_manifest(manifest_file)['shards'][0]['files']['source']['path']
+    with open(shard_file,"ab") as f:
+        f.write(b"\n")
+    with pytest.raises(IOError):
+        shards.ShardMerger().merge(manifest_file,"merged")
+
+def test_combine(data):
+    shards.ShardSplitter().split("align.xml","shards",2)
+    sharded = shards.ShardedTreebank(os.path.join("shards",shards.MANIFEST),processes=1)
+    assert sharded.combine([(2,2,[],["s1"]),(3,2,["s4"],[])]) == (5,4,["s4"],["s1"])
+    assert sharded.combine([{'a': 1},{'b': 2}]) == {'a': 1, 'b': 2}
+    assert sharded.combine([1.5,2]) == 3.5
+    with pytest.raises(TypeError):
+        sharded.combine(["a","b"])
@@ -0,0 +1,48 @@
+from multiprocessing import Pool
+from lxml import etree
+import pytest
+import shared, tiger, evaluation
+from test_evaluation import write_prediction
+
+def lookup(task):
+## Worker function: looks up node IDs in the published index.
+    (name,node_ids) = task
+    index = shared.attach(name)
+    return [(index.sentence(id),index[id] if id in index else None) for id in node_ids]
+
+def test_matches_getinfo(data):
+    tree = etree.parse("nl.xml")
+    with shared.SharedTreebankIndex(filename="nl.xml") as index:
+        assert index.link_nodes_to_sentids() == tiger.GetInfo().link_nodes_to_sentids(tree)
+        nodes = tiger.GetInfo().get_nodes(tree,"dict")
+        assert len(index) == len(nodes)
+        assert {id: index[id] for id in nodes} == nodes
+        assert "s1_99" not in index and index.sentence("s1_99") is None
+        with open("nl.xml","rb") as f:
+            contents = f.read()
+        for nr,s in enumerate(tree.getroot().iter("s")):
+            assert index.find_sent(s.get('id')) == nr
+            (start,end) = index.sent_span(nr)
+            assert etree.fromstring(contents[start:end]).get('id') == s.get('id')
+        assert index.find_sent("s999") == -1
+
+def test_workers(data):
+    node_ids = ["s1_1","s1_500","s33_502","s1_99"]
+    expected = [(tiger.GetInfo().link_nodes_to_sentids(etree.parse("en.xml")).get(id),tiger.GetInfo().get_nodes(etree.parse("en.xml"),"dict").get(id)) for id in node_ids]
+    with shared.SharedTreebankIndex(filename="en.xml") as index:
+        with Pool(2) as pool:
+            assert pool.map(lookup,[(index.name,node_ids)]*4) == [expected]*4
+        name = index.name
+        with shared.SharedTreebankIndex(name) as attached:
+            assert [(attached.sentence(id),attached[id] if id in attached else None) for id in node_ids] == expected
+    with pytest.raises(FileNotFoundError): ## removed by the publisher
+        shared.SharedTreebankIndex(name)
+
+def test_evaluate_folds_with_treebanks(data):
+    pairs = []
+    for nr in range(3):
+        write_prediction("predicted%s.xml" % (nr),drop=nr+2,retype=nr+4)
+        pairs.append(("align.xml","predicted%s.xml" % (nr)))
+    evaluator = evaluation.Evaluator()
+    serial = evaluator.evaluate_folds(pairs,processes=1)
+    assert evaluator.evaluate_folds(pairs,processes=2,treebanks=("nl.xml","en.xml")) == serial
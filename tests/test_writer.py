@@ -0,0 +1,61 @@
+import os
+from lxml import etree
+import writer, crossval
+from conftest import replace_in_file
+
+def canonical(root):
+    return etree.tostring(root,method="c14n")
+
+def test_write_tiger(data):
+    replace_in_file("nl.xml","<body>",'<body status="draft">')
+    root = etree.parse("nl.xml",etree.XMLParser(remove_blank_text=True)).getroot()
+    sents = (s for s in list(root.iter("s")) if s.get('id') != "s2")
+    writer.StreamWriter().write_tiger("copy.xml",root,sents)
+    copy = etree.parse("copy.xml",etree.XMLParser(remove_blank_text=True)).getroot()
+    assert copy.find("body").attrib == {'status': "draft"}
+    root.find("body").remove(root.find("body/s[@id='s2']"))
+    assert canonical(copy) == canonical(root)
+
+def test_write_sta_filenames(data):
+    root = etree.parse("align.xml").getroot()
+    writer.StreamWriter().write_sta("copy.xml",root,list(root.iter("align"))[:3],filenames=["a.xml","b.xml"])
+    copy = etree.parse("copy.xml").getroot()
+    assert [t.get('filename') for t in copy.iter("treebank")] == ["a.xml","b.xml"]
+    assert len(list(copy.iter("align"))) == 3
+
+def write_file(text):
+    def write_function(filename):
+        with open(filename,"w") as f:
+            f.write(text)
+    return write_function
+
+def test_output_cache(data):
+    cache = writer.OutputCache(".")
+    digest = cache.digest(cache.fingerprint("nl.xml"),1,["s1","s2"])
+    assert cache.write("out.rand1.train.xml",digest,write_file("first"))
+    assert not cache.write("out.rand1.train.xml",digest,write_file("second"))
+    cache = writer.OutputCache(".") ## a new run reads the manifest
+    assert not cache.write("out.rand1.train.xml",cache.digest(cache.fingerprint("nl.xml"),1,["s1","s2"]),write_file("second"))
+    assert cache.write("out.rand1.train.xml",cache.digest(cache.fingerprint("nl.xml"),2,["s1","s2"]),write_file("third"))
+    with open("out.rand1.train.xml") as f:
+        assert f.read() == "third"
+    with open("out.rand1.train.xml","w") as f: ## changed on disk
+        f.write("changed!")
+    assert cache.write("out.rand1.train.xml",cache.digest(cache.fingerprint("nl.xml"),2,["s1","s2"]),write_file("third"))
+    assert cache.stats == {'written': 2, 'skipped': 1}
+
+def test_output_cache_temporary_files(data):
+    seen = []
+    def write_function(filename):
+        seen.append(os.path.basename(filename))
+        write_file("data")(filename)
+    cache = writer.OutputCache(".")
+    cache.write("de.rand1.train.xml.gz",cache.digest(1),write_function)
+    assert seen[0].endswith(".gz") and crossval.FOLD_FILE.match(seen[0]) is None
+    with open("de.rand2.train.xml.tmp-999999999.xml","w"): ## left behind by a run that no longer exists
+        pass
+    with open("de.rand3.train.xml.tmp-%s.xml" % (os.getpid()),"w"):
+        pass
+    writer.OutputCache(".")
+    assert not os.path.exists("de.rand2.train.xml.tmp-999999999.xml")
+    assert os.path.exists("de.rand3.train.xml.tmp-%s.xml" % (os.getpid()))